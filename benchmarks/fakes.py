@@ -0,0 +1,345 @@
+"""Backends factices pour les benchmarks : Compute Engine et serveur SSH en mémoire
+
+Aucun accès réseau ni projet GCP n'est nécessaire : install_fake_gcp()
+remplace le gestionnaire de clients GCP de mcp_server et
+install_fake_ssh() redirige les connexions SSH vers un serveur paramiko
+local (exécution de commandes et SFTP sur le système de fichiers local).
+"""
+
+import os
+import socket
+import subprocess
+import threading
+import time
+import uuid
+
+import paramiko
+from google.cloud import compute_v1
+from paramiko import SFTP_OK, SFTPAttributes, SFTPHandle, SFTPServer, SFTPServerInterface
+
+# Taille de page des listes Compute : la latence simulée est payée par page
+PAGE_SIZE = 500
+
+# ====================================================================
+# COMPUTE ENGINE
+# ====================================================================
+
+def make_instance(index, zone):
+    """Instance Compute réaliste (messages proto-plus, comme l'API)"""
+    return compute_v1.Instance(
+        name=f"vm-{index}",
+        machine_type=f"zones/{zone}/machineTypes/e2-medium",
+        status="RUNNING" if index % 5 else "TERMINATED",
+        creation_timestamp="2024-01-01T00:00:00.000-07:00",
+        labels={"env": "bench", "team": f"team-{index % 7}"},
+        network_interfaces=[compute_v1.NetworkInterface(
+            network_i_p=f"10.{index // 65536 % 256}.{index // 256 % 256}.{index % 256}",
+            access_configs=[compute_v1.AccessConfig(nat_i_p=f"35.0.{index // 256 % 256}.{index % 256}")]
+        )],
+        disks=[compute_v1.AttachedDisk(
+            device_name="persistent-disk-0",
+            source=f"projects/bench/zones/{zone}/disks/vm-{index}"
+        )]
+    )
+
+class FakeFleet:
+    """Parc d'instances réparti sur des zones, avec une latence par appel d'API"""
+
+    def __init__(self, size, zones, latency=0.0):
+        self.latency = latency
+        self.zones = {zone: [] for zone in zones}
+        for index in range(size):
+            zone = zones[index % len(zones)]
+            self.zones[zone].append(make_instance(index, zone))
+        self.by_name = {
+            instance.name: instance for instances in self.zones.values() for instance in instances
+        }
+        self.calls = 0
+
+    def wait(self, pages=1):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency * max(1, pages))
+
+class FakeInstancesClient:
+    """Substitut de compute_v1.InstancesClient"""
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+
+    def _operation(self, kind):
+        self.fleet.wait()
+        return compute_v1.Operation(
+            name=f"operation-{kind}-{uuid.uuid4().hex[:12]}",
+            status=compute_v1.Operation.Status.DONE,
+            progress=100
+        )
+
+    def list(self, project, zone):
+        instances = self.fleet.zones.get(zone, [])
+        self.fleet.wait(-(-len(instances) // PAGE_SIZE))
+        return iter(instances)
+
+    def get(self, project, zone, instance):
+        self.fleet.wait()
+        if instance not in self.fleet.by_name:
+            raise ValueError(f"404 instance {instance} not found")
+        return self.fleet.by_name[instance]
+
+    def aggregated_list(self, request):
+        offset = int(request.page_token or 0)
+        page_size = request.max_results or PAGE_SIZE
+        instances = [
+            (zone, instance) for zone, zone_instances in self.fleet.zones.items()
+            for instance in zone_instances
+        ][offset:offset + page_size]
+        self.fleet.wait()
+
+        scoped = {}
+        for zone, instance in instances:
+            scoped.setdefault(f"zones/{zone}", []).append(instance)
+        next_offset = offset + page_size
+        page = compute_v1.InstanceAggregatedList(
+            items={scope: compute_v1.InstancesScopedList(instances=items) for scope, items in scoped.items()},
+            next_page_token=str(next_offset) if next_offset < len(self.fleet.by_name) else ""
+        )
+
+        class Pager:
+            pages = iter([page])
+
+        return Pager()
+
+    def insert(self, project, zone, instance_resource):
+        return self._operation("insert")
+
+    def start(self, project, zone, instance):
+        return self._operation("start")
+
+    def stop(self, project, zone, instance):
+        return self._operation("stop")
+
+    def delete(self, project, zone, instance):
+        return self._operation("delete")
+
+class FakeZoneOperationsClient:
+    """Substitut de compute_v1.ZoneOperationsClient : toutes les opérations sont terminées"""
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+
+    def wait(self, project, zone, operation, timeout=None):
+        self.fleet.wait()
+        return compute_v1.Operation(name=operation, status=compute_v1.Operation.Status.DONE, progress=100)
+
+    def list(self, request):
+        self.fleet.wait()
+        names = request.filter.split("'(", 1)[-1].rsplit(")'", 1)[0].split("|")
+        return [
+            compute_v1.Operation(name=name.replace("\\", ""), status=compute_v1.Operation.Status.DONE)
+            for name in names
+        ]
+
+class FakeGCPClientManager:
+    """Remplace GCPClientManager : mêmes méthodes, clients factices, pas de credentials"""
+
+    def __init__(self, fleet):
+        self.fleet = fleet
+        self._clients = {
+            compute_v1.InstancesClient: FakeInstancesClient(fleet),
+            compute_v1.ZoneOperationsClient: FakeZoneOperationsClient(fleet)
+        }
+
+    def get_credentials(self):
+        return None
+
+    def get_client(self, client_class, project_id=None, transport=None):
+        return self._clients[client_class]
+
+    def reset(self):
+        pass
+
+    def stats(self):
+        return {"fake": True, "api_calls": self.fleet.calls}
+
+def install_fake_gcp(mcp_server, fleet_size, latency=0.0, zones=None):
+    """Branche un parc factice sur mcp_server et vide le cache d'inventaire"""
+    fleet = FakeFleet(fleet_size, zones or [mcp_server.GCP_ZONE], latency)
+    mcp_server.gcp_client_manager = FakeGCPClientManager(fleet)
+    mcp_server.instance_cache.clear()
+    return fleet
+
+# ====================================================================
+# SERVEUR SSH
+# ====================================================================
+
+class _Server(paramiko.ServerInterface):
+    """Accepte toute clé publique et exécute les commandes avec le shell local"""
+
+    def check_auth_publickey(self, username, key):
+        return paramiko.AUTH_SUCCESSFUL
+
+    def get_allowed_auths(self, username):
+        return "publickey"
+
+    def check_channel_request(self, kind, chanid):
+        return paramiko.OPEN_SUCCEEDED
+
+    def check_channel_exec_request(self, channel, command):
+        threading.Thread(target=_run_command, args=(channel, command), daemon=True).start()
+        return True
+
+def _run_command(channel, command):
+    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    def pump_stderr():
+        for chunk in iter(lambda: process.stderr.read1(32768), b""):
+            channel.sendall_stderr(chunk)
+
+    stderr_thread = threading.Thread(target=pump_stderr, daemon=True)
+    stderr_thread.start()
+    for chunk in iter(lambda: process.stdout.read1(32768), b""):
+        channel.sendall(chunk)
+    stderr_thread.join()
+    channel.send_exit_status(process.wait())
+    channel.close()
+
+class _Handle(SFTPHandle):
+    def stat(self):
+        return SFTPAttributes.from_stat(os.fstat(self.readfile.fileno()))
+
+    def chattr(self, attr):
+        return SFTP_OK
+
+class _SFTPInterface(SFTPServerInterface):
+    """SFTP sur le système de fichiers local"""
+
+    def _attributes(self, path, follow=True):
+        try:
+            return SFTPAttributes.from_stat(os.stat(path) if follow else os.lstat(path))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def list_folder(self, path):
+        try:
+            entries = []
+            for name in os.listdir(path):
+                attributes = SFTPAttributes.from_stat(os.lstat(os.path.join(path, name)))
+                attributes.filename = name
+                entries.append(attributes)
+            return entries
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+
+    def stat(self, path):
+        return self._attributes(path)
+
+    def lstat(self, path):
+        return self._attributes(path, follow=False)
+
+    def open(self, path, flags, attr):
+        try:
+            descriptor = os.open(path, flags, 0o644)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        if flags & os.O_WRONLY:
+            mode = "ab" if flags & os.O_APPEND else "wb"
+        elif flags & os.O_RDWR:
+            mode = "a+b" if flags & os.O_APPEND else "r+b"
+        else:
+            mode = "rb"
+        handle = _Handle(flags)
+        handle.filename = path
+        handle.readfile = handle.writefile = os.fdopen(descriptor, mode)
+        return handle
+
+    def _call(self, function, *args):
+        try:
+            function(*args)
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def mkdir(self, path, attr):
+        return self._call(os.mkdir, path)
+
+    def rmdir(self, path):
+        return self._call(os.rmdir, path)
+
+    def remove(self, path):
+        return self._call(os.remove, path)
+
+    def rename(self, oldpath, newpath):
+        return self._call(os.rename, oldpath, newpath)
+
+    def posix_rename(self, oldpath, newpath):
+        return self._call(os.replace, oldpath, newpath)
+
+    def chattr(self, path, attr):
+        try:
+            if attr.st_mode is not None:
+                os.chmod(path, attr.st_mode & 0o7777)
+            if attr.st_mtime is not None:
+                os.utime(path, (attr.st_atime, attr.st_mtime))
+        except OSError as e:
+            return SFTPServer.convert_errno(e.errno)
+        return SFTP_OK
+
+    def canonicalize(self, path):
+        return os.path.abspath(path)
+
+class FakeSSHServer:
+    """Serveur SSH paramiko dans le processus, sur un port local éphémère"""
+
+    def __init__(self):
+        self.host_key = paramiko.RSAKey.generate(2048)
+        self.connections = 0
+        self._socket = socket.socket()
+        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._socket.bind(("127.0.0.1", 0))
+        self._socket.listen(128)
+        self.port = self._socket.getsockname()[1]
+        threading.Thread(target=self._accept, name="fake-ssh", daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                client, _ = self._socket.accept()
+            except OSError:
+                return
+            self.connections += 1
+            # Comme sshd : sans TCP_NODELAY, Nagle et l'ACK retardé ajoutent ~40 ms par échange
+            client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            transport = paramiko.Transport(client)
+            transport.add_server_key(self.host_key)
+            transport.set_subsystem_handler("sftp", SFTPServer, _SFTPInterface)
+            transport.start_server(server=_Server())
+
+    def close(self):
+        self._socket.close()
+
+def install_fake_ssh(mcp_server, server):
+    """Redirige les connexions SSH de mcp_server vers le serveur factice
+
+    Reprend mcp_server.open_ssh_client (dont TCP_NODELAY) ; tout hôte est servi
+    par le serveur local, chaque adresse gardant ses propres entrées de pool.
+    """
+
+    def open_ssh_client(host, username, ssh_key_name):
+        private_key = mcp_server.load_private_key(ssh_key_name)
+        if private_key is None:
+            raise ValueError(f"Clé privée SSH '{ssh_key_name}' non trouvée")
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            hostname="127.0.0.1",
+            port=server.port,
+            username=username,
+            pkey=private_key,
+            timeout=mcp_server.SSH_CONNECT_TIMEOUT,
+            allow_agent=False,
+            look_for_keys=False
+        )
+        client.get_transport().sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return client
+
+    mcp_server.open_ssh_client = open_ssh_client
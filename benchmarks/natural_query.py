@@ -0,0 +1,204 @@
+"""Benchmark de gcp_natural_query : précision et requêtes par seconde
+
+Compare l'ancien analyseur par mots-clés (reproduit ci-dessous) à
+l'analyseur compilé de mcp_server sur un corpus de requêtes en français
+et en anglais annotées avec l'action et l'appel tools/call attendus.
+
+Usage : python benchmarks/natural_query.py [--seconds 2]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+os.environ.setdefault("SSH_KEY_POOL_SIZE", "0")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import mcp_server  # noqa: E402
+
+# (requête, action attendue, appel attendu : (outil, arguments) ou None)
+CORPUS = [
+    # Création
+    ("Crée une nouvelle VM pour mon serveur web", "create_instance", None),
+    ("Crée une VM nommée web-1", "create_instance", ("gcp_create_instance", {"instance_name": "web-1"})),
+    ("créer une instance appelée api-server en e2-standard-4", "create_instance",
+     ("gcp_create_instance", {"instance_name": "api-server", "machine_type": "e2-standard-4"})),
+    ("Crée la vm db-01 avec 50 Go de disque sous debian-12", "create_instance",
+     ("gcp_create_instance", {"instance_name": "db-01", "disk_size_gb": 50, "image_family": "debian-12"})),
+    ("crée 3 vms worker", "create_instance", None),
+    ("Crée trois nouvelles VM nommées worker", "create_instance",
+     ("gcp_bulk_create", {"name_pattern": "worker-{index}", "count": 3})),
+    ("nouvelle machine 'cache-1' type n2-highmem-8", "create_instance",
+     ("gcp_create_instance", {"instance_name": "cache-1", "machine_type": "n2-highmem-8"})),
+    ("Create a VM named web-2", "create_instance", ("gcp_create_instance", {"instance_name": "web-2"})),
+    ("create a new instance called build-agent with 100 GB disk", "create_instance",
+     ("gcp_create_instance", {"instance_name": "build-agent", "disk_size_gb": 100})),
+    ("spin up 5 new vms named ci-runner", "create_instance",
+     ("gcp_bulk_create", {"name_pattern": "ci-runner-{index}", "count": 5})),
+    ("provision instances ci-1 and ci-2 on e2-small", "create_instance",
+     ("gcp_bulk_create", {"instance_names": ["ci-1", "ci-2"], "machine_type": "e2-small"})),
+    ("deploy a new server", "create_instance", None),
+    ("Crée une VM ubuntu-2204-lts nommée jump-host", "create_instance",
+     ("gcp_create_instance", {"instance_name": "jump-host", "image_family": "ubuntu-2204-lts"})),
+    # Liste
+    ("Liste les VM", "list_instances", ("gcp_list_instances", {})),
+    ("affiche toutes les instances", "list_instances", ("gcp_list_instances", {})),
+    ("montre-moi les machines dans europe-west1-b", "list_instances",
+     ("gcp_list_instances", {"zone": "europe-west1-b"})),
+    ("Liste les VM arrêtées", "list_instances", ("gcp_list_instances", {"status": "TERMINATED"})),
+    ("quelles instances sont en cours d'exécution ?", "list_instances",
+     ("gcp_list_instances", {"status": "RUNNING"})),
+    ("combien de vm tournent dans us-east1-c", "list_instances",
+     ("gcp_list_instances", {"zone": "us-east1-c"})),
+    ("voir les serveurs web-*", "list_instances", ("gcp_list_instances", {"name_prefix": "web-"})),
+    ("list all instances", "list_instances", ("gcp_list_instances", {})),
+    ("show me the running vms", "list_instances", ("gcp_list_instances", {"status": "RUNNING"})),
+    ("which servers are stopped in us-central1-f?", "list_instances",
+     ("gcp_list_instances", {"status": "TERMINATED", "zone": "us-central1-f"})),
+    ("how many instances do we have", "list_instances", ("gcp_list_instances", {})),
+    ("display vms", "list_instances", ("gcp_list_instances", {})),
+    ("what vms are running in europe-west4-a", "list_instances",
+     ("gcp_list_instances", {"status": "RUNNING", "zone": "europe-west4-a"})),
+    ("what instances do we have in asia-east1-b", "list_instances",
+     ("gcp_list_instances", {"zone": "asia-east1-b"})),
+    # Détails
+    ("donne-moi les détails de la vm web-1", "get_instance", ("gcp_get_instance", {"instance_name": "web-1"})),
+    ("statut de db-01", "get_instance", ("gcp_get_instance", {"instance_name": "db-01"})),
+    ("infos sur l'instance 'api-server' dans europe-west1-b", "get_instance",
+     ("gcp_get_instance", {"instance_name": "api-server", "zone": "europe-west1-b"})),
+    ("describe instance build-agent", "get_instance", ("gcp_get_instance", {"instance_name": "build-agent"})),
+    ("what is the status of web-2?", "get_instance", ("gcp_get_instance", {"instance_name": "web-2"})),
+    ("show details for vm cache-1", "get_instance", ("gcp_get_instance", {"instance_name": "cache-1"})),
+    # Démarrage
+    ("Démarre la VM web-1", "start_instance", ("gcp_start_instance", {"instance_name": "web-1"})),
+    ("demarre web-1 et web-2", "start_instance",
+     ("gcp_bulk_start", {"instance_names": ["web-1", "web-2"]})),
+    ("lance l'instance 'batch-job' dans us-east1-b", "start_instance",
+     ("gcp_start_instance", {"instance_name": "batch-job", "zone": "us-east1-b"})),
+    ("allume le serveur db-01", "start_instance", ("gcp_start_instance", {"instance_name": "db-01"})),
+    ("start vm api-server", "start_instance", ("gcp_start_instance", {"instance_name": "api-server"})),
+    ("please start instances ci-1, ci-2 and ci-3", "start_instance",
+     ("gcp_bulk_start", {"instance_names": ["ci-1", "ci-2", "ci-3"]})),
+    ("boot worker-*", "start_instance", ("gcp_bulk_start", {"name_pattern": "worker-*"})),
+    ("power on the machine named jump-host", "start_instance",
+     ("gcp_start_instance", {"instance_name": "jump-host"})),
+    ("Démarre la VM", "start_instance", None),
+    # Redémarrage : arrêt attendu, puis démarrage
+    ("restart vm web-1", "restart_instance",
+     ("gcp_stop_instance", {"instance_name": "web-1", "wait": True})),
+    ("redémarre web-1", "restart_instance", ("gcp_stop_instance", {"instance_name": "web-1", "wait": True})),
+    ("Redémarre les VM web-1 et web-2 dans europe-west4-a", "restart_instance",
+     ("gcp_bulk_stop", {"instance_names": ["web-1", "web-2"], "zone": "europe-west4-a", "wait": True})),
+    ("reboot the vms worker-*", "restart_instance",
+     ("gcp_bulk_stop", {"name_pattern": "worker-*", "wait": True})),
+    ("relance le serveur db-01", "restart_instance", ("gcp_stop_instance", {"instance_name": "db-01", "wait": True})),
+    ("restart the vm", "restart_instance", None),
+    # Arrêt
+    ("Arrête la VM web-1", "stop_instance", ("gcp_stop_instance", {"instance_name": "web-1"})),
+    ("arrete les instances test-1 et test-2", "stop_instance",
+     ("gcp_bulk_stop", {"instance_names": ["test-1", "test-2"]})),
+    ("éteins le serveur 'build-agent'", "stop_instance", ("gcp_stop_instance", {"instance_name": "build-agent"})),
+    ("coupe toutes les vm test-*", "stop_instance", ("gcp_bulk_stop", {"name_pattern": "test-*"})),
+    ("stop instance db-01 in europe-west1-b", "stop_instance",
+     ("gcp_stop_instance", {"instance_name": "db-01", "zone": "europe-west1-b"})),
+    ("shut down vm cache-1", "stop_instance", ("gcp_stop_instance", {"instance_name": "cache-1"})),
+    ("shutdown the server called api-server", "stop_instance",
+     ("gcp_stop_instance", {"instance_name": "api-server"})),
+    ("halt ci-runner-1 and ci-runner-2", "stop_instance",
+     ("gcp_bulk_stop", {"instance_names": ["ci-runner-1", "ci-runner-2"]})),
+    ("stop the vm", "stop_instance", None),
+    # Suppression
+    ("Supprime la VM web-1", "delete_instance", ("gcp_delete_instance", {"instance_name": "web-1"})),
+    ("supprimer l'instance 'old-db'", "delete_instance", ("gcp_delete_instance", {"instance_name": "old-db"})),
+    ("détruis les vm tmp-1 et tmp-2 dans us-central1-b", "delete_instance",
+     ("gcp_bulk_delete", {"instance_names": ["tmp-1", "tmp-2"], "zone": "us-central1-b"})),
+    ("efface le serveur nommé sandbox", "delete_instance", ("gcp_delete_instance", {"instance_name": "sandbox"})),
+    ("delete instance old-db", "delete_instance", ("gcp_delete_instance", {"instance_name": "old-db"})),
+    ("remove vms preview-*", "delete_instance", ("gcp_bulk_delete", {"name_pattern": "preview-*"})),
+    ("destroy the machine called scratch-42", "delete_instance",
+     ("gcp_delete_instance", {"instance_name": "scratch-42"})),
+    ("terminate server legacy-app in us-west1-a", "delete_instance",
+     ("gcp_delete_instance", {"instance_name": "legacy-app", "zone": "us-west1-a"})),
+    # Hors sujet
+    ("Bonjour, comment ça va ?", "unknown", None),
+    ("quelle heure est-il", "unknown", None),
+    ("what's the weather like", "unknown", None),
+    ("génère une clé ssh", "unknown", None),
+]
+
+
+def legacy_natural_language_to_gcp_action(query):
+    """Analyseur par mots-clés remplacé par l'analyseur compilé (référence)"""
+    query_lower = query.lower()
+    if any(word in query_lower for word in ["créer", "crée", "créer une vm", "nouvelle vm", "créer machine"]):
+        return {"action": "create_instance"}
+    elif any(word in query_lower for word in ["liste", "affiche", "montre", "voir"]) and "vm" in query_lower:
+        return {"action": "list_instances"}
+    elif any(word in query_lower for word in ["démarre", "démarrer", "start", "lance"]):
+        return {"action": "start_instance"}
+    elif any(word in query_lower for word in ["arrête", "arrêter", "stop"]):
+        return {"action": "stop_instance"}
+    elif any(word in query_lower for word in ["supprime", "supprimer", "delete", "détruit"]):
+        return {"action": "delete_instance"}
+    return {"action": "unknown"}
+
+
+def queries_per_second(parse, seconds):
+    """Passe le corpus en boucle pendant la durée donnée"""
+    queries = [query for query, _, _ in CORPUS]
+    count = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for query in queries:
+            parse(query)
+        count += len(queries)
+    return round(count / (time.perf_counter() - started))
+
+
+def evaluate(parse, with_tool_call):
+    """Précision de l'action et, si demandé, de l'appel tools/call proposé"""
+    action_hits = 0
+    call_hits = 0
+    failures = []
+    for query, expected_action, expected_call in CORPUS:
+        result = parse(query)
+        action_ok = result["action"] == expected_action
+        action_hits += action_ok
+        call_ok = True
+        if with_tool_call:
+            tool_call = result.get("tool_call")
+            actual_call = (tool_call["name"], tool_call["arguments"]) if tool_call else None
+            call_ok = actual_call == expected_call
+            call_hits += call_ok
+        if not (action_ok and call_ok):
+            failures.append({"query": query, "expected": expected_action, "result": result})
+    report = {
+        "queries": len(CORPUS),
+        "action_accuracy": round(action_hits / len(CORPUS), 3),
+        "failures": failures
+    }
+    if with_tool_call:
+        report["tool_call_accuracy"] = round(call_hits / len(CORPUS), 3)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=2.0, help="durée de la mesure de débit")
+    args = parser.parse_args()
+
+    legacy = evaluate(legacy_natural_language_to_gcp_action, with_tool_call=False)
+    legacy["queries_per_second"] = queries_per_second(legacy_natural_language_to_gcp_action, args.seconds)
+    legacy.pop("failures")
+
+    compiled = evaluate(mcp_server.natural_language_to_gcp_action, with_tool_call=True)
+    compiled["queries_per_second"] = queries_per_second(mcp_server.natural_language_to_gcp_action, args.seconds)
+
+    print(json.dumps({"legacy": legacy, "compiled": compiled}, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
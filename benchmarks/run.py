@@ -0,0 +1,390 @@
+"""Suite de benchmarks hors ligne de mcp_server
+
+Les appels Compute Engine sont servis par un parc factice (taille et
+latence configurables) et les appels SSH/SFTP par un serveur paramiko
+local : aucun projet GCP ni machine distante n'est nécessaire.
+
+Les résultats sont écrits en JSON. Chaque mesure a une valeur principale
+("value", "unit", "better") qui permet de comparer deux exécutions :
+
+    python benchmarks/run.py --output base.json
+    python benchmarks/run.py --compare base.json --threshold 0.15
+
+Avec --compare, le code de sortie vaut 1 si une mesure s'est dégradée
+au-delà du seuil.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Isolation : clés SSH, cache Terraform... dans un HOME temporaire, pas de génération de clés en tâche de fond
+BENCH_HOME = tempfile.mkdtemp(prefix="mcp-bench-")
+os.environ["HOME"] = BENCH_HOME
+os.environ["SSH_KEY_POOL_SIZE"] = "0"
+os.environ.setdefault("INSTANCE_CACHE_TTL", "30")
+sys.path.insert(0, REPO_DIR)
+
+import mcp_server  # noqa: E402
+from fakes import FakeSSHServer, install_fake_gcp, install_fake_ssh  # noqa: E402
+
+SSH_HOST = "127.0.0.1"
+SSH_USER = "bench"
+SSH_KEY = "bench"
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def measure(function, min_seconds=1.0, min_iterations=5, max_iterations=100000, warmup=1):
+    """Latence d'une fonction : appels répétés jusqu'à min_seconds et min_iterations"""
+    for _ in range(warmup):
+        function()
+    durations = []
+    started = time.perf_counter()
+    while len(durations) < max_iterations and (
+        len(durations) < min_iterations or time.perf_counter() - started < min_seconds
+    ):
+        call_started = time.perf_counter()
+        function()
+        durations.append((time.perf_counter() - call_started) * 1000)
+    durations.sort()
+    mean = sum(durations) / len(durations)
+    return {
+        "value": round(mean, 4),
+        "unit": "ms",
+        "better": "lower",
+        "iterations": len(durations),
+        "ops_per_second": round(1000 / mean, 1) if mean else None,
+        "p50_ms": round(percentile(durations, 0.50), 4),
+        "p95_ms": round(percentile(durations, 0.95), 4),
+        "p99_ms": round(percentile(durations, 0.99), 4)
+    }
+
+
+def throughput(total_bytes, function, repeat=3, unit="MB/s", scale=1e6):
+    """Débit (Mo/s par défaut) : meilleure de plusieurs exécutions"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - started
+        if isinstance(result, dict) and not result.get("success", True):
+            raise RuntimeError(result.get("error") or result.get("errors"))
+        best = elapsed if best is None else min(best, elapsed)
+    return {
+        "value": round(total_bytes / best / scale, 2),
+        "unit": unit,
+        "better": "higher",
+        "bytes": total_bytes,
+        "best_seconds": round(best, 4)
+    }
+
+
+def jsonrpc_call(name, arguments):
+    """Requête tools/call traitée par process_jsonrpc_request, erreur levée si échec"""
+    request = {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {"name": name, "arguments": arguments}}
+
+    def call():
+        response = mcp_server.process_jsonrpc_request(request)
+        if "error" in response:
+            raise RuntimeError(f"{name}: {response['error']['message']}")
+        return response
+
+    return call
+
+
+# ====================================================================
+# BENCHMARKS
+# ====================================================================
+
+def http_call(client, method, path, status=200, **kwargs):
+    """Requête sur l'application Flask (test_client), erreur levée si le statut diffère"""
+
+    def call():
+        response = client.open(path, method=method, **kwargs)
+        if response.status_code != status:
+            raise RuntimeError(f"{method} {path}: HTTP {response.status_code}")
+        return response.get_data()
+
+    return call
+
+
+def bench_jsonrpc(options):
+    """Catalogues par HTTP (corps pré-encodé, ETag) et process_jsonrpc_request par outil"""
+    install_fake_gcp(mcp_server, options.fleet_sizes[0], options.latency)
+    results = {}
+    client = mcp_server.app.test_client()
+    for method in ("initialize", "tools/list", "resources/list"):
+        request = {"jsonrpc": "2.0", "id": 1, "method": method, "params": {}}
+        # Aiguillage seul : renvoie le dict pré-construit, sans encodage
+        results[f"jsonrpc.dispatch.{method}"] = measure(
+            lambda: mcp_server.process_jsonrpc_request(request), options.seconds
+        )
+        # Chemin servi : décodage de la requête, enveloppe autour du corps pré-encodé
+        results[f"http.{method}"] = measure(
+            http_call(client, "POST", "/mcp", json=request), options.seconds
+        )
+    etag = client.get("/mcp").headers["ETag"]
+    results["http.get_mcp"] = measure(http_call(client, "GET", "/mcp"), options.seconds)
+    results["http.get_mcp.not_modified"] = measure(
+        http_call(client, "GET", "/mcp", status=304, headers={"If-None-Match": etag}), options.seconds
+    )
+
+    calls = {
+        "gcp_list_instances": {},
+        "gcp_list_instances.force_refresh": {"force_refresh": True},
+        "gcp_list_instances.all_zones": {"all_zones": True},
+        "gcp_get_instance": {"instance_name": "vm-1"},
+        "gcp_start_instance": {"instance_name": "vm-1"},
+        "gcp_stop_instance": {"instance_name": "vm-1"},
+        "gcp_natural_query": {"query": "Arrête les VM web-1 et web-2 dans europe-west1-b"},
+        "ssh_list_keys": {},
+        "ssh_execute": {"host": SSH_HOST, "username": SSH_USER, "command": "true", "ssh_key_name": SSH_KEY},
+    }
+    for label, arguments in calls.items():
+        results[f"jsonrpc.{label}"] = measure(jsonrpc_call(label.split(".")[0], arguments), options.seconds)
+    return results
+
+
+def bench_list_instances(options):
+    """list_instances à froid (API factice) et depuis le cache, par taille de parc"""
+    results = {}
+    for size in options.fleet_sizes:
+        install_fake_gcp(mcp_server, size, options.latency)
+        results[f"list_instances.{size}.cold"] = measure(
+            lambda: mcp_server.list_instances(force_refresh=True), options.seconds, max_iterations=1000
+        )
+        results[f"list_instances.{size}.cached"] = measure(
+            lambda: mcp_server.list_instances(), options.seconds, max_iterations=1000
+        )
+        results[f"list_instances.{size}.jsonrpc"] = measure(
+            jsonrpc_call("gcp_list_instances", {"force_refresh": True}), options.seconds, max_iterations=1000
+        )
+    return results
+
+
+def bench_ssh(options):
+    """Exécution de commandes SSH sur connexions du pool"""
+    results = {
+        "ssh_exec.true": measure(
+            lambda: mcp_server.execute_ssh_command(SSH_HOST, SSH_USER, "true", SSH_KEY), options.seconds
+        )
+    }
+    size = options.transfer_mb * 1024 * 1024
+    results["ssh_exec.output"] = throughput(
+        size, lambda: mcp_server.execute_ssh_command(
+            SSH_HOST, SSH_USER, f"head -c {size} /dev/zero", SSH_KEY
+        )
+    )
+    # Adresses distinctes (une entrée de pool chacune), toutes servies par le serveur factice
+    hosts = [f"10.0.0.{index}" for index in range(1, 51)]
+    results["ssh_exec_many.50"] = measure(
+        lambda: mcp_server.execute_ssh_command_many(hosts, SSH_USER, "true", SSH_KEY),
+        options.seconds, min_iterations=3
+    )
+    return results
+
+
+def bench_sftp(options):
+    """Débit SFTP : fichier unique (1 et 4 sessions) et arborescence de petits fichiers"""
+    work_dir = tempfile.mkdtemp(prefix="sftp-", dir=BENCH_HOME)
+    size = options.transfer_mb * 1024 * 1024
+    source = os.path.join(work_dir, "artifact.bin")
+    with open(source, "wb") as artifact:
+        artifact.write(os.urandom(size))
+
+    tree = os.path.join(work_dir, "tree")
+    tree_bytes = 0
+    for index in range(options.tree_files):
+        directory = os.path.join(tree, f"d{index % 20}")
+        os.makedirs(directory, exist_ok=True)
+        content = os.urandom(index % 4096 + 1)
+        with open(os.path.join(directory, f"f{index}.txt"), "wb") as tree_file:
+            tree_file.write(content)
+        tree_bytes += len(content)
+
+    results = {}
+    for concurrency in (1, 4):
+        target = os.path.join(work_dir, f"upload-{concurrency}.bin")
+        results[f"sftp_upload.c{concurrency}"] = throughput(size, lambda: mcp_server.upload_file_ssh(
+            SSH_HOST, SSH_USER, source, target, SSH_KEY, concurrency=concurrency, resume=False
+        ))
+        results[f"sftp_download.c{concurrency}"] = throughput(size, lambda: mcp_server.download_file_ssh(
+            SSH_HOST, SSH_USER, source, target + ".back", SSH_KEY, concurrency=concurrency, resume=False
+        ))
+
+    # Petits fichiers : le coût est par fichier, pas par octet
+    results["sftp_upload.tree"] = throughput(options.tree_files, lambda: mcp_server.upload_file_ssh(
+        SSH_HOST, SSH_USER, tree, os.path.join(work_dir, "tree-copy"), SSH_KEY, concurrency=8
+    ), unit="files/s", scale=1)
+    results["sftp_upload.tree"]["bytes"] = tree_bytes
+    results["ssh_sync_dir.noop"] = measure(lambda: mcp_server.sync_directory_ssh(
+        SSH_HOST, SSH_USER, tree, os.path.join(work_dir, "tree-copy"), SSH_KEY
+    ), options.seconds, min_iterations=3)
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def bench_keygen(options):
+    """Génération de clés SSH par type, et clé RSA prise dans une réserve pré-remplie"""
+    results = {
+        "keygen.rsa_2048": measure(lambda: mcp_server.generate_rsa_key_pair(2048), options.seconds, min_iterations=3),
+        "keygen.ed25519": measure(lambda: mcp_server.generate_ssh_key_pair("bench", "ed25519"), options.seconds),
+        "keygen.ecdsa_256": measure(lambda: mcp_server.generate_ssh_key_pair("bench", "ecdsa"), options.seconds),
+    }
+
+    pool = mcp_server.RSAKeyPool(options.pool_keys, 0, mcp_server.SSH_RSA_KEY_BITS)
+    pool.start()
+    while pool.stats()["depth"] < options.pool_keys:
+        time.sleep(0.05)
+    pool.stop()
+    results["keygen.rsa_pool_hit"] = measure(
+        pool.take, min_seconds=0, min_iterations=options.pool_keys,
+        max_iterations=options.pool_keys, warmup=0
+    )
+    return results
+
+
+BENCHMARKS = {
+    "jsonrpc": bench_jsonrpc,
+    "list_instances": bench_list_instances,
+    "ssh": bench_ssh,
+    "sftp": bench_sftp,
+    "keygen": bench_keygen,
+}
+
+
+# ====================================================================
+# COMPARAISON ET EXÉCUTION
+# ====================================================================
+
+def git_revision():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        dirty = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            cwd=REPO_DIR, capture_output=True, text=True
+        ).stdout.strip())
+        return commit, dirty
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+
+
+def compare(baseline, current, threshold):
+    """Écart relatif de chaque mesure commune ; dégradation au-delà du seuil"""
+    report = {}
+    for name, result in current.items():
+        previous = baseline.get(name)
+        # Mesure absente ou redéfinie (autre unité) dans la référence : pas de comparaison
+        if not previous or not previous.get("value") or previous.get("unit") != result.get("unit"):
+            continue
+        change = (result["value"] - previous["value"]) / previous["value"]
+        worse = change > threshold if result["better"] == "lower" else change < -threshold
+        report[name] = {
+            "baseline": previous["value"],
+            "current": result["value"],
+            "unit": result["unit"],
+            "change": round(change, 3),
+            "regression": worse
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne de mcp_server")
+    parser.add_argument("--only", nargs="*", choices=sorted(BENCHMARKS), help="groupes à exécuter")
+    parser.add_argument("--quick", action="store_true", help="mesures courtes (vérification rapide)")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="latence simulée par appel Compute")
+    parser.add_argument("--fleet-sizes", type=int, nargs="*", default=[10, 1000, 10000],
+                        help="tailles de parc pour list_instances")
+    parser.add_argument("--transfer-mb", type=int, default=64, help="taille des transferts SSH/SFTP")
+    parser.add_argument("--output", help="fichier JSON de résultats (défaut: sortie standard)")
+    parser.add_argument("--compare", help="résultats de référence à comparer")
+    parser.add_argument("--threshold", type=float, default=0.10, help="dégradation tolérée (0.10 = 10 %%)")
+    options = parser.parse_args()
+
+    options.latency = options.latency_ms / 1000
+    options.seconds = 0.2 if options.quick else 1.0
+    options.tree_files = 200 if options.quick else 2000
+    options.pool_keys = 4 if options.quick else 16
+    if options.quick:
+        options.transfer_mb = min(options.transfer_mb, 8)
+
+    ssh_server = FakeSSHServer()
+    install_fake_ssh(mcp_server, ssh_server)
+    private_key, public_key = mcp_server.generate_ssh_key_pair(SSH_KEY, "ed25519")
+    mcp_server.store_ssh_key(SSH_KEY, private_key, public_key)
+
+    results = {}
+    durations = {}
+    try:
+        for group in options.only or BENCHMARKS:
+            started = time.perf_counter()
+            print(f"[{group}]", file=sys.stderr, flush=True)
+            results.update(BENCHMARKS[group](options))
+            durations[group] = round(time.perf_counter() - started, 1)
+    finally:
+        mcp_server.shutdown_server()
+        ssh_server.close()
+        shutil.rmtree(BENCH_HOME, ignore_errors=True)
+
+    commit, dirty = git_revision()
+    report = {
+        "meta": {
+            "commit": commit,
+            "dirty": dirty,
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "json_backend": "orjson" if mcp_server.USE_ORJSON else "json",
+            "options": {
+                "quick": options.quick,
+                "latency_ms": options.latency_ms,
+                "fleet_sizes": options.fleet_sizes,
+                "transfer_mb": options.transfer_mb
+            },
+            "durations_seconds": durations
+        },
+        "results": results
+    }
+
+    regressions = []
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            baseline = json.load(baseline_file)
+        report["comparison"] = compare(baseline["results"], results, options.threshold)
+        report["meta"]["baseline_commit"] = baseline["meta"].get("commit")
+        regressions = [name for name, item in report["comparison"].items() if item["regression"]]
+        report["regressions"] = regressions
+
+    encoded = json.dumps(report, indent=2, ensure_ascii=False)
+    if options.output:
+        with open(options.output, "w") as output:
+            output.write(encoded + "\n")
+    else:
+        print(encoded)
+    for name in regressions:
+        item = report["comparison"][name]
+        print(f"régression {name}: {item['baseline']} -> {item['current']} {item['unit']}", file=sys.stderr)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
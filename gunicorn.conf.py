@@ -0,0 +1,43 @@
+"""
+Configuration Gunicorn pour le serveur MCP GCP (mode production)
+
+Lancement : gunicorn -c gunicorn.conf.py mcp_server:app
+
+Le serveur garde en mémoire des états partagés (pool de connexions SSH,
+clients GCP, cache d'inventaire, suivi des opérations) : un seul processus
+avec de nombreux threads est donc la configuration recommandée. Augmenter
+MCP_WORKERS multiplie ces états par processus.
+"""
+
+import os
+
+# Adresse d'écoute
+bind = os.getenv('MCP_BIND', '0.0.0.0:5001')
+
+# Workers à threads : chaque requête /mcp est traitée dans son propre thread,
+# un appel SSH ou Terraform long ne bloque donc pas les autres requêtes
+worker_class = 'gthread'
+workers = int(os.getenv('MCP_WORKERS', '1'))
+threads = int(os.getenv('MCP_THREADS', '32'))
+
+# Connexions HTTP persistantes (keep-alive) entre le reverse proxy et le serveur
+keepalive = int(os.getenv('MCP_KEEPALIVE', '75'))
+worker_connections = int(os.getenv('MCP_WORKER_CONNECTIONS', '1000'))
+
+# Battement de cœur du worker (les threads de requête ne le bloquent pas)
+timeout = int(os.getenv('MCP_WORKER_TIMEOUT', '120'))
+# Délai laissé aux requêtes en cours lors d'un arrêt (SIGTERM) ou d'un rechargement (SIGHUP)
+graceful_timeout = int(os.getenv('MCP_GRACEFUL_TIMEOUT', '60'))
+
+# Le serveur lit X-Forwarded-* uniquement depuis le reverse proxy local
+forwarded_allow_ips = os.getenv('MCP_FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+accesslog = os.getenv('MCP_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('MCP_LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    """Ferme proprement les connexions SSH et les pools à l'arrêt du worker"""
+    import mcp_server
+    mcp_server.shutdown_server()
@@ -40,7 +40,17 @@ show_help() {
 }
 
 get_server_pid() {
-    pgrep -f "mcp_server.py" || echo ""
+    # Processus maître Gunicorn (mcp_server:app) ou serveur de développement (mcp_server.py)
+    pgrep -o -f "mcp_server(\.py|:app)" || echo ""
+}
+
+# Commande de lancement : Gunicorn si disponible, sinon serveur de développement Flask
+server_command() {
+    if command -v gunicorn &> /dev/null; then
+        echo "gunicorn -c gunicorn.conf.py mcp_server:app"
+    else
+        echo "python3 mcp_server.py"
+    fi
 }
 
 start_server() {
@@ -52,7 +62,7 @@ start_server() {
 
     echo -e "${GREEN}Démarrage du serveur...${NC}"
     cd "$SCRIPT_DIR"
-    nohup python3 mcp_server.py > mcp_server.log 2>&1 &
+    nohup $(server_command) > mcp_server.log 2>&1 &
     sleep 2
 
     pid=$(get_server_pid)
@@ -75,8 +85,12 @@ stop_server() {
     fi
 
     echo -e "${YELLOW}Arrêt du serveur (PID: $pid)...${NC}"
+    # SIGTERM : Gunicorn laisse les requêtes en cours se terminer (graceful_timeout)
     kill "$pid"
-    sleep 2
+    for _ in $(seq 1 ${MCP_GRACEFUL_TIMEOUT:-60}); do
+        [ -z "$(get_server_pid)" ] && break
+        sleep 1
+    done
 
     if [ -z "$(get_server_pid)" ]; then
         echo -e "${GREEN}✓ Serveur arrêté${NC}"
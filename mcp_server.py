@@ -5,7 +5,7 @@ Serveur MCP pour GCP - Gestion d'infrastructure cloud avec SSH
 Permet de déployer et gérer des VMs GCP en langage naturel via Claude
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
@@ -14,20 +14,46 @@ from decimal import Decimal
 import datetime
 from pathlib import Path
 import base64
+import hashlib
+import posixpath
+import queue
+import re
+import select
+import shlex
+import signal
+import socket
+import subprocess
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from stat import S_IMODE, S_ISDIR, S_ISREG
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait as wait_futures
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 # GCP imports
 from google.cloud import compute_v1
 from google.oauth2 import service_account
+from google.auth.transport.requests import Request as GoogleAuthRequest
 
 # SSH imports
 import paramiko
 from paramiko import SSHClient, AutoAddPolicy
 from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519, rsa
 from cryptography.hazmat.backends import default_backend
 
 # Terraform imports
-from python_terraform import Terraform
+from python_terraform import IsFlagged, IsNotFlagged, Terraform
+
+# Encodeur JSON rapide (optionnel)
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 load_dotenv()
 
@@ -38,51 +64,419 @@ CORS(app)
 GCP_PROJECT_ID = os.getenv('GCP_PROJECT_ID', '')
 GCP_ZONE = os.getenv('GCP_ZONE', 'us-central1-a')
 SERVICE_ACCOUNT_FILE = os.getenv('SERVICE_ACCOUNT_FILE', '')
+# Marge (secondes) avant expiration à laquelle le jeton OAuth est rafraîchi
+GCP_TOKEN_REFRESH_MARGIN = int(os.getenv('GCP_TOKEN_REFRESH_MARGIN', '300'))
+# Transport utilisé par les clients Compute (seul 'rest' est supporté par compute_v1)
+GCP_CLIENT_TRANSPORT = os.getenv('GCP_CLIENT_TRANSPORT', 'rest')
+# Projets interrogés par la liste agrégée (séparés par des virgules, défaut: GCP_PROJECT_ID)
+GCP_PROJECT_IDS = [
+    project.strip() for project in os.getenv('GCP_PROJECT_IDS', '').split(',') if project.strip()
+] or [GCP_PROJECT_ID]
+GCP_LIST_PAGE_SIZE = int(os.getenv('GCP_LIST_PAGE_SIZE', '500'))
+GCP_LIST_CONCURRENCY = int(os.getenv('GCP_LIST_CONCURRENCY', '8'))
+# Nombre d'opérations simultanées des outils gcp_bulk_*
+GCP_BULK_CONCURRENCY = int(os.getenv('GCP_BULK_CONCURRENCY', '10'))
+# Suivi des opérations Compute (attente côté serveur et interrogation avec backoff)
+OPERATION_WAIT_TIMEOUT = float(os.getenv('OPERATION_WAIT_TIMEOUT', '300'))
+OPERATION_POLL_INITIAL = float(os.getenv('OPERATION_POLL_INITIAL', '1'))
+OPERATION_POLL_MAX = float(os.getenv('OPERATION_POLL_MAX', '15'))
+OPERATION_HISTORY_SIZE = int(os.getenv('OPERATION_HISTORY_SIZE', '500'))
+# Durée de validité (secondes) du cache d'inventaire des instances (0 = désactivé)
+INSTANCE_CACHE_TTL = float(os.getenv('INSTANCE_CACHE_TTL', '30'))
+
+# Exécution des lots JSON-RPC
+JSONRPC_BATCH_WORKERS = int(os.getenv('JSONRPC_BATCH_WORKERS', '8'))
+JSONRPC_BATCH_TIMEOUT = float(os.getenv('JSONRPC_BATCH_TIMEOUT', '600'))
+JSONRPC_ITEM_TIMEOUT = float(os.getenv('JSONRPC_ITEM_TIMEOUT', '300'))
+
+# Outils MCP : délai par défaut (secondes) et appels simultanés par classe d'outils
+TOOL_TIMEOUT_GCP = float(os.getenv('TOOL_TIMEOUT_GCP', '600'))
+TOOL_TIMEOUT_SSH = float(os.getenv('TOOL_TIMEOUT_SSH', '900'))
+TOOL_TIMEOUT_TERRAFORM = float(os.getenv('TOOL_TIMEOUT_TERRAFORM', '3600'))
+TOOL_CONCURRENCY_GCP = int(os.getenv('TOOL_CONCURRENCY_GCP', '16'))
+TOOL_CONCURRENCY_SSH = int(os.getenv('TOOL_CONCURRENCY_SSH', '32'))
+TOOL_CONCURRENCY_TERRAFORM = int(os.getenv('TOOL_CONCURRENCY_TERRAFORM', '4'))
+# Lectures d'état Terraform (terraform_state_query) : limite distincte des plan/apply/destroy
+TOOL_TIMEOUT_TERRAFORM_STATE = float(os.getenv('TOOL_TIMEOUT_TERRAFORM_STATE', '300'))
+TOOL_CONCURRENCY_TERRAFORM_STATE = int(os.getenv('TOOL_CONCURRENCY_TERRAFORM_STATE', '8'))
+# Résultats des outils en lecture seule (cacheable) réutilisés pendant TOOL_RESULT_CACHE_TTL secondes (0 = désactivé)
+TOOL_RESULT_CACHE_TTL = float(os.getenv('TOOL_RESULT_CACHE_TTL', '5'))
+TOOL_RESULT_CACHE_SIZE = int(os.getenv('TOOL_RESULT_CACHE_SIZE', '256'))
+
+# Encodage JSON des réponses : 'auto' (orjson si installé), 'orjson' ou 'json'
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto')
+# Résultats d'outils indentés par défaut (sinon uniquement sur demande via _meta.pretty)
+JSON_PRETTY = os.getenv('JSON_PRETTY', 'false').lower() in ('1', 'true', 'yes')
+
+# Pool de connexions SSH
+SSH_CONNECT_TIMEOUT = float(os.getenv('SSH_CONNECT_TIMEOUT', '10'))
+SSH_POOL_IDLE_TIMEOUT = float(os.getenv('SSH_POOL_IDLE_TIMEOUT', '300'))
+SSH_POOL_MAX_PER_HOST = int(os.getenv('SSH_POOL_MAX_PER_HOST', '4'))
+SSH_POOL_MAX_CHANNELS = int(os.getenv('SSH_POOL_MAX_CHANNELS', '8'))
+SSH_POOL_ACQUIRE_TIMEOUT = float(os.getenv('SSH_POOL_ACQUIRE_TIMEOUT', '30'))
+SSH_KEEPALIVE_INTERVAL = int(os.getenv('SSH_KEEPALIVE_INTERVAL', '30'))
+
+# Sortie des commandes SSH : seuls le début et la fin sont conservés au-delà du budget
+SSH_OUTPUT_HEAD_BYTES = int(os.getenv('SSH_OUTPUT_HEAD_BYTES', str(256 * 1024)))
+SSH_OUTPUT_TAIL_BYTES = int(os.getenv('SSH_OUTPUT_TAIL_BYTES', str(256 * 1024)))
+SSH_READ_CHUNK_SIZE = 32768
+SSH_PROGRESS_INTERVAL = float(os.getenv('SSH_PROGRESS_INTERVAL', '1'))
+
+# Exécution SSH sur plusieurs hôtes
+SSH_FANOUT_CONCURRENCY = int(os.getenv('SSH_FANOUT_CONCURRENCY', '20'))
+SSH_FANOUT_TIMEOUT = float(os.getenv('SSH_FANOUT_TIMEOUT', '60'))
+
+# Transferts SFTP : fichiers découpés en parts réparties sur plusieurs canaux SFTP
+SFTP_PART_SIZE = int(os.getenv('SFTP_PART_SIZE', str(8 * 1024 * 1024)))
+SFTP_CONCURRENCY = int(os.getenv('SFTP_CONCURRENCY', '4'))
+SFTP_WINDOW_SIZE = int(os.getenv('SFTP_WINDOW_SIZE', str(16 * 1024 * 1024)))
+SFTP_REQUEST_SIZE = 32768
+SFTP_IO_SIZE = 1024 * 1024
+SFTP_PARTIAL_SUFFIX = ".mcp-part"
+
+# Synchronisation de répertoires : manifeste distant et archive compressée des fichiers modifiés
+SSH_SYNC_MANIFEST_MAX_BYTES = int(os.getenv('SSH_SYNC_MANIFEST_MAX_BYTES', str(64 * 1024 * 1024)))
+SSH_SYNC_COMPRESS_LEVEL = int(os.getenv('SSH_SYNC_COMPRESS_LEVEL', '6'))
+SSH_SYNC_MANIFEST_TIMEOUT = float(os.getenv('SSH_SYNC_MANIFEST_TIMEOUT', '300'))
+SSH_SYNC_LIST_LIMIT = 100
+
+# Cache de providers Terraform partagé par tous les répertoires de travail
+TF_PLUGIN_CACHE_DIR = Path(os.getenv(
+    'TF_PLUGIN_CACHE_DIR', str(Path.home() / ".terraform.d" / "plugin-cache")
+))
+
+# Plans Terraform enregistrés (terraform_plan -> terraform_apply)
+TF_PLAN_TTL = float(os.getenv('TF_PLAN_TTL', '3600'))
+TF_PLAN_MAX = int(os.getenv('TF_PLAN_MAX', '100'))
+
+# Tâches Terraform en arrière-plan
+TF_JOB_WORKERS = int(os.getenv('TF_JOB_WORKERS', '4'))
+TF_JOB_LOG_BYTES = int(os.getenv('TF_JOB_LOG_BYTES', str(1024 * 1024)))
+TF_JOB_HISTORY = int(os.getenv('TF_JOB_HISTORY', '100'))
+# Piles Terraform traitées simultanément par terraform_run_many
+TF_RUN_MANY_CONCURRENCY = int(os.getenv('TF_RUN_MANY_CONCURRENCY', '4'))
+# Cache des états Terraform analysés (terraform show -json), borné par la taille cumulée
+# du JSON source (l'état analysé et indexé occupe plusieurs fois cette taille en mémoire)
+TF_STATE_CACHE_MAX_JSON_BYTES = int(os.getenv('TF_STATE_CACHE_MAX_JSON_BYTES', str(256 * 1024 * 1024)))
+# Backend distant : durée de réutilisation de la version lue par « terraform state pull »
+TF_STATE_REMOTE_PROBE_TTL = float(os.getenv('TF_STATE_REMOTE_PROBE_TTL', '30'))
+# Attente maximale du verrou d'un répertoire de travail pour les appels synchrones
+TF_WORKDIR_LOCK_TIMEOUT = float(os.getenv('TF_WORKDIR_LOCK_TIMEOUT', '600'))
 
 # Répertoire pour stocker les clés SSH
 SSH_KEYS_DIR = Path.home() / ".ssh_mcp"
 SSH_KEYS_DIR.mkdir(exist_ok=True, mode=0o700)
 
-# Dictionnaire en mémoire pour les clés SSH
-ssh_keys_store = {}
+# Nombre maximal de clés privées déchiffrées gardées en mémoire
+SSH_KEY_CACHE_SIZE = int(os.getenv('SSH_KEY_CACHE_SIZE', '256'))
+
+# Pool de clés RSA pré-générées en arrière-plan (0 : génération à la demande)
+SSH_RSA_KEY_BITS = int(os.getenv('SSH_RSA_KEY_BITS', '2048'))
+SSH_KEY_POOL_SIZE = int(os.getenv('SSH_KEY_POOL_SIZE', '8'))
+SSH_KEY_POOL_LOW_WATER = int(os.getenv('SSH_KEY_POOL_LOW_WATER', '2'))
+
+# Index des métadonnées des clés SSH (sans clé privée), tenu à jour par store_ssh_key
+SSH_KEY_INDEX_FILE = SSH_KEYS_DIR / ".index.json"
+
+# ====================================================================
+# ENCODAGE JSON
+# ====================================================================
+
+USE_ORJSON = orjson is not None and JSON_BACKEND in ('auto', 'orjson')
+
+def _json_default(value):
+    """Convertit les types non natifs (Decimal, dates, ensembles)"""
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return str(value)
+
+def encode_json(data, pretty=False):
+    """Encode une valeur en JSON UTF-8 (octets), compact sauf si pretty"""
+    if USE_ORJSON:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if pretty else 0)
+        try:
+            return orjson.dumps(data, default=_json_default, option=option)
+        except TypeError:
+            # Entiers hors 64 bits, récursion... : repli sur l'encodeur standard
+            pass
+    if pretty:
+        text = json.dumps(data, indent=2, ensure_ascii=False, default=_json_default)
+    else:
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_json_default)
+    return text.encode('utf-8')
+
+def encode_json_text(data, pretty=False):
+    """Encode une valeur en texte JSON"""
+    return encode_json(data, pretty).decode('utf-8')
+
+def decode_json(data):
+    """Décode un document JSON (octets), avec orjson s'il est disponible"""
+    if USE_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_response(payload, status=200):
+    """Réponse HTTP JSON encodée en une seule passe"""
+    return Response(encode_json(payload), status=status, mimetype="application/json")
 
 # ====================================================================
 # GESTION DES CLÉS SSH
 # ====================================================================
 
-def generate_ssh_key_pair(key_name):
-    """Génère une paire de clés SSH (privée/publique)"""
-    # Générer la clé privée
-    key = rsa.generate_private_key(
-        backend=default_backend(),
-        public_exponent=65537,
-        key_size=2048
-    )
+# Courbes ECDSA acceptées, par taille en bits
+ECDSA_CURVES = {256: ec.SECP256R1, 384: ec.SECP384R1, 521: ec.SECP521R1}
 
-    # Clé privée au format PEM
+def serialize_ssh_key_pair(key):
+    """Sérialise une clé privée (PEM) et sa clé publique (format OpenSSH)"""
+    # Ed25519 n'existe pas au format PEM traditionnel : format OpenSSH
+    private_format = (
+        serialization.PrivateFormat.OpenSSH
+        if isinstance(key, ed25519.Ed25519PrivateKey)
+        else serialization.PrivateFormat.TraditionalOpenSSL
+    )
     private_key = key.private_bytes(
         serialization.Encoding.PEM,
-        serialization.Format.TraditionalOpenSSL,
+        private_format,
         serialization.NoEncryption()
     ).decode('utf-8')
 
-    # Clé publique au format OpenSSH
     public_key = key.public_key().public_bytes(
         serialization.Encoding.OpenSSH,
-        serialization.Format.OpenSSH
+        serialization.PublicFormat.OpenSSH
     ).decode('utf-8')
 
     return private_key, public_key
 
+def generate_rsa_key_pair(bits=2048):
+    """Génère une paire de clés RSA sérialisée"""
+    key = rsa.generate_private_key(
+        backend=default_backend(),
+        public_exponent=65537,
+        key_size=bits
+    )
+    return serialize_ssh_key_pair(key)
+
+class RSAKeyPool:
+    """Réserve de paires RSA pré-générées, remplie en arrière-plan sous le seuil bas
+
+    Le thread de remplissage démarre à la première demande de clé, pas à
+    l'import du module (outils, benchmarks, processus maître gunicorn).
+    """
+
+    def __init__(self, size, low_water, bits):
+        self.size = size
+        self.low_water = min(low_water, size)
+        self.bits = bits
+        self._keys = deque()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._thread = None
+        self._stats = {"hits": 0, "misses": 0, "generated": 0, "generation_seconds": 0.0}
+
+    def start(self):
+        with self._condition:
+            if self.size > 0 and self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._refill, name="ssh-key-pool", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+
+    def _refill(self):
+        while True:
+            with self._condition:
+                while not self._stopped and len(self._keys) > self.low_water:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+            # Remplissage jusqu'à la taille cible, génération hors verrou
+            while True:
+                with self._condition:
+                    if self._stopped or len(self._keys) >= self.size:
+                        break
+                started = time.monotonic()
+                key_pair = generate_rsa_key_pair(self.bits)
+                with self._condition:
+                    self._keys.append(key_pair)
+                    self._stats["generated"] += 1
+                    self._stats["generation_seconds"] += time.monotonic() - started
+
+    def take(self):
+        """Renvoie une paire pré-générée, ou en génère une si la réserve est vide"""
+        self.start()
+        with self._condition:
+            key_pair = self._keys.popleft() if self._keys else None
+            self._stats["hits" if key_pair else "misses"] += 1
+            if len(self._keys) <= self.low_water:
+                self._condition.notify_all()
+        return key_pair or generate_rsa_key_pair(self.bits)
+
+    def stats(self):
+        with self._condition:
+            stats = dict(self._stats)
+            stats["depth"] = len(self._keys)
+        generation_seconds = stats.pop("generation_seconds")
+        stats.update({
+            "size": self.size,
+            "low_water": self.low_water,
+            "bits": self.bits,
+            "refill_keys_per_second": round(stats["generated"] / generation_seconds, 2) if generation_seconds else None
+        })
+        return stats
+
+rsa_key_pool = RSAKeyPool(SSH_KEY_POOL_SIZE, SSH_KEY_POOL_LOW_WATER, SSH_RSA_KEY_BITS)
+
+def generate_ssh_key_pair(key_name, key_type="rsa", bits=None):
+    """Génère une paire de clés SSH (privée/publique) : rsa, ed25519 ou ecdsa"""
+    if key_type == "rsa":
+        # Taille par défaut : clé prise dans la réserve pré-générée
+        if bits is None or bits == rsa_key_pool.bits:
+            return rsa_key_pool.take()
+        if bits < 2048:
+            raise ValueError("Taille de clé RSA minimale : 2048 bits")
+        return generate_rsa_key_pair(bits)
+
+    if key_type == "ed25519":
+        return serialize_ssh_key_pair(ed25519.Ed25519PrivateKey.generate())
+
+    if key_type == "ecdsa":
+        curve = ECDSA_CURVES.get(bits or 256)
+        if curve is None:
+            raise ValueError(f"Taille de clé ECDSA invalide : {bits} (256, 384 ou 521)")
+        return serialize_ssh_key_pair(ec.generate_private_key(curve(), default_backend()))
+
+    raise ValueError(f"Type de clé '{key_type}' non supporté (rsa, ed25519, ecdsa)")
+
+def ssh_public_key_info(public_key):
+    """Type et empreinte SHA256 (format ssh-keygen) d'une clé publique OpenSSH"""
+    parts = public_key.split()
+    if len(parts) < 2:
+        return None, None
+    try:
+        blob = base64.b64decode(parts[1])
+    except ValueError:
+        return parts[0], None
+    digest = base64.b64encode(hashlib.sha256(blob).digest()).decode('ascii').rstrip("=")
+    return parts[0], f"SHA256:{digest}"
+
+def is_ssh_key_name(name):
+    """Nom de clé acceptable : un fichier du répertoire des clés, hors index et clés publiques"""
+    return bool(name) and "/" not in name and not name.startswith(".") and not name.endswith(".pub")
+
+class SSHKeyIndex:
+    """Index sur disque des métadonnées des clés SSH (nom, type, empreinte, description, dates)
+
+    L'index est chargé une fois puis servi depuis la mémoire. Les fichiers ajoutés ou
+    supprimés à la main sont pris en compte lorsque la date de modification du
+    répertoire change : seuls les noms nouveaux sont alors lus.
+    """
+
+    def __init__(self, keys_dir, index_file):
+        self.keys_dir = keys_dir
+        self.index_file = index_file
+        self._lock = threading.RLock()
+        self._keys = None
+        self._dir_mtime_ns = None
+        self._stats = {"loads": 0, "rescans": 0, "writes": 0}
+
+    def _entry_from_disk(self, key_name, description, created_at=None):
+        private_key_file = self.keys_dir / key_name
+        public_key = (self.keys_dir / f"{key_name}.pub").read_text()
+        key_type, fingerprint = ssh_public_key_info(public_key)
+        stat = private_key_file.stat()
+        return {
+            "public_key": public_key,
+            "type": key_type,
+            "fingerprint": fingerprint,
+            "description": description,
+            "created_at": created_at or datetime.datetime.fromtimestamp(stat.st_mtime).isoformat(),
+            "mtime_ns": stat.st_mtime_ns
+        }
+
+    def _save(self):
+        temporary_file = self.index_file.with_name(self.index_file.name + ".tmp")
+        temporary_file.write_bytes(encode_json({"version": 1, "keys": self._keys}))
+        temporary_file.chmod(0o600)
+        os.replace(temporary_file, self.index_file)
+        self._stats["writes"] += 1
+        self._dir_mtime_ns = self.keys_dir.stat().st_mtime_ns
+
+    def _rescan(self):
+        """Réconcilie l'index avec le contenu du répertoire (seules les nouvelles clés sont lues)"""
+        names = {
+            entry.name for entry in os.scandir(self.keys_dir)
+            if entry.is_file() and is_ssh_key_name(entry.name)
+        }
+        changed = False
+        for key_name in set(self._keys) - names:
+            del self._keys[key_name]
+            changed = True
+        for key_name in names - set(self._keys):
+            if (self.keys_dir / f"{key_name}.pub").is_file():
+                self._keys[key_name] = self._entry_from_disk(key_name, "Loaded from disk")
+                changed = True
+        self._stats["rescans"] += 1
+        if changed:
+            self._save()
+        else:
+            self._dir_mtime_ns = self.keys_dir.stat().st_mtime_ns
+
+    def _ensure_loaded(self, check_dir=True):
+        if self._keys is None:
+            try:
+                self._keys = decode_json(self.index_file.read_bytes())["keys"]
+                self._stats["loads"] += 1
+            except (OSError, ValueError, KeyError):
+                self._keys = {}
+            self._rescan()
+        elif check_dir and self.keys_dir.stat().st_mtime_ns != self._dir_mtime_ns:
+            self._rescan()
+
+    def put(self, key_name, description=""):
+        """Enregistre (ou met à jour) les métadonnées d'une clé écrite sur disque"""
+        with self._lock:
+            # Les fichiers viennent d'être écrits : la date du répertoire a changé de notre fait
+            self._ensure_loaded(check_dir=False)
+            previous = self._keys.get(key_name)
+            # Remplacer une clé conserve sa date de création d'origine
+            created_at = previous["created_at"] if previous else datetime.datetime.now().isoformat()
+            self._keys[key_name] = self._entry_from_disk(key_name, description, created_at)
+            self._save()
+            return self._keys[key_name]
+
+    def get(self, key_name):
+        with self._lock:
+            self._ensure_loaded()
+            return self._keys.get(key_name)
+
+    def all(self):
+        with self._lock:
+            self._ensure_loaded()
+            return dict(self._keys)
+
+    def count(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._keys)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["keys"] = len(self._keys) if self._keys is not None else None
+            return stats
+
+ssh_key_index = SSHKeyIndex(SSH_KEYS_DIR, SSH_KEY_INDEX_FILE)
+
 def store_ssh_key(key_name, private_key, public_key, description=""):
     """Stocke une clé SSH de manière sécurisée"""
-    # Stocker en mémoire
-    ssh_keys_store[key_name] = {
-        "private_key": private_key,
-        "public_key": public_key,
-        "description": description,
-        "created_at": datetime.datetime.now().isoformat()
-    }
+    if not is_ssh_key_name(key_name):
+        raise ValueError(f"Nom de clé SSH invalide : '{key_name}'")
 
     # Stocker sur disque de manière sécurisée
     private_key_file = SSH_KEYS_DIR / f"{key_name}"
@@ -94,95 +488,429 @@ def store_ssh_key(key_name, private_key, public_key, description=""):
     public_key_file.write_text(public_key)
     public_key_file.chmod(0o644)
 
-    return True
-
-def load_ssh_key(key_name):
-    """Charge une clé SSH depuis le stockage"""
-    if key_name in ssh_keys_store:
-        return ssh_keys_store[key_name]
-
-    # Essayer de charger depuis le disque
-    private_key_file = SSH_KEYS_DIR / key_name
-    public_key_file = SSH_KEYS_DIR / f"{key_name}.pub"
+    # Métadonnées dans l'index, la clé privée reste sur disque
+    ssh_key_index.put(key_name, description)
 
-    if private_key_file.exists() and public_key_file.exists():
-        private_key = private_key_file.read_text()
-        public_key = public_key_file.read_text()
+    private_key_cache.invalidate(key_name)
 
-        ssh_keys_store[key_name] = {
-            "private_key": private_key,
-            "public_key": public_key,
-            "description": "Loaded from disk",
-            "created_at": datetime.datetime.fromtimestamp(
-                private_key_file.stat().st_ctime
-            ).isoformat()
-        }
+    # Les connexions ouvertes avec l'ancienne version de la clé ne sont plus réutilisées
+    ssh_pool.discard_key(key_name)
 
-        return ssh_keys_store[key_name]
+    return True
 
-    return None
+def load_ssh_key(key_name):
+    """Charge les métadonnées d'une clé SSH depuis l'index"""
+    return ssh_key_index.get(key_name)
+
+class PrivateKeyCache:
+    """Cache LRU borné des clés privées déjà parsées (paramiko.PKey)
+
+    Une entrée est invalidée dès que le fichier de la clé change
+    (mtime ou taille), ce qui couvre les clés remplacées sur disque.
+    """
+
+    def __init__(self, keys_dir, max_size=256):
+        self.keys_dir = keys_dir
+        self.max_size = max_size
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, key_name):
+        """Retourne la clé privée parsée, ou None si elle n'existe pas"""
+        private_key_file = self.keys_dir / key_name
+        try:
+            stat = private_key_file.stat()
+        except FileNotFoundError:
+            self.invalidate(key_name)
+            return None
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            cached = self._keys.get(key_name)
+            if cached is not None and cached[0] == signature:
+                self._keys.move_to_end(key_name)
+                self._stats["hits"] += 1
+                return cached[1]
+            self._stats["misses"] += 1
+
+        # Le type de clé (RSA, Ed25519, ECDSA) est détecté à partir du contenu
+        pkey = paramiko.PKey.from_path(private_key_file)
+
+        with self._lock:
+            self._keys[key_name] = (signature, pkey)
+            self._keys.move_to_end(key_name)
+            while len(self._keys) > self.max_size:
+                self._keys.popitem(last=False)
+                self._stats["evictions"] += 1
+        return pkey
+
+    def invalidate(self, key_name):
+        """Oublie la clé parsée associée à un nom"""
+        with self._lock:
+            if self._keys.pop(key_name, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def stats(self):
+        """Statistiques du cache de clés privées"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["size"] = len(self._keys)
+            stats["max_size"] = self.max_size
+            return stats
+
+private_key_cache = PrivateKeyCache(SSH_KEYS_DIR, SSH_KEY_CACHE_SIZE)
+
+def load_private_key(key_name):
+    """Charge la clé privée parsée d'une clé SSH (via le cache LRU)"""
+    return private_key_cache.get(key_name)
 
 def list_ssh_keys():
     """Liste toutes les clés SSH disponibles"""
-    # Charger toutes les clés du disque
-    for key_file in SSH_KEYS_DIR.glob("*"):
-        if not key_file.name.endswith(".pub") and key_file.is_file():
-            key_name = key_file.name
-            if key_name not in ssh_keys_store:
-                load_ssh_key(key_name)
-
     # Retourner la liste sans les clés privées (pour la sécurité)
     return {
         name: {
             "public_key": info["public_key"],
+            "type": info.get("type"),
+            "fingerprint": info.get("fingerprint"),
             "description": info.get("description", ""),
             "created_at": info.get("created_at", "")
         }
-        for name, info in ssh_keys_store.items()
+        for name, info in ssh_key_index.all().items()
     }
 
 # ====================================================================
 # FONCTIONS GCP COMPUTE ENGINE
 # ====================================================================
 
+class GCPClientManager:
+    """Partage les credentials et les clients Compute entre tous les appels (thread-safe)"""
+
+    def __init__(self, service_account_file, refresh_margin=300):
+        self.service_account_file = service_account_file
+        self.refresh_margin = datetime.timedelta(seconds=refresh_margin)
+        self._credentials = None
+        self._clients = {}
+        self._lock = threading.RLock()
+        self._stats = {
+            "credential_loads": 0,
+            "token_refreshes": 0,
+            "client_hits": 0,
+            "client_misses": 0
+        }
+
+    def _token_expiring(self):
+        """Indique si le jeton est absent ou expire dans la marge configurée"""
+        credentials = self._credentials
+        if not credentials.token or credentials.expiry is None:
+            return True
+        # google-auth stocke l'expiration en UTC naïf
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return credentials.expiry - self.refresh_margin <= now
+
+    def get_credentials(self):
+        """Retourne les credentials partagés, rafraîchis avant leur expiration"""
+        with self._lock:
+            if self._credentials is None:
+                self._credentials = service_account.Credentials.from_service_account_file(
+                    self.service_account_file,
+                    scopes=['https://www.googleapis.com/auth/cloud-platform']
+                )
+                self._stats["credential_loads"] += 1
+
+            if self._token_expiring():
+                self._credentials.refresh(GoogleAuthRequest())
+                self._stats["token_refreshes"] += 1
+
+            return self._credentials
+
+    def get_client(self, client_class, project_id=None, transport=None):
+        """Retourne un client réutilisé par (classe, projet, transport)"""
+        transport = transport or GCP_CLIENT_TRANSPORT
+        key = (client_class.__name__, project_id or GCP_PROJECT_ID, transport)
+        credentials = self.get_credentials()
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._stats["client_hits"] += 1
+                return client
+
+            self._stats["client_misses"] += 1
+            client = client_class(credentials=credentials, transport=transport)
+            self._clients[key] = client
+            return client
+
+    def reset(self):
+        """Oublie les credentials et clients (rechargés au prochain appel)"""
+        with self._lock:
+            self._credentials = None
+            self._clients.clear()
+
+    def stats(self):
+        """Statistiques du pool de clients"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["clients"] = len(self._clients)
+            stats["token_expiry"] = (
+                self._credentials.expiry.isoformat()
+                if self._credentials is not None and self._credentials.expiry else None
+            )
+            return stats
+
+gcp_client_manager = GCPClientManager(SERVICE_ACCOUNT_FILE, GCP_TOKEN_REFRESH_MARGIN)
+
 def get_gcp_credentials():
     """Obtient les credentials GCP"""
-    credentials = service_account.Credentials.from_service_account_file(
-        SERVICE_ACCOUNT_FILE,
-        scopes=['https://www.googleapis.com/auth/cloud-platform']
-    )
-    return credentials
+    return gcp_client_manager.get_credentials()
 
-def list_instances(zone=None, project_id=None):
-    """Liste toutes les instances VM dans GCP"""
+def get_instances_client(project_id=None):
+    """Obtient le client Compute Instances partagé pour un projet"""
+    return gcp_client_manager.get_client(compute_v1.InstancesClient, project_id)
+
+def instance_summary(instance, zone):
+    """Résumé d'une instance tel que renvoyé par les outils de liste"""
+    return {
+        "name": instance.name,
+        "zone": zone,
+        "machine_type": instance.machine_type.split('/')[-1],
+        "status": instance.status,
+        "internal_ip": instance.network_interfaces[0].network_i_p if instance.network_interfaces else None,
+        "external_ip": instance.network_interfaces[0].access_configs[0].nat_i_p if instance.network_interfaces and instance.network_interfaces[0].access_configs else None,
+        "labels": dict(instance.labels),
+    }
+
+class InstanceInventoryCache:
+    """Cache d'inventaire des instances par (projet, zone), avec durée de validité
+
+    Les listes de zone et les détails d'instance sont conservés séparément ;
+    les opérations de modification invalident les entrées concernées.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._zones = {}
+        self._details = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def _fresh(self, fetched_at):
+        return self.ttl > 0 and time.monotonic() - fetched_at < self.ttl
+
+    def get_zone(self, project_id, zone):
+        """Retourne (instances, âge en secondes) ou None si absent ou expiré"""
+        with self._lock:
+            entry = self._zones.get((project_id, zone))
+            if entry is None or not self._fresh(entry[0]):
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return [dict(info) for info in entry[1].values()], time.monotonic() - entry[0]
+
+    def put_zone(self, project_id, zone, instances):
+        with self._lock:
+            self._zones[(project_id, zone)] = (
+                time.monotonic(),
+                {info["name"]: dict(info) for info in instances}
+            )
+
+    def get_instance(self, project_id, zone, instance_name):
+        """Retourne (détails, âge en secondes) ou None si absent ou expiré"""
+        with self._lock:
+            entry = self._details.get((project_id, zone, instance_name))
+            if entry is None or not self._fresh(entry[0]):
+                self._stats["misses"] += 1
+                return None
+            self._stats["hits"] += 1
+            return dict(entry[1]), time.monotonic() - entry[0]
+
+    def put_instance(self, project_id, zone, details):
+        with self._lock:
+            self._details[(project_id, zone, details["name"])] = (time.monotonic(), dict(details))
+
+    def invalidate_instance(self, project_id, zone, instance_name):
+        """Invalide une instance et la liste de sa zone après une modification"""
+        with self._lock:
+            self._details.pop((project_id, zone, instance_name), None)
+            self._zones.pop((project_id, zone), None)
+            self._stats["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._zones.clear()
+            self._details.clear()
+
+    def stats(self):
+        """Statistiques du cache d'inventaire"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["ttl"] = self.ttl
+            stats["zones"] = len(self._zones)
+            stats["instances"] = len(self._details)
+            return stats
+
+instance_cache = InstanceInventoryCache(INSTANCE_CACHE_TTL)
+
+def list_instances_cached(zone=None, project_id=None, force_refresh=False):
+    """Liste les instances d'une zone en passant par le cache d'inventaire"""
     if not zone:
         zone = GCP_ZONE
     if not project_id:
         project_id = GCP_PROJECT_ID
 
-    credentials = get_gcp_credentials()
-    instance_client = compute_v1.InstancesClient(credentials=credentials)
+    if not force_refresh:
+        cached = instance_cache.get_zone(project_id, zone)
+        if cached is not None:
+            instances, age = cached
+            return {"instances": instances, "from_cache": True, "cache_age_seconds": round(age, 1)}
+
+    instance_client = get_instances_client(project_id)
 
     instances_list = instance_client.list(project=project_id, zone=zone)
 
+    instances = [instance_summary(instance, zone) for instance in instances_list]
+
+    instance_cache.put_zone(project_id, zone, instances)
+    return {"instances": instances, "from_cache": False, "cache_age_seconds": 0}
+
+def list_instances(zone=None, project_id=None, force_refresh=False):
+    """Liste toutes les instances VM dans GCP"""
+    return list_instances_cached(zone, project_id, force_refresh)["instances"]
+
+def filter_instances(instances, status=None, labels=None, name_prefix=None):
+    """Filtre une liste d'instances (statut, labels, préfixe du nom) côté serveur"""
+    return [
+        instance for instance in instances
+        if (not status or instance["status"] == status)
+        and (not name_prefix or instance["name"].startswith(name_prefix))
+        and all(instance.get("labels", {}).get(key) == str(value) for key, value in (labels or {}).items())
+    ]
+
+def glob_to_regex(pattern):
+    """Convertit un motif de nom (* et ?) en expression régulière RE2"""
+    return "".join(
+        ".*" if char == "*" else "." if char == "?" else re.escape(char)
+        for char in pattern
+    )
+
+def build_instance_filter(status=None, labels=None, name_prefix=None, name_pattern=None):
+    """Construit une expression de filtre Compute, évaluée côté API
+
+    Utilise la syntaxe eq/ne (expressions régulières RE2) pour pouvoir
+    combiner statut, labels et motif de nom dans une même expression.
+    """
+    expressions = []
+    if status:
+        expressions.append(f"(status eq {status})")
+    for key, value in (labels or {}).items():
+        expressions.append(f"(labels.{key} eq '{re.escape(str(value))}')")
+    if name_prefix:
+        expressions.append(f"(name eq '{re.escape(name_prefix)}.*')")
+    if name_pattern:
+        expressions.append(f"(name eq '{glob_to_regex(name_pattern)}')")
+    return " ".join(expressions)
+
+def encode_list_cursor(state):
+    """Encode l'état de pagination en curseur opaque"""
+    return base64.urlsafe_b64encode(json.dumps(state).encode('utf-8')).decode('ascii')
+
+def decode_list_cursor(cursor):
+    """Décode un curseur produit par encode_list_cursor"""
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Curseur de pagination invalide")
+
+def _aggregated_instances_page(project_id, filter_expression, page_size, page_token, zone=None):
+    """Récupère une page de la liste agrégée (toutes zones, ou la seule zone indiquée) d'un projet"""
+    instance_client = get_instances_client(project_id)
+    list_request = compute_v1.AggregatedListInstancesRequest(
+        project=project_id,
+        filter=filter_expression,
+        max_results=page_size,
+        page_token=page_token or "",
+        return_partial_success=True
+    )
+    page = next(iter(instance_client.aggregated_list(request=list_request).pages))
+
     instances = []
-    for instance in instances_list:
-        instance_info = {
-            "name": instance.name,
+    for scope, scoped_list in page.items.items():
+        if zone and scope != f"zones/{zone}":
+            continue
+        for instance in scoped_list.instances:
+            instance_info = instance_summary(instance, scope.split('/')[-1])
+            instance_info["project"] = project_id
+            instances.append(instance_info)
+
+    return instances, page.next_page_token or None, list(page.unreachables)
+
+def list_instances_aggregated(projects=None, status=None, labels=None, name_prefix=None,
+                              filter_expression=None, page_size=None, cursor=None, zone=None):
+    """Liste les instances de toutes les zones de plusieurs projets, page par page
+
+    Les projets sont interrogés en parallèle et chacun renvoie au plus
+    page_size instances par page. Le curseur renvoyé (nextCursor) conserve
+    le filtre, la zone et les jetons de page des projets non terminés.
+    """
+    if cursor:
+        state = decode_list_cursor(cursor)
+    else:
+        if filter_expression is None:
+            filter_expression = build_instance_filter(status, labels, name_prefix)
+        state = {
+            "filter": filter_expression,
             "zone": zone,
-            "machine_type": instance.machine_type.split('/')[-1],
-            "status": instance.status,
-            "internal_ip": instance.network_interfaces[0].network_i_p if instance.network_interfaces else None,
-            "external_ip": instance.network_interfaces[0].access_configs[0].nat_i_p if instance.network_interfaces and instance.network_interfaces[0].access_configs else None,
+            "page_size": min(page_size or GCP_LIST_PAGE_SIZE, 500),
+            "tokens": {project: None for project in (projects or GCP_PROJECT_IDS)}
         }
-        instances.append(instance_info)
 
-    return instances
+    tokens = state["tokens"]
+    instances = []
+    next_tokens = {}
+    unreachable = []
+    errors = {}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(GCP_LIST_CONCURRENCY, len(tokens)))) as executor:
+        futures = {
+            executor.submit(
+                _aggregated_instances_page,
+                project, state["filter"], state["page_size"], token, state.get("zone")
+            ): project
+            for project, token in tokens.items()
+        }
+        for future in as_completed(futures):
+            project = futures[future]
+            try:
+                project_instances, next_token, project_unreachable = future.result()
+            except Exception as e:
+                errors[project] = str(e)
+                continue
+            instances.extend(project_instances)
+            unreachable.extend(project_unreachable)
+            if next_token:
+                next_tokens[project] = next_token
+
+    instances.sort(key=lambda info: (info["project"], info["zone"], info["name"]))
+    next_cursor = None
+    if next_tokens:
+        next_cursor = encode_list_cursor(dict(state, tokens=next_tokens))
 
-def create_instance(instance_name, machine_type="e2-medium", disk_size_gb=10, image_family="debian-11", ssh_key_name=None):
+    return {
+        "instances": instances,
+        "count": len(instances),
+        "projects": list(tokens),
+        "filter": state["filter"],
+        "zone": state.get("zone"),
+        "nextCursor": next_cursor,
+        "unreachable": unreachable,
+        "errors": errors
+    }
+
+def create_instance(instance_name, machine_type="e2-medium", disk_size_gb=10, image_family="debian-11", ssh_key_name=None, wait=False, zone=None):
     """Crée une nouvelle instance VM dans GCP"""
-    credentials = get_gcp_credentials()
-    instance_client = compute_v1.InstancesClient(credentials=credentials)
+    if not zone:
+        zone = GCP_ZONE
+    instance_client = get_instances_client()
 
     # Configuration du disque
     disk = compute_v1.AttachedDisk()
@@ -206,7 +934,7 @@ def create_instance(instance_name, machine_type="e2-medium", disk_size_gb=10, im
     # Configuration de l'instance
     instance = compute_v1.Instance()
     instance.name = instance_name
-    instance.machine_type = f"zones/{GCP_ZONE}/machineTypes/{machine_type}"
+    instance.machine_type = f"zones/{zone}/machineTypes/{machine_type}"
     instance.disks = [disk]
     instance.network_interfaces = [network_interface]
 
@@ -224,24 +952,25 @@ def create_instance(instance_name, machine_type="e2-medium", disk_size_gb=10, im
     # Créer l'instance
     operation = instance_client.insert(
         project=GCP_PROJECT_ID,
-        zone=GCP_ZONE,
+        zone=zone,
         instance_resource=instance
     )
 
-    return {
+    instance_cache.invalidate_instance(GCP_PROJECT_ID, zone, instance_name)
+
+    return track_operation({
         "instance_name": instance_name,
         "operation": operation.name,
         "status": "creating",
-        "zone": GCP_ZONE
-    }
+        "zone": zone
+    }, GCP_PROJECT_ID, zone, "insert", wait)
 
-def start_instance(instance_name, zone=None):
+def start_instance(instance_name, zone=None, wait=False):
     """Démarre une instance VM"""
     if not zone:
         zone = GCP_ZONE
 
-    credentials = get_gcp_credentials()
-    instance_client = compute_v1.InstancesClient(credentials=credentials)
+    instance_client = get_instances_client()
 
     operation = instance_client.start(
         project=GCP_PROJECT_ID,
@@ -249,19 +978,20 @@ def start_instance(instance_name, zone=None):
         instance=instance_name
     )
 
-    return {
+    instance_cache.invalidate_instance(GCP_PROJECT_ID, zone, instance_name)
+
+    return track_operation({
         "instance_name": instance_name,
         "operation": operation.name,
         "status": "starting"
-    }
+    }, GCP_PROJECT_ID, zone, "start", wait)
 
-def stop_instance(instance_name, zone=None):
+def stop_instance(instance_name, zone=None, wait=False):
     """Arrête une instance VM"""
     if not zone:
         zone = GCP_ZONE
 
-    credentials = get_gcp_credentials()
-    instance_client = compute_v1.InstancesClient(credentials=credentials)
+    instance_client = get_instances_client()
 
     operation = instance_client.stop(
         project=GCP_PROJECT_ID,
@@ -269,19 +999,20 @@ def stop_instance(instance_name, zone=None):
         instance=instance_name
     )
 
-    return {
+    instance_cache.invalidate_instance(GCP_PROJECT_ID, zone, instance_name)
+
+    return track_operation({
         "instance_name": instance_name,
         "operation": operation.name,
         "status": "stopping"
-    }
+    }, GCP_PROJECT_ID, zone, "stop", wait)
 
-def delete_instance(instance_name, zone=None):
+def delete_instance(instance_name, zone=None, wait=False):
     """Supprime une instance VM"""
     if not zone:
         zone = GCP_ZONE
 
-    credentials = get_gcp_credentials()
-    instance_client = compute_v1.InstancesClient(credentials=credentials)
+    instance_client = get_instances_client()
 
     operation = instance_client.delete(
         project=GCP_PROJECT_ID,
@@ -289,19 +1020,28 @@ def delete_instance(instance_name, zone=None):
         instance=instance_name
     )
 
-    return {
+    instance_cache.invalidate_instance(GCP_PROJECT_ID, zone, instance_name)
+
+    return track_operation({
         "instance_name": instance_name,
         "operation": operation.name,
         "status": "deleting"
-    }
+    }, GCP_PROJECT_ID, zone, "delete", wait)
 
-def get_instance_details(instance_name, zone=None):
+def get_instance_details(instance_name, zone=None, force_refresh=False):
     """Obtient les détails d'une instance"""
     if not zone:
         zone = GCP_ZONE
 
-    credentials = get_gcp_credentials()
-    instance_client = compute_v1.InstancesClient(credentials=credentials)
+    if not force_refresh:
+        cached = instance_cache.get_instance(GCP_PROJECT_ID, zone, instance_name)
+        if cached is not None:
+            details, age = cached
+            details["from_cache"] = True
+            details["cache_age_seconds"] = round(age, 1)
+            return details
+
+    instance_client = get_instances_client()
 
     instance = instance_client.get(
         project=GCP_PROJECT_ID,
@@ -309,7 +1049,7 @@ def get_instance_details(instance_name, zone=None):
         instance=instance_name
     )
 
-    return {
+    details = {
         "name": instance.name,
         "zone": zone,
         "machine_type": instance.machine_type.split('/')[-1],
@@ -325,12 +1065,635 @@ def get_instance_details(instance_name, zone=None):
             for disk in instance.disks
         ]
     }
+    instance_cache.put_instance(GCP_PROJECT_ID, zone, details)
+
+    details["from_cache"] = False
+    details["cache_age_seconds"] = 0
+    return details
+
+def resolve_bulk_targets(instance_names=None, name_pattern=None, labels=None, zone=None):
+    """Détermine les instances (nom, zone) visées par un outil gcp_bulk_*"""
+    if instance_names:
+        zone = zone or GCP_ZONE
+        return [(name, zone) for name in dict.fromkeys(instance_names)]
+    if not name_pattern and not labels:
+        raise ValueError("Indiquez 'instance_names', 'name_pattern' ou 'labels'")
+
+    filter_expression = build_instance_filter(labels=labels, name_pattern=name_pattern)
+    targets = []
+    cursor = None
+    while True:
+        page = list_instances_aggregated(
+            projects=[GCP_PROJECT_ID], filter_expression=filter_expression, cursor=cursor, zone=zone
+        )
+        if page["errors"]:
+            raise RuntimeError(page["errors"][GCP_PROJECT_ID])
+        targets.extend((instance["name"], instance["zone"]) for instance in page["instances"])
+        cursor = page["nextCursor"]
+        if not cursor:
+            return targets
+
+def run_bulk_operation(action, targets, operation, concurrency=None, wait=False):
+    """Applique une opération à plusieurs instances via un pool de workers borné
+
+    Les erreurs sont collectées par instance sans interrompre le lot ; si
+    wait est demandé, les opérations lancées sont attendues ensemble.
+    """
+    concurrency = concurrency or GCP_BULK_CONCURRENCY
+    started = time.monotonic()
+
+    def run(target):
+        instance_name, zone = target
+        item_started = time.monotonic()
+        item = {"instance_name": instance_name, "zone": zone}
+        try:
+            item["operation"] = operation(instance_name, zone)["operation"]
+            item["success"] = True
+        except Exception as e:
+            item["success"] = False
+            item["error"] = str(e)
+        item["duration_ms"] = round((time.monotonic() - item_started) * 1000, 1)
+        return item
+
+    results = []
+    if targets:
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(targets))) as executor:
+            results = list(executor.map(run, targets))
+
+    if wait:
+        operation_names = [item["operation"] for item in results if item["success"]]
+        if operation_names:
+            records = {
+                record["name"]: record
+                for record in operation_tracker.wait_many(operation_names)
+            }
+            for item in results:
+                record = records.get(item.get("operation"))
+                if record is None:
+                    continue
+                item["operation_status"] = record["status"]
+                if record["error"]:
+                    item["success"] = False
+                    item["error"] = record["error"]
+
+    succeeded = sum(1 for item in results if item["success"])
+    return {
+        "success": succeeded == len(results),
+        "action": action,
+        "summary": {
+            "requested": len(results),
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        },
+        "duration_ms": round((time.monotonic() - started) * 1000, 1),
+        "results": results
+    }
+
+class OperationTracker:
+    """Registre des opérations de zone Compute lancées par le serveur
+
+    Les opérations en attente sont interrogées par lots (une requête de
+    liste filtrée par zone) ; l'attente d'une opération unique utilise
+    l'endpoint wait de Compute, avec repli sur une interrogation à backoff
+    exponentiel.
+    """
+
+    def __init__(self, history_size=500):
+        self.history_size = history_size
+        self._operations = OrderedDict()
+        self._started = {}
+        self._lock = threading.Lock()
+
+    def register(self, project_id, zone, operation_name, kind="unknown", target=None):
+        """Enregistre une opération à suivre"""
+        with self._lock:
+            if operation_name not in self._operations:
+                self._operations[operation_name] = {
+                    "name": operation_name,
+                    "project": project_id,
+                    "zone": zone,
+                    "kind": kind,
+                    "target": target,
+                    "status": "PENDING",
+                    "progress": 0,
+                    "error": None,
+                    "submitted_at": datetime.datetime.now().isoformat(),
+                    "finished_at": None,
+                    "duration_seconds": None
+                }
+                self._started[operation_name] = time.monotonic()
+                self._trim()
+            return dict(self._operations[operation_name])
+
+    def _trim(self):
+        """Oublie les opérations terminées les plus anciennes au-delà de l'historique"""
+        excess = len(self._operations) - self.history_size
+        for name in list(self._operations):
+            if excess <= 0:
+                break
+            if self._operations[name]["status"] == "DONE":
+                del self._operations[name]
+                self._started.pop(name, None)
+                excess -= 1
+
+    def get(self, operation_name):
+        with self._lock:
+            record = self._operations.get(operation_name)
+            if record is None:
+                raise ValueError(f"Opération '{operation_name}' inconnue")
+            return dict(record)
+
+    def list(self, status=None):
+        with self._lock:
+            return [
+                dict(record) for record in self._operations.values()
+                if status is None or record["status"] == status
+            ]
+
+    def _update(self, operation):
+        """Met à jour un enregistrement à partir d'une compute_v1.Operation"""
+        status = operation.status.name if operation.status else "PENDING"
+        with self._lock:
+            record = self._operations.get(operation.name)
+            if record is None or record["status"] == "DONE":
+                return
+            record["status"] = status
+            record["progress"] = operation.progress
+            if status != "DONE":
+                return
+
+            record["finished_at"] = datetime.datetime.now().isoformat()
+            record["duration_seconds"] = round(
+                time.monotonic() - self._started.get(operation.name, time.monotonic()), 1
+            )
+            errors = [error.message for error in operation.error.errors]
+            if errors or operation.http_error_message:
+                record["error"] = "; ".join(errors) or operation.http_error_message
+            target = record["target"]
+            project_id, zone = record["project"], record["zone"]
+
+        # L'état de l'instance a changé : les entrées du cache ne sont plus valides
+        if target:
+            instance_cache.invalidate_instance(project_id, zone, target)
+
+    def poll(self, names=None):
+        """Interroge en lot les opérations non terminées (une requête par zone)"""
+        with self._lock:
+            groups = {}
+            for record in self._operations.values():
+                if record["status"] == "DONE" or (names is not None and record["name"] not in names):
+                    continue
+                groups.setdefault((record["project"], record["zone"]), []).append(record["name"])
+
+        for (project_id, zone), operation_names in groups.items():
+            client = get_zone_operations_client(project_id)
+            for index in range(0, len(operation_names), 50):
+                chunk = operation_names[index:index + 50]
+                pattern = "|".join(re.escape(name) for name in chunk)
+                list_request = compute_v1.ListZoneOperationsRequest(
+                    project=project_id,
+                    zone=zone,
+                    filter=f"name eq '({pattern})'"
+                )
+                for operation in client.list(request=list_request):
+                    self._update(operation)
+
+    def wait(self, operation_name, timeout=None):
+        """Attend la fin d'une opération (au plus timeout secondes)"""
+        timeout = OPERATION_WAIT_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        record = self.get(operation_name)
+        use_wait_endpoint = True
+        delay = OPERATION_POLL_INITIAL
+
+        while record["status"] != "DONE":
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            if use_wait_endpoint:
+                try:
+                    # L'endpoint wait rend la main à la fin de l'opération ou après ~2 minutes
+                    operation = get_zone_operations_client(record["project"]).wait(
+                        project=record["project"],
+                        zone=record["zone"],
+                        operation=operation_name,
+                        timeout=remaining
+                    )
+                    self._update(operation)
+                except Exception:
+                    use_wait_endpoint = False
+            else:
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, OPERATION_POLL_MAX)
+                self.poll([operation_name])
+
+            record = self.get(operation_name)
+
+        return record
+
+    def wait_many(self, operation_names, timeout=None):
+        """Attend la fin de plusieurs opérations en les interrogeant par lots"""
+        timeout = OPERATION_WAIT_TIMEOUT if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        delay = OPERATION_POLL_INITIAL
+        names = set(operation_names)
+
+        while True:
+            self.poll(names)
+            records = [self.get(name) for name in operation_names]
+            remaining = deadline - time.monotonic()
+            if all(record["status"] == "DONE" for record in records) or remaining <= 0:
+                return records
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, OPERATION_POLL_MAX)
+
+    def stats(self):
+        with self._lock:
+            stats = {"tracked": len(self._operations)}
+            for record in self._operations.values():
+                key = record["status"].lower()
+                stats[key] = stats.get(key, 0) + 1
+            return stats
+
+operation_tracker = OperationTracker(OPERATION_HISTORY_SIZE)
+
+def get_zone_operations_client(project_id=None):
+    """Obtient le client Compute ZoneOperations partagé pour un projet"""
+    return gcp_client_manager.get_client(compute_v1.ZoneOperationsClient, project_id)
+
+def track_operation(result, project_id, zone, kind, wait=False):
+    """Enregistre l'opération d'un outil de modification et l'attend si demandé"""
+    operation_tracker.register(
+        project_id, zone, result["operation"], kind, result["instance_name"]
+    )
+    if wait:
+        record = operation_tracker.wait(result["operation"])
+        result["operation_status"] = record["status"]
+        result["operation_error"] = record["error"]
+        result["duration_seconds"] = record["duration_seconds"]
+    return result
 
 # ====================================================================
 # FONCTIONS SSH
 # ====================================================================
 
-def execute_ssh_command(host, username, command, ssh_key_name):
+class SSHConnectionPool:
+    """Pool de connexions SSH réutilisables, indexé par (hôte, utilisateur, clé)
+
+    Chaque connexion est un paramiko.Transport authentifié sur lequel plusieurs
+    canaux (exec, SFTP) peuvent être ouverts en parallèle. Les connexions
+    inactives au-delà de idle_timeout sont fermées lors des accès suivants.
+    """
+
+    def __init__(self, idle_timeout=300, max_per_host=4, max_channels=8,
+                 keepalive=30, acquire_timeout=30):
+        self.idle_timeout = idle_timeout
+        self.max_per_host = max_per_host
+        self.max_channels = max_channels
+        self.keepalive = keepalive
+        self.acquire_timeout = acquire_timeout
+        self._connections = {}
+        self._connecting = {}
+        self._cond = threading.Condition()
+        self._stats = {
+            "created": 0,
+            "reused": 0,
+            "closed_idle": 0,
+            "closed_dead": 0,
+            "closed_evicted": 0,
+            "waits": 0,
+            "timeouts": 0
+        }
+
+    def _host_count(self, host):
+        """Nombre de connexions ouvertes ou en cours d'ouverture vers un hôte"""
+        opened = sum(
+            len(entries) for key, entries in self._connections.items() if key[0] == host
+        )
+        return opened + self._connecting.get(host, 0)
+
+    def _discard(self, key, entry, reason, closing):
+        """Retire une connexion du pool ; le client est ajouté à closing pour être fermé hors verrou"""
+        entries = self._connections.get(key, [])
+        if entry in entries:
+            entries.remove(entry)
+        if not entries:
+            self._connections.pop(key, None)
+        self._stats[reason] += 1
+        closing.append(entry["client"])
+        self._cond.notify_all()
+
+    @staticmethod
+    def _close_clients(clients):
+        """Ferme des connexions retirées du pool (E/S réseau, jamais sous le verrou)"""
+        for client in clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+
+    def _reap_idle(self, closing):
+        """Retire les connexions inactives depuis plus de idle_timeout"""
+        now = time.monotonic()
+        for key, entries in list(self._connections.items()):
+            for entry in list(entries):
+                if entry["channels"] == 0 and now - entry["last_used"] > self.idle_timeout:
+                    self._discard(key, entry, "closed_idle", closing)
+
+    def _evict_idle(self, host, closing):
+        """Retire la connexion inutilisée la plus ancienne vers un hôte (autre utilisateur ou clé)"""
+        idle = [
+            (entry["last_used"], key, entry)
+            for key, entries in self._connections.items() if key[0] == host
+            for entry in entries if entry["channels"] == 0
+        ]
+        if not idle:
+            return False
+        _, key, entry = min(idle, key=lambda item: item[0])
+        self._discard(key, entry, "closed_evicted", closing)
+        return True
+
+    def _probe(self, entry):
+        """Sonde un transport inutilisé depuis longtemps (E/S réseau, hors verrou)"""
+        try:
+            entry["client"].get_transport().send_ignore()
+            return True
+        except Exception:
+            return False
+
+    def _reserve(self, key, exclusive, deadline, closing):
+        """Réserve un canal ou une place de connexion ; appelé sous le verrou
+
+        Retourne (entrée, sonde) pour une connexion existante, sonde indiquant
+        qu'elle doit être vérifiée avant usage, ou (None, False) si l'appelant
+        doit ouvrir une nouvelle connexion.
+        """
+        host = key[0]
+        while True:
+            self._reap_idle(closing)
+            for entry in list(self._connections.get(key, [])):
+                if entry["stale"] or entry["channels"] >= self.max_channels:
+                    continue
+                if exclusive and entry["channels"] and self._host_count(host) < self.max_per_host:
+                    continue
+                transport = entry["client"].get_transport()
+                if transport is None or not transport.is_active():
+                    self._discard(key, entry, "closed_dead", closing)
+                    continue
+                now = time.monotonic()
+                probe = now - entry["last_used"] > self.keepalive
+                entry["channels"] += 1
+                entry["last_used"] = now
+                return entry, probe
+
+            if self._host_count(host) >= self.max_per_host:
+                # Limite atteinte : une connexion inactive d'une autre clé laisse sa place
+                self._evict_idle(host, closing)
+            if self._host_count(host) < self.max_per_host:
+                self._connecting[host] = self._connecting.get(host, 0) + 1
+                return None, False
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self._stats["timeouts"] += 1
+                raise TimeoutError(
+                    f"Aucune connexion SSH disponible vers {host} "
+                    f"(limite de {self.max_per_host} connexions atteinte)"
+                )
+            self._stats["waits"] += 1
+            self._cond.wait(remaining)
+
+    def acquire(self, key, connect, exclusive=False):
+        """Réserve un canal sur une connexion existante ou en ouvre une nouvelle
+
+        Avec exclusive, une connexion déjà occupée n'est partagée que si la
+        limite par hôte empêche d'en ouvrir une autre : les transferts
+        volumineux répartissent ainsi le chiffrement sur plusieurs transports.
+        Les sondes et fermetures de connexions se font hors verrou : un hôte
+        lent ne bloque pas les autres.
+        """
+        host = key[0]
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            closing = []
+            try:
+                with self._cond:
+                    entry, probe = self._reserve(key, exclusive, deadline, closing)
+            finally:
+                self._close_clients(closing)
+            if entry is None:
+                break
+            if not probe or self._probe(entry):
+                with self._cond:
+                    self._stats["reused"] += 1
+                return entry
+            self.release(key, entry, broken=True)
+
+        # La connexion (TCP + échange de clés + authentification) se fait hors verrou
+        try:
+            client = connect()
+            client.get_transport().set_keepalive(self.keepalive)
+        except Exception:
+            with self._cond:
+                self._connecting[host] -= 1
+                self._cond.notify_all()
+            raise
+
+        now = time.monotonic()
+        entry = {
+            "client": client,
+            "channels": 1,
+            "last_used": now,
+            "created_at": now,
+            "stale": False
+        }
+        with self._cond:
+            self._connecting[host] -= 1
+            self._connections.setdefault(key, []).append(entry)
+            self._stats["created"] += 1
+        return entry
+
+    def release(self, key, entry, broken=False):
+        """Libère le canal réservé ; ferme la connexion si elle est hors service"""
+        closing = []
+        with self._cond:
+            entry["channels"] -= 1
+            entry["last_used"] = time.monotonic()
+            transport = entry["client"].get_transport()
+            if broken or transport is None or not transport.is_active():
+                self._discard(key, entry, "closed_dead", closing)
+            elif entry["stale"] and entry["channels"] == 0:
+                self._discard(key, entry, "closed_idle", closing)
+            self._cond.notify_all()
+        self._close_clients(closing)
+
+    @contextmanager
+    def connection(self, host, username, ssh_key_name, connect, exclusive=False):
+        """Fournit un SSHClient connecté, rendu au pool en sortie de bloc"""
+        key = (host, username, ssh_key_name)
+        entry = self.acquire(key, connect, exclusive)
+        broken = False
+        try:
+            yield entry["client"]
+        except Exception:
+            transport = entry["client"].get_transport()
+            broken = transport is None or not transport.is_active()
+            raise
+        finally:
+            self.release(key, entry, broken)
+
+    def discard_key(self, ssh_key_name):
+        """Retire du pool les connexions ouvertes avec une clé donnée
+
+        Les connexions en cours d'utilisation sont fermées à leur libération.
+        """
+        closing = []
+        with self._cond:
+            for key, entries in list(self._connections.items()):
+                if key[2] != ssh_key_name:
+                    continue
+                for entry in list(entries):
+                    entry["stale"] = True
+                    if entry["channels"] == 0:
+                        self._discard(key, entry, "closed_idle", closing)
+        self._close_clients(closing)
+
+    def close_all(self):
+        """Ferme toutes les connexions du pool"""
+        closing = []
+        with self._cond:
+            for key, entries in list(self._connections.items()):
+                for entry in list(entries):
+                    self._discard(key, entry, "closed_idle", closing)
+        self._close_clients(closing)
+
+    def stats(self):
+        """Statistiques du pool de connexions SSH"""
+        closing = []
+        with self._cond:
+            self._reap_idle(closing)
+            stats = dict(self._stats)
+            hosts = {}
+            channels = 0
+            for key, entries in self._connections.items():
+                hosts[key[0]] = hosts.get(key[0], 0) + len(entries)
+                channels += sum(entry["channels"] for entry in entries)
+            stats["connections"] = sum(hosts.values())
+            stats["open_channels"] = channels
+            stats["connections_per_host"] = hosts
+        self._close_clients(closing)
+        return stats
+
+ssh_pool = SSHConnectionPool(
+    idle_timeout=SSH_POOL_IDLE_TIMEOUT,
+    max_per_host=SSH_POOL_MAX_PER_HOST,
+    max_channels=SSH_POOL_MAX_CHANNELS,
+    keepalive=SSH_KEEPALIVE_INTERVAL,
+    acquire_timeout=SSH_POOL_ACQUIRE_TIMEOUT
+)
+
+def open_ssh_client(host, username, ssh_key_name):
+    """Ouvre une nouvelle connexion SSH authentifiée par clé"""
+    private_key = load_private_key(ssh_key_name)
+    if private_key is None:
+        raise ValueError(f"Clé privée SSH '{ssh_key_name}' non trouvée")
+
+    ssh = SSHClient()
+    ssh.set_missing_host_key_policy(AutoAddPolicy())
+    ssh.connect(
+        hostname=host,
+        username=username,
+        pkey=private_key,
+        timeout=SSH_CONNECT_TIMEOUT
+    )
+    # Comme OpenSSH : sans TCP_NODELAY, chaque ouverture de canal / exec attend l'ACK retardé (~40 ms)
+    ssh.get_transport().sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    return ssh
+
+def ssh_connection(host, username, ssh_key_name, exclusive=False):
+    """Obtient une connexion SSH depuis le pool partagé"""
+    return ssh_pool.connection(
+        host, username, ssh_key_name,
+        lambda: open_ssh_client(host, username, ssh_key_name),
+        exclusive
+    )
+
+class BoundedOutput:
+    """Tampon de sortie qui ne garde que les head_bytes premiers et tail_bytes derniers octets"""
+
+    def __init__(self, head_bytes, tail_bytes):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+
+    def write(self, data):
+        self.total_bytes += len(data)
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data and self.tail_bytes > 0:
+            self.tail += data
+            if len(self.tail) > self.tail_bytes:
+                del self.tail[:len(self.tail) - self.tail_bytes]
+
+    @property
+    def dropped_bytes(self):
+        return self.total_bytes - len(self.head) - len(self.tail)
+
+    def text(self):
+        """Décode la sortie conservée en signalant la partie omise"""
+        head = self.head.decode('utf-8', errors='replace')
+        if not self.tail:
+            return head
+        tail = self.tail.decode('utf-8', errors='replace')
+        if self.dropped_bytes:
+            return f"{head}\n[... {self.dropped_bytes} octets omis ...]\n{tail}"
+        return head + tail
+
+def read_channel_bounded(channel, head_bytes, tail_bytes, timeout=None):
+    """Lit stdout/stderr d'un canal par blocs jusqu'à la fin de la commande
+
+    La mémoire utilisée est bornée par les budgets head/tail, et une
+    notification de progression est émise régulièrement si la requête
+    en cours en a demandé.
+    """
+    stdout = BoundedOutput(head_bytes, tail_bytes)
+    stderr = BoundedOutput(head_bytes, tail_bytes)
+    deadline = time.monotonic() + timeout if timeout else None
+    last_progress = time.monotonic()
+
+    while True:
+        while channel.recv_ready():
+            stdout.write(channel.recv(SSH_READ_CHUNK_SIZE))
+        while channel.recv_stderr_ready():
+            stderr.write(channel.recv_stderr(SSH_READ_CHUNK_SIZE))
+
+        if (channel.exit_status_ready() or channel.closed) \
+                and not channel.recv_ready() and not channel.recv_stderr_ready():
+            break
+
+        now = time.monotonic()
+        if deadline is not None and now > deadline:
+            raise socket.timeout()
+        if now - last_progress >= SSH_PROGRESS_INTERVAL:
+            last_progress = now
+            report_progress(
+                stdout.total_bytes + stderr.total_bytes,
+                message=f"{stdout.total_bytes} octets reçus sur stdout, {stderr.total_bytes} sur stderr"
+            )
+
+        # Le descripteur du canal devient lisible à l'arrivée de données ou à la fermeture
+        select.select([channel], [], [], 0.1)
+
+    return stdout, stderr
+
+def execute_ssh_command(host, username, command, ssh_key_name, timeout=None,
+                        head_bytes=None, tail_bytes=None):
     """Exécute une commande SSH sur une machine distante"""
     key_info = load_ssh_key(ssh_key_name)
     if not key_info:
@@ -339,38 +1702,35 @@ def execute_ssh_command(host, username, command, ssh_key_name):
             "error": f"Clé SSH '{ssh_key_name}' non trouvée"
         }
 
-    try:
-        # Créer le client SSH
-        ssh = SSHClient()
-        ssh.set_missing_host_key_policy(AutoAddPolicy())
-
-        # Charger la clé privée depuis une chaîne
-        from io import StringIO
-        key_file = StringIO(key_info['private_key'])
-        private_key = paramiko.RSAKey.from_private_key(key_file)
-
-        # Se connecter
-        ssh.connect(
-            hostname=host,
-            username=username,
-            pkey=private_key,
-            timeout=10
-        )
-
-        # Exécuter la commande
-        stdin, stdout, stderr = ssh.exec_command(command)
-
-        output = stdout.read().decode('utf-8')
-        error = stderr.read().decode('utf-8')
-        exit_code = stdout.channel.recv_exit_status()
+    head_bytes = SSH_OUTPUT_HEAD_BYTES if head_bytes is None else head_bytes
+    tail_bytes = SSH_OUTPUT_TAIL_BYTES if tail_bytes is None else tail_bytes
 
-        ssh.close()
+    try:
+        with ssh_connection(host, username, ssh_key_name) as ssh:
+            # Exécuter la commande sur un nouveau canal de la connexion partagée
+            channel = ssh.get_transport().open_session(timeout=SSH_CONNECT_TIMEOUT)
+            try:
+                channel.exec_command(command)
+                stdout, stderr = read_channel_bounded(channel, head_bytes, tail_bytes, timeout)
+                exit_code = channel.recv_exit_status()
+            finally:
+                channel.close()
 
         return {
             "success": exit_code == 0,
-            "output": output,
-            "error": error,
-            "exit_code": exit_code
+            "output": stdout.text(),
+            "error": stderr.text(),
+            "exit_code": exit_code,
+            "truncated": bool(stdout.dropped_bytes or stderr.dropped_bytes),
+            "output_bytes": stdout.total_bytes,
+            "error_bytes": stderr.total_bytes
+        }
+
+    except socket.timeout as e:
+        # TimeoutError (attente du pool, connexion) est un alias de socket.timeout
+        return {
+            "success": False,
+            "error": f"Délai dépassé après {timeout} s" if timeout is not None else str(e)
         }
 
     except Exception as e:
@@ -379,8 +1739,493 @@ def execute_ssh_command(host, username, command, ssh_key_name):
             "error": str(e)
         }
 
-def upload_file_ssh(host, username, local_path, remote_path, ssh_key_name):
-    """Upload un fichier via SSH"""
+def resolve_instance_hosts(zone=None, status="RUNNING", name_prefix=None, use_internal_ip=False):
+    """Sélectionne les adresses des instances correspondant à un filtre"""
+    hosts = {}
+    for instance in filter_instances(list_instances(zone), status, name_prefix=name_prefix):
+        address = instance["internal_ip"] if use_internal_ip else instance["external_ip"]
+        if address:
+            hosts[address] = instance["name"]
+    return hosts
+
+def execute_ssh_command_many(hosts, username, command, ssh_key_name, concurrency=None, timeout=None):
+    """Exécute une même commande sur plusieurs hôtes en parallèle
+
+    hosts est une liste d'adresses ou un dict {adresse: nom d'instance}.
+    Les résultats sont listés dans l'ordre de fin d'exécution et les
+    sorties identiques sont regroupées pour garder une réponse compacte.
+    Une notification de progression est émise à la fin de chaque hôte.
+    Le délai par hôte couvre toute la tâche (connexion, ouverture du
+    canal, exécution) : un hôte qui le dépasse est compté en échec sans
+    attendre la fin de sa tâche.
+    """
+    if not isinstance(hosts, dict):
+        hosts = {host: None for host in hosts}
+    concurrency = concurrency or SSH_FANOUT_CONCURRENCY
+    timeout = timeout or SSH_FANOUT_TIMEOUT
+    started = time.monotonic()
+    host_started = {}
+
+    def run(host):
+        host_started[host] = time.monotonic()
+        return execute_ssh_command(host, username, command, ssh_key_name, timeout=timeout)
+
+    results = []
+    groups = {}
+
+    def record(host, host_result):
+        host_result["duration_ms"] = round((time.monotonic() - host_started[host]) * 1000, 1)
+        signature = (
+            host_result.get("exit_code"),
+            host_result.get("output"),
+            host_result.get("error")
+        )
+        group = groups.get(signature)
+        if group is None:
+            group = groups[signature] = {
+                "id": len(groups),
+                "exit_code": signature[0],
+                "output": signature[1],
+                "error": signature[2],
+                "hosts": []
+            }
+        group["hosts"].append(host)
+
+        results.append({
+            "host": host,
+            "instance": hosts[host],
+            "success": host_result["success"],
+            "exit_code": host_result.get("exit_code"),
+            "duration_ms": host_result["duration_ms"],
+            "group": group["id"]
+        })
+        if host_result["success"]:
+            status = "succès"
+        elif host_result.get("exit_code") is not None:
+            status = f"code {host_result['exit_code']}"
+        else:
+            status = host_result.get("error") or "échec"
+        report_progress(len(results), len(hosts), f"{host} : {status}")
+
+    if hosts:
+        executor = ThreadPoolExecutor(max_workers=min(concurrency, len(hosts)))
+        try:
+            pending = {executor.submit(run, host): host for host in hosts}
+            while pending:
+                done, _ = wait_futures(pending, timeout=0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    record(pending.pop(future), future.result())
+
+                now = time.monotonic()
+                # Un hôte pas encore démarré a une échéance d'au moins now + timeout
+                deadline = now + timeout
+                for future, host in list(pending.items()):
+                    if host not in host_started:
+                        continue
+                    host_deadline = host_started[host] + timeout
+                    if host_deadline <= now:
+                        # La tâche continue en arrière-plan jusqu'au délai de connexion ou de lecture
+                        del pending[future]
+                        record(host, {"success": False, "error": f"Délai dépassé après {timeout} s"})
+                    else:
+                        deadline = min(deadline, host_deadline)
+
+                if pending:
+                    wait_futures(pending, timeout=deadline - now, return_when=FIRST_COMPLETED)
+        finally:
+            executor.shutdown(wait=False)
+
+    succeeded = sum(1 for host_result in results if host_result["success"])
+    return {
+        "success": succeeded == len(results),
+        "hosts_count": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "duration_ms": round((time.monotonic() - started) * 1000, 1),
+        "results": results,
+        "groups": list(groups.values())
+    }
+
+def open_sftp_session(ssh, window_size=None):
+    """Ouvre une session SFTP sur un nouveau canal, avec une fenêtre de réception élargie
+
+    La fenêtre par défaut de paramiko (2 Mo) limite le débit dès que la
+    latence augmente : elle borne les octets en vol sur le canal.
+    """
+    channel = ssh.get_transport().open_session(
+        window_size=window_size or SFTP_WINDOW_SIZE,
+        timeout=SSH_CONNECT_TIMEOUT
+    )
+    channel.invoke_subsystem("sftp")
+    return paramiko.SFTPClient(channel)
+
+class SFTPTransferFile:
+    """Fichier d'un transfert SFTP, découpé en parts de part_size octets"""
+
+    def __init__(self, source, target, size, mtime, mode, part_size):
+        self.source = source
+        self.target = target
+        self.size = size
+        self.mtime = mtime
+        self.mode = mode
+        self.part_size = part_size
+        count = max(1, -(-size // part_size))
+        self.parts = [
+            (index * part_size, min(part_size, size - index * part_size))
+            for index in range(count)
+        ]
+        self.done = set()
+        self.resumed_bytes = 0
+        self.finished = False
+        self.error = None
+        self.lock = threading.Lock()
+
+    @property
+    def chunked(self):
+        """Un fichier d'une seule part est écrit directement, sans fichier partiel ni reprise"""
+        return len(self.parts) > 1
+
+    @property
+    def partial_path(self):
+        return self.target + SFTP_PARTIAL_SUFFIX
+
+    @property
+    def state_path(self):
+        return self.partial_path + ".json"
+
+    def state(self):
+        """État de reprise : identité de la source et parts déjà écrites"""
+        return {
+            "size": self.size,
+            "mtime": int(self.mtime),
+            "part_size": self.part_size,
+            "done": sorted(self.done)
+        }
+
+    def resume_from(self, state):
+        """Reprend les parts d'un transfert interrompu si la source n'a pas changé"""
+        if not state or any(state.get(k) != v for k, v in self.state().items() if k != "done"):
+            return False
+        self.done = {index for index in state.get("done", []) if 0 <= index < len(self.parts)}
+        self.resumed_bytes = sum(self.parts[index][1] for index in self.done)
+        return True
+
+class SFTPTransfer:
+    """Transfert SFTP d'un fichier ou d'une arborescence dans un sens donné
+
+    Chaque fichier est découpé en parts ; un pool de workers, chacun avec
+    sa propre session SFTP obtenue du pool de connexions, se répartit les
+    parts de tous les fichiers. Les écritures sont pipelinées (upload) et
+    les lectures préchargées (download), dans la limite de la fenêtre du
+    canal. Les gros fichiers sont écrits dans un fichier <cible>.mcp-part
+    accompagné d'un état JSON des parts terminées, ce qui permet de
+    reprendre un transfert interrompu ; le fichier est renommé à la fin.
+    """
+
+    def __init__(self, direction, host, username, ssh_key_name, local_path, remote_path,
+                 concurrency=None, window_size=None, part_size=None, resume=True, preserve=True,
+                 paths=None):
+        self.upload = direction == "upload"
+        self.host = host
+        self.username = username
+        self.ssh_key_name = ssh_key_name
+        self.local_path = os.path.abspath(os.path.expanduser(local_path))
+        self.remote_path = remote_path
+        self.concurrency = max(1, concurrency or SFTP_CONCURRENCY)
+        self.window_size = window_size or SFTP_WINDOW_SIZE
+        self.part_size = max(SFTP_REQUEST_SIZE, part_size or SFTP_PART_SIZE)
+        self.resume = resume
+        self.preserve = preserve
+        # Upload d'un répertoire restreint à ces chemins relatifs (séparateur '/')
+        self.paths = paths
+        self.files = []
+        self.directories = []
+        self.skipped = []
+        self._queue = deque()
+        self._lock = threading.Lock()
+        self.transferred = 0
+
+    def _connection(self, exclusive=False):
+        return ssh_connection(self.host, self.username, self.ssh_key_name, exclusive)
+
+    # Inventaire de la source
+
+    def _add_file(self, source, target, attributes):
+        if source.endswith((SFTP_PARTIAL_SUFFIX, SFTP_PARTIAL_SUFFIX + ".json")):
+            return
+        if not S_ISREG(attributes.st_mode):
+            self.skipped.append(source)
+            return
+        self.files.append(SFTPTransferFile(
+            source, target, attributes.st_size, attributes.st_mtime,
+            S_IMODE(attributes.st_mode), self.part_size
+        ))
+
+    def _scan_local(self):
+        if self.paths is not None:
+            directories = {self.remote_path}
+            for relative in self.paths:
+                source = os.path.join(self.local_path, *relative.split("/"))
+                target = posixpath.join(self.remote_path, relative)
+                self._add_file(source, target, os.stat(source))
+                parent = posixpath.dirname(target)
+                while parent not in directories and parent.startswith(self.remote_path):
+                    directories.add(parent)
+                    parent = posixpath.dirname(parent)
+            # Un répertoire parent est un préfixe de ses enfants : il est créé avant eux
+            self.directories = sorted(directories)
+            return
+        if not os.path.isdir(self.local_path):
+            self._add_file(self.local_path, self.remote_path, os.stat(self.local_path))
+            return
+        for directory, subdirs, file_names in os.walk(self.local_path):
+            subdirs.sort()
+            relative = os.path.relpath(directory, self.local_path)
+            target_dir = self.remote_path if relative == "." else \
+                posixpath.join(self.remote_path, *relative.split(os.sep))
+            self.directories.append(target_dir)
+            for file_name in sorted(file_names):
+                self._add_file(
+                    os.path.join(directory, file_name),
+                    posixpath.join(target_dir, file_name),
+                    os.stat(os.path.join(directory, file_name))
+                )
+
+    def _scan_remote(self, sftp):
+        if not S_ISDIR(sftp.stat(self.remote_path).st_mode):
+            self._add_file(self.remote_path, self.local_path, sftp.stat(self.remote_path))
+            return
+        pending = [(self.remote_path, self.local_path)]
+        while pending:
+            source_dir, target_dir = pending.pop(0)
+            self.directories.append(target_dir)
+            for attributes in sorted(sftp.listdir_attr(source_dir), key=lambda a: a.filename):
+                source = posixpath.join(source_dir, attributes.filename)
+                target = os.path.join(target_dir, attributes.filename)
+                if S_ISDIR(attributes.st_mode):
+                    pending.append((source, target))
+                else:
+                    self._add_file(source, target, attributes)
+
+    # Opérations côté destination
+
+    def _make_directories(self, sftp):
+        for directory in self.directories:
+            if not self.upload:
+                os.makedirs(directory, exist_ok=True)
+                continue
+            try:
+                sftp.mkdir(directory)
+            except IOError:
+                if not S_ISDIR(sftp.stat(directory).st_mode):
+                    raise
+
+    def _read_state(self, sftp, transfer_file):
+        try:
+            if self.upload:
+                sftp.stat(transfer_file.partial_path)
+                with sftp.open(transfer_file.state_path, "r") as state_file:
+                    return json.loads(state_file.read())
+            if not os.path.exists(transfer_file.partial_path):
+                return None
+            with open(transfer_file.state_path) as state_file:
+                return json.load(state_file)
+        except (IOError, OSError, ValueError):
+            return None
+
+    def _write_state(self, sftp, transfer_file):
+        state = json.dumps(transfer_file.state())
+        if self.upload:
+            with sftp.open(transfer_file.state_path, "w") as state_file:
+                state_file.write(state)
+        else:
+            temp_path = transfer_file.state_path + ".tmp"
+            with open(temp_path, "w") as state_file:
+                state_file.write(state)
+            os.replace(temp_path, transfer_file.state_path)
+
+    def _prepare(self, sftp, transfer_file):
+        """Reprend un fichier partiel existant ou crée un fichier partiel vide"""
+        if self.resume and transfer_file.resume_from(self._read_state(sftp, transfer_file)):
+            return
+        if self.upload:
+            sftp.open(transfer_file.partial_path, "w").close()
+        else:
+            open(transfer_file.partial_path, "wb").close()
+        self._write_state(sftp, transfer_file)
+
+    def _finalize(self, sftp, transfer_file):
+        """Renomme le fichier partiel et reporte les permissions et la date de modification"""
+        target = transfer_file.target
+        times = (transfer_file.mtime, transfer_file.mtime)
+        if self.upload:
+            if transfer_file.chunked:
+                try:
+                    sftp.posix_rename(transfer_file.partial_path, target)
+                except IOError:
+                    # Serveur sans l'extension posix-rename : rename refuse d'écraser
+                    try:
+                        sftp.remove(target)
+                    except IOError:
+                        pass
+                    sftp.rename(transfer_file.partial_path, target)
+                sftp.remove(transfer_file.state_path)
+            if self.preserve:
+                sftp.chmod(target, transfer_file.mode)
+                sftp.utime(target, times)
+        else:
+            if transfer_file.chunked:
+                os.replace(transfer_file.partial_path, target)
+                os.remove(transfer_file.state_path)
+            if self.preserve:
+                os.chmod(target, transfer_file.mode)
+                os.utime(target, times)
+        transfer_file.finished = True
+
+    # Copie des parts
+
+    def _progress(self, count):
+        with self._lock:
+            self.transferred += count
+
+    def _copy_part(self, sftp, transfer_file, index):
+        offset, length = transfer_file.parts[index]
+        target = transfer_file.partial_path if transfer_file.chunked else transfer_file.target
+        target_mode = "r+b" if transfer_file.chunked else "wb"
+
+        if self.upload:
+            with open(transfer_file.source, "rb") as source, sftp.open(target, target_mode) as destination:
+                # Écritures envoyées sans attendre d'acquittement ; close() attend les réponses
+                destination.set_pipelined(True)
+                source.seek(offset)
+                destination.seek(offset)
+                remaining = length
+                while remaining:
+                    data = source.read(min(SFTP_IO_SIZE, remaining))
+                    if not data:
+                        raise IOError(f"{transfer_file.source} a été tronqué pendant le transfert")
+                    destination.write(data)
+                    remaining -= len(data)
+                    self._progress(len(data))
+            return
+
+        requests = [
+            (position, min(SFTP_REQUEST_SIZE, offset + length - position))
+            for position in range(offset, offset + length, SFTP_REQUEST_SIZE)
+        ]
+        with sftp.open(transfer_file.source, "rb") as source, open(target, target_mode) as destination:
+            destination.seek(offset)
+            if requests:
+                # Lectures préchargées en parallèle, autant que la fenêtre du canal peut en contenir
+                for data in source.readv(requests, max(1, self.window_size // SFTP_REQUEST_SIZE)):
+                    destination.write(data)
+                    self._progress(len(data))
+
+    def _part_done(self, sftp, transfer_file, index):
+        with transfer_file.lock:
+            transfer_file.done.add(index)
+            if len(transfer_file.done) == len(transfer_file.parts):
+                self._finalize(sftp, transfer_file)
+            else:
+                self._write_state(sftp, transfer_file)
+
+    def _claim(self):
+        with self._lock:
+            while self._queue:
+                transfer_file, index = self._queue.popleft()
+                if transfer_file.error is None:
+                    return transfer_file, index
+            return None
+
+    def _worker(self):
+        with self._connection(exclusive=True) as ssh:
+            sftp = open_sftp_session(ssh, self.window_size)
+            try:
+                while True:
+                    claimed = self._claim()
+                    if claimed is None:
+                        return
+                    transfer_file, index = claimed
+                    try:
+                        self._copy_part(sftp, transfer_file, index)
+                        self._part_done(sftp, transfer_file, index)
+                    except Exception as e:
+                        transfer_file.error = transfer_file.error or str(e)
+                        transport = ssh.get_transport()
+                        if transport is None or not transport.is_active():
+                            raise
+            finally:
+                sftp.close()
+
+    def run(self):
+        started = time.monotonic()
+        with self._connection() as ssh:
+            sftp = open_sftp_session(ssh, self.window_size)
+            try:
+                if self.upload:
+                    self._scan_local()
+                else:
+                    self._scan_remote(sftp)
+                self._make_directories(sftp)
+                for transfer_file in self.files:
+                    if not transfer_file.chunked:
+                        continue
+                    self._prepare(sftp, transfer_file)
+                    if len(transfer_file.done) == len(transfer_file.parts):
+                        self._finalize(sftp, transfer_file)
+            finally:
+                sftp.close()
+
+        for transfer_file in self.files:
+            for index in range(len(transfer_file.parts)):
+                if index not in transfer_file.done:
+                    self._queue.append((transfer_file, index))
+
+        total_bytes = sum(transfer_file.size for transfer_file in self.files)
+        resumed_bytes = sum(transfer_file.resumed_bytes for transfer_file in self.files)
+        workers = min(self.concurrency, len(self._queue), SSH_POOL_MAX_PER_HOST * SSH_POOL_MAX_CHANNELS)
+        worker_errors = []
+        if workers:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending = {executor.submit(self._worker) for _ in range(workers)}
+                while pending:
+                    done, pending = wait_futures(pending, timeout=SSH_PROGRESS_INTERVAL)
+                    worker_errors.extend(str(f.exception()) for f in done if f.exception())
+                    report_progress(
+                        resumed_bytes + self.transferred, total_bytes,
+                        message=f"{self.transferred} octets transférés"
+                    )
+
+        errors = []
+        for transfer_file in self.files:
+            if not transfer_file.finished and transfer_file.error is None:
+                # Parts non traitées : tous les workers se sont arrêtés
+                transfer_file.error = worker_errors[0] if worker_errors else "Transfert interrompu"
+            if transfer_file.error is not None:
+                errors.append({"path": transfer_file.source, "error": transfer_file.error})
+
+        duration = time.monotonic() - started
+        result = {
+            "success": not errors,
+            "files": len(self.files),
+            "files_failed": len(errors),
+            "bytes": self.transferred,
+            "total_bytes": total_bytes,
+            "resumed_bytes": resumed_bytes,
+            "duration_ms": round(duration * 1000, 1),
+            "throughput_mb_s": round(self.transferred / duration / 1e6, 2) if duration > 0 else None,
+            "concurrency": workers
+        }
+        if self.skipped:
+            result["skipped"] = self.skipped
+        if errors:
+            result["errors"] = errors
+        return result
+
+def transfer_file_ssh(direction, host, username, local_path, remote_path, ssh_key_name,
+                      concurrency=None, window_size=None, part_size=None, resume=True, preserve=True,
+                      paths=None):
+    """Transfère un fichier ou un répertoire via SFTP (direction 'upload' ou 'download')"""
     key_info = load_ssh_key(ssh_key_name)
     if not key_info:
         return {
@@ -389,48 +2234,368 @@ def upload_file_ssh(host, username, local_path, remote_path, ssh_key_name):
         }
 
     try:
-        ssh = SSHClient()
-        ssh.set_missing_host_key_policy(AutoAddPolicy())
-
-        from io import StringIO
-        key_file = StringIO(key_info['private_key'])
-        private_key = paramiko.RSAKey.from_private_key(key_file)
-
-        ssh.connect(
-            hostname=host,
-            username=username,
-            pkey=private_key,
-            timeout=10
-        )
+        result = SFTPTransfer(
+            direction, host, username, ssh_key_name, local_path, remote_path,
+            concurrency=concurrency, window_size=window_size, part_size=part_size,
+            resume=resume, preserve=preserve, paths=paths
+        ).run()
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
 
-        sftp = ssh.open_sftp()
-        sftp.put(local_path, remote_path)
-        sftp.close()
-        ssh.close()
+    if direction == "upload":
+        result["message"] = f"Fichier uploadé: {local_path} -> {remote_path}"
+    else:
+        result["message"] = f"Fichier téléchargé: {remote_path} -> {local_path}"
+    return result
+
+def remote_manifest_command(remote_dir, checksum=False, create=False):
+    """Commande listant en une fois les fichiers d'un répertoire distant
+
+    Sortie : un enregistrement 'taille<TAB>mtime<TAB>chemin' terminé par NUL
+    par fichier, un enregistrement vide, puis en mode checksum les lignes
+    de sha256sum. Un répertoire absent (sans create) donne un manifeste
+    vide ; un répertoire inaccessible fait échouer la commande, sans
+    lister le répertoire courant à sa place.
+    """
+    quoted = shlex.quote(remote_dir)
+    exclude = f"! -name '*{SFTP_PARTIAL_SUFFIX}' ! -name '*{SFTP_PARTIAL_SUFFIX}.json'"
+    command = f"{{ mkdir -p -- {quoted} && cd -- {quoted}; }} || exit 1" if create else \
+        f"{{ [ -e {quoted} ] || exit 0; }}; cd -- {quoted} || exit 1"
+    command += f"; find . -type f {exclude} -printf '%s\\t%T@\\t%P\\0'; printf '\\0'"
+    if checksum:
+        command += f"; find . -type f {exclude} -print0 | xargs -0 -r sha256sum --"
+    return command
+
+def parse_remote_manifest(output):
+    """Décode la sortie de remote_manifest_command en {chemin: {size, mtime, sha256}}"""
+    manifest = {}
+    listing, _, checksums = output.partition("\0\0")
+    for record in listing.split("\0"):
+        fields = record.split("\t", 2)
+        if len(fields) == 3:
+            manifest[fields[2]] = {
+                "size": int(fields[0]),
+                "mtime": int(float(fields[1])),
+                "sha256": None
+            }
+    for line in checksums.splitlines():
+        # Les noms contenant un retour à la ligne sont échappés par sha256sum : ignorés
+        digest, _, path = line.partition("  ")
+        if path.startswith("./"):
+            path = path[2:]
+        if not line.startswith("\\") and path in manifest:
+            manifest[path]["sha256"] = digest
+    return manifest
+
+def local_file_sha256(path):
+    """Empreinte SHA-256 d'un fichier local, lu par blocs"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for block in iter(lambda: source.read(SFTP_IO_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def local_directory_manifest(local_dir):
+    """Inventaire {chemin relatif: {size, mtime}} des fichiers d'un répertoire local"""
+    manifest = {}
+    for directory, subdirs, file_names in os.walk(local_dir):
+        subdirs.sort()
+        for file_name in file_names:
+            if file_name.endswith((SFTP_PARTIAL_SUFFIX, SFTP_PARTIAL_SUFFIX + ".json")):
+                continue
+            path = os.path.join(directory, file_name)
+            attributes = os.stat(path)
+            if not S_ISREG(attributes.st_mode):
+                continue
+            relative = os.path.relpath(path, local_dir).replace(os.sep, "/")
+            manifest[relative] = {
+                "size": attributes.st_size,
+                "mtime": int(attributes.st_mtime)
+            }
+    return manifest
+
+def upload_file_ssh(host, username, local_path, remote_path, ssh_key_name, concurrency=None,
+                    window_size=None, part_size=None, resume=True, preserve=True, paths=None):
+    """Upload un fichier ou un répertoire via SFTP"""
+    return transfer_file_ssh(
+        "upload", host, username, local_path, remote_path, ssh_key_name,
+        concurrency, window_size, part_size, resume, preserve, paths
+    )
+
+def download_file_ssh(host, username, remote_path, local_path, ssh_key_name, concurrency=None,
+                      window_size=None, part_size=None, resume=True, preserve=True):
+    """Télécharge un fichier ou un répertoire via SFTP"""
+    return transfer_file_ssh(
+        "download", host, username, local_path, remote_path, ssh_key_name,
+        concurrency, window_size, part_size, resume, preserve
+    )
 
+def sync_directory_ssh(host, username, local_dir, remote_dir, ssh_key_name, checksum=False,
+                       compress=False, delete=False, dry_run=False, concurrency=None):
+    """Synchronise un répertoire local vers une machine distante en n'envoyant que les différences
+
+    Le manifeste distant (taille, date de modification, et empreintes en
+    mode checksum) est obtenu par une seule commande. Un fichier est
+    considéré identique si taille et date de modification correspondent,
+    ou en mode checksum si taille et SHA-256 correspondent. Les fichiers
+    modifiés sont envoyés via SFTP, ou regroupés dans une archive tar.gz
+    extraite à distance avec compress.
+    """
+    started = time.monotonic()
+    local_dir = os.path.abspath(os.path.expanduser(local_dir))
+    if not os.path.isdir(local_dir):
         return {
-            "success": True,
-            "message": f"Fichier uploadé: {local_path} -> {remote_path}"
+            "success": False,
+            "error": f"Répertoire local '{local_dir}' introuvable"
         }
 
-    except Exception as e:
+    local_manifest = local_directory_manifest(local_dir)
+    listing = execute_ssh_command(
+        host, username,
+        remote_manifest_command(remote_dir, checksum, create=not dry_run),
+        ssh_key_name,
+        timeout=SSH_SYNC_MANIFEST_TIMEOUT,
+        head_bytes=SSH_SYNC_MANIFEST_MAX_BYTES, tail_bytes=0
+    )
+    if not listing["success"]:
+        error = (listing.get("error") or "").strip() or f"code de sortie {listing.get('exit_code')}"
         return {
             "success": False,
-            "error": str(e)
+            "error": f"Manifeste distant : {error}"
         }
+    if listing["truncated"]:
+        return {
+            "success": False,
+            "error": f"Manifeste distant supérieur à {SSH_SYNC_MANIFEST_MAX_BYTES} octets"
+        }
+    remote_manifest = parse_remote_manifest(listing["output"])
+    manifest_ms = round((time.monotonic() - started) * 1000, 1)
+
+    changed = []
+    for path, local in sorted(local_manifest.items()):
+        remote = remote_manifest.get(path)
+        if remote is None or remote["size"] != local["size"]:
+            changed.append(path)
+        elif checksum:
+            if remote["sha256"] != local_file_sha256(os.path.join(local_dir, *path.split("/"))):
+                changed.append(path)
+        elif remote["mtime"] != local["mtime"]:
+            changed.append(path)
+    deleted = sorted(set(remote_manifest) - set(local_manifest)) if delete else []
+
+    bytes_total = sum(local["size"] for local in local_manifest.values())
+    bytes_changed = sum(local_manifest[path]["size"] for path in changed)
+    result = {
+        "success": True,
+        "dry_run": dry_run,
+        "compare": "checksum" if checksum else "mtime",
+        "compressed": compress,
+        "files_total": len(local_manifest),
+        "files_changed": len(changed),
+        "files_unchanged": len(local_manifest) - len(changed),
+        "files_deleted": len(deleted),
+        "bytes_total": bytes_total,
+        "bytes_changed": bytes_changed,
+        "manifest_ms": manifest_ms,
+        "changed": changed[:SSH_SYNC_LIST_LIMIT]
+    }
+    if delete:
+        result["deleted"] = deleted[:SSH_SYNC_LIST_LIMIT]
+
+    bytes_sent = 0
+    if not dry_run and changed:
+        if compress:
+            transfer = upload_archive_ssh(host, username, local_dir, remote_dir, ssh_key_name, changed)
+        else:
+            transfer = upload_file_ssh(
+                host, username, local_dir, remote_dir, ssh_key_name,
+                concurrency=concurrency, resume=False, paths=changed
+            )
+        if not transfer["success"]:
+            result["success"] = False
+            if "errors" in transfer:
+                result["errors"] = transfer["errors"]
+            else:
+                result["error"] = transfer["error"]
+        bytes_sent = transfer.get("bytes", 0)
+        result["throughput_mb_s"] = transfer.get("throughput_mb_s")
+
+    if not dry_run and deleted and result["success"]:
+        # Suppression par lots pour rester sous la limite de longueur des commandes
+        for start in range(0, len(deleted), 500):
+            quoted = " ".join(shlex.quote(path) for path in deleted[start:start + 500])
+            removal = execute_ssh_command(
+                host, username, f"cd -- {shlex.quote(remote_dir)} && rm -f -- {quoted}", ssh_key_name
+            )
+            if not removal["success"]:
+                result["success"] = False
+                result["error"] = removal["error"]
+                break
+
+    result["bytes_sent"] = bytes_sent
+    result["bytes_saved"] = bytes_total - bytes_sent
+    result["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return result
+
+def upload_archive_ssh(host, username, local_dir, remote_dir, ssh_key_name, paths):
+    """Envoie des fichiers d'un répertoire dans une archive tar.gz extraite à distance"""
+    archive_name = f".mcp-sync-{uuid.uuid4().hex}.tar.gz"
+    handle, archive_path = tempfile.mkstemp(suffix=".tar.gz")
+    os.close(handle)
+    try:
+        with tarfile.open(archive_path, "w:gz", compresslevel=SSH_SYNC_COMPRESS_LEVEL) as archive:
+            for path in paths:
+                archive.add(os.path.join(local_dir, *path.split("/")), arcname=path, recursive=False)
+
+        remote_archive = posixpath.join(remote_dir, archive_name)
+        transfer = upload_file_ssh(host, username, archive_path, remote_archive, ssh_key_name, preserve=False)
+        if not transfer["success"]:
+            return transfer
+        extract = execute_ssh_command(
+            host, username,
+            f"cd -- {shlex.quote(remote_dir)} && tar -xzf {archive_name}; "
+            f"status=$?; rm -f -- {archive_name}; exit $status",
+            ssh_key_name
+        )
+        if not extract["success"]:
+            return {"success": False, "error": extract["error"] or "Extraction de l'archive échouée"}
+        return transfer
+    finally:
+        os.remove(archive_path)
 
 # ====================================================================
 # FONCTIONS TERRAFORM
 # ====================================================================
 
-def terraform_init(working_dir):
-    """Initialise Terraform dans un répertoire"""
+class TerraformWorkdirLocks:
+    """Verrou par répertoire de travail : une seule commande Terraform à la fois par répertoire"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._locks = {}
+
+    def get(self, working_dir):
+        key = str(Path(working_dir).resolve())
+        with self._lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def busy(self):
+        with self._lock:
+            return sorted(key for key, lock in self._locks.items() if lock.locked())
+
+terraform_workdir_locks = TerraformWorkdirLocks()
+
+@contextmanager
+def terraform_workdir_lock(working_dir, timeout=None):
+    """Réserve un répertoire de travail Terraform le temps d'une commande"""
+    lock = terraform_workdir_locks.get(working_dir)
+    if not lock.acquire(timeout=TF_WORKDIR_LOCK_TIMEOUT if timeout is None else timeout):
+        raise TimeoutError(f"Répertoire {working_dir} occupé par une autre commande Terraform")
     try:
-        tf = Terraform(working_dir=working_dir)
-        return_code, stdout, stderr = tf.init()
+        yield
+    finally:
+        lock.release()
+
+# Fichiers dont dépend le résultat de terraform init
+TERRAFORM_CONFIG_SUFFIXES = (".tf", ".tf.json")
+TERRAFORM_LOCK_FILE = ".terraform.lock.hcl"
+
+def terraform_config_fingerprint(working_dir):
+    """Empreinte SHA-256 des fichiers .tf et du verrou des providers d'un répertoire"""
+    digest = hashlib.sha256()
+    root = Path(working_dir)
+    paths = []
+    for directory, subdirs, files in os.walk(root):
+        # .terraform (providers, modules téléchargés) et répertoires cachés exclus
+        subdirs[:] = sorted(d for d in subdirs if not d.startswith("."))
+        for file_name in files:
+            if file_name.endswith(TERRAFORM_CONFIG_SUFFIXES) or (
+                file_name == TERRAFORM_LOCK_FILE and Path(directory) == root
+            ):
+                paths.append(Path(directory) / file_name)
+
+    for path in sorted(paths):
+        digest.update(path.relative_to(root).as_posix().encode('utf-8') + b"\0")
+        digest.update(path.read_bytes())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+class TerraformInitCache:
+    """Empreinte de la configuration lors du dernier init réussi, par répertoire de travail"""
+
+    # Stockée dans .terraform : supprimer ce répertoire invalide aussi l'empreinte
+    MARKER = Path(".terraform") / ".mcp_init_fingerprint"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def is_current(self, working_dir, fingerprint):
+        """Vrai si le dernier init réussi correspond à cette empreinte"""
+        try:
+            current = (Path(working_dir) / self.MARKER).read_text().strip() == fingerprint
+        except OSError:
+            current = False
+        with self._lock:
+            if current:
+                self._hits += 1
+            else:
+                self._misses += 1
+        return current
+
+    def record(self, working_dir, fingerprint):
+        marker = Path(working_dir) / self.MARKER
+        if marker.parent.is_dir():
+            marker.write_text(fingerprint)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "plugin_cache_dir": str(TF_PLUGIN_CACHE_DIR)
+            }
+
+terraform_init_cache = TerraformInitCache()
+
+def terraform_env():
+    """Environnement des commandes terraform, avec le cache de providers partagé"""
+    return dict(os.environ, TF_PLUGIN_CACHE_DIR=str(TF_PLUGIN_CACHE_DIR))
+
+def terraform_init(working_dir, force=False):
+    """Initialise Terraform dans un répertoire (ignoré si la configuration n'a pas changé)"""
+    try:
+        fingerprint = terraform_config_fingerprint(working_dir)
+        if not force and terraform_init_cache.is_current(working_dir, fingerprint):
+            return {
+                "success": True,
+                "skipped": True,
+                "fingerprint": fingerprint,
+                "message": "Configuration inchangée depuis le dernier init : init ignoré"
+            }
+
+        with terraform_workdir_lock(working_dir):
+            # Le cache de providers n'est créé qu'au premier init
+            TF_PLUGIN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            process = subprocess.run(
+                terraform_cli("init", "-reconfigure", "-backend=true"),
+                cwd=working_dir, env=terraform_env(), capture_output=True, text=True
+            )
+            return_code, stdout, stderr = process.returncode, process.stdout, process.stderr
+
+            if return_code == 0:
+                # Recalculée : init peut créer ou mettre à jour .terraform.lock.hcl
+                fingerprint = terraform_config_fingerprint(working_dir)
+                terraform_init_cache.record(working_dir, fingerprint)
 
         return {
             "success": return_code == 0,
+            "skipped": False,
+            "fingerprint": fingerprint,
             "output": stdout,
             "error": stderr
         }
@@ -440,38 +2605,178 @@ def terraform_init(working_dir):
             "error": str(e)
         }
 
-def terraform_plan(working_dir, var_file=None):
-    """Planifie un déploiement Terraform"""
+def terraform_var_file_digest(working_dir, var_file):
+    """Empreinte du fichier de variables (chemin relatif au répertoire de travail)"""
+    if not var_file:
+        return None
+    return hashlib.sha256((Path(working_dir) / var_file).read_bytes()).hexdigest()
+
+class TerraformPlanStore:
+    """Plans enregistrés (-out) réutilisables par terraform_apply, indexés par plan_id"""
+
+    # Sous .terraform : les plans peuvent contenir des valeurs sensibles
+    PLANS_DIR = Path(".terraform") / "mcp-plans"
+
+    def __init__(self, ttl, max_plans):
+        self.ttl = ttl
+        self.max_plans = max_plans
+        self._lock = threading.Lock()
+        self._plans = OrderedDict()
+        # (répertoire, fichier de variables) -> plan le plus récent
+        self._latest = {}
+        self._applied = 0
+        self._rejected = 0
+
+    def new_plan_file(self, working_dir):
+        plans_dir = Path(working_dir).resolve() / self.PLANS_DIR
+        plans_dir.mkdir(parents=True, exist_ok=True)
+        plan_id = uuid.uuid4().hex[:16]
+        return plan_id, plans_dir / f"{plan_id}.tfplan"
+
+    def register(self, plan_id, plan_file, working_dir, var_file, fingerprint, var_file_digest, has_changes):
+        working_dir = str(Path(working_dir).resolve())
+        record = {
+            "plan_id": plan_id,
+            "working_dir": working_dir,
+            "var_file": var_file,
+            "fingerprint": fingerprint,
+            "var_file_digest": var_file_digest,
+            "has_changes": has_changes,
+            "plan_file": str(plan_file),
+            "created_at": time.time()
+        }
+        discarded = []
+        with self._lock:
+            # Un nouveau plan pour la même clé remplace le précédent
+            previous = self._latest.get((working_dir, var_file))
+            if previous in self._plans:
+                discarded.append(self._plans.pop(previous))
+            self._latest[(working_dir, var_file)] = plan_id
+            self._plans[plan_id] = record
+            while len(self._plans) > self.max_plans:
+                discarded.append(self._plans.popitem(last=False)[1])
+        for old in discarded:
+            Path(old["plan_file"]).unlink(missing_ok=True)
+        return record
+
+    def take(self, plan_id, working_dir=None):
+        """Retire un plan du registre s'il est encore applicable, sinon lève ValueError"""
+        with self._lock:
+            record = self._plans.pop(plan_id, None)
+            if record is not None and self._latest.get((record["working_dir"], record["var_file"])) == plan_id:
+                del self._latest[(record["working_dir"], record["var_file"])]
+
+        try:
+            if record is None:
+                raise ValueError(f"Plan '{plan_id}' inconnu, déjà appliqué ou remplacé par un plan plus récent")
+            if working_dir and str(Path(working_dir).resolve()) != record["working_dir"]:
+                raise ValueError(f"Plan '{plan_id}' créé pour {record['working_dir']}")
+            if time.time() - record["created_at"] > self.ttl:
+                raise ValueError(f"Plan '{plan_id}' obsolète : créé il y a plus de {self.ttl:.0f} s")
+            if not Path(record["plan_file"]).is_file():
+                raise ValueError(f"Plan '{plan_id}' obsolète : fichier de plan introuvable")
+            if terraform_config_fingerprint(record["working_dir"]) != record["fingerprint"]:
+                raise ValueError(f"Plan '{plan_id}' obsolète : la configuration Terraform a changé")
+            if terraform_var_file_digest(record["working_dir"], record["var_file"]) != record["var_file_digest"]:
+                raise ValueError(f"Plan '{plan_id}' obsolète : le fichier de variables a changé")
+        except (ValueError, OSError):
+            with self._lock:
+                self._rejected += 1
+            if record is not None:
+                Path(record["plan_file"]).unlink(missing_ok=True)
+            raise
+        return record
+
+    def consume(self, record):
+        """Supprime le fichier d'un plan appliqué"""
+        Path(record["plan_file"]).unlink(missing_ok=True)
+        with self._lock:
+            self._applied += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "plans": len(self._plans),
+                "applied": self._applied,
+                "rejected": self._rejected,
+                "ttl_seconds": self.ttl
+            }
+
+terraform_plan_store = TerraformPlanStore(TF_PLAN_TTL, TF_PLAN_MAX)
+
+def terraform_plan(working_dir, var_file=None, parallelism=None):
+    """Planifie un déploiement Terraform et enregistre le plan pour terraform_apply"""
     try:
+        fingerprint = terraform_config_fingerprint(working_dir)
+        var_file_digest = terraform_var_file_digest(working_dir, var_file)
+        plan_id, plan_file = terraform_plan_store.new_plan_file(working_dir)
+
         tf = Terraform(working_dir=working_dir)
-        kwargs = {}
+        kwargs = {'out': str(plan_file), 'parallelism': parallelism}
         if var_file:
             kwargs['var_file'] = var_file
 
-        return_code, stdout, stderr = tf.plan(**kwargs)
+        with terraform_workdir_lock(working_dir):
+            return_code, stdout, stderr = tf.plan(**kwargs)
 
-        return {
-            "success": return_code == 0,
+        # -detailed-exitcode : 0 = aucun changement, 2 = changements à appliquer
+        success = return_code in (0, 2)
+        result = {
+            "success": success,
             "output": stdout,
             "error": stderr
         }
+        if success:
+            terraform_plan_store.register(
+                plan_id, plan_file, working_dir, var_file, fingerprint, var_file_digest,
+                has_changes=return_code == 2
+            )
+            result["plan_id"] = plan_id
+            result["has_changes"] = return_code == 2
+        else:
+            plan_file.unlink(missing_ok=True)
+        return result
     except Exception as e:
         return {
             "success": False,
             "error": str(e)
         }
 
-def terraform_apply(working_dir, var_file=None, auto_approve=True):
-    """Applique un déploiement Terraform"""
+def terraform_apply(working_dir=None, var_file=None, auto_approve=True, plan_id=None, parallelism=None):
+    """Applique un déploiement Terraform (plan enregistré si plan_id est fourni)"""
     try:
+        if plan_id:
+            record = terraform_plan_store.take(plan_id, working_dir)
+
+            tf = Terraform(working_dir=record["working_dir"])
+            # Un plan enregistré contient déjà ses variables : aucune option -var/-var-file
+            try:
+                with terraform_workdir_lock(record["working_dir"]):
+                    return_code, stdout, stderr = tf.apply(
+                        record["plan_file"], skip_plan=True, var=None, parallelism=parallelism
+                    )
+            finally:
+                terraform_plan_store.consume(record)
+
+            return {
+                "success": return_code == 0,
+                "plan_id": plan_id,
+                "output": stdout,
+                "error": stderr
+            }
+
+        if not working_dir:
+            raise ValueError("Paramètre 'working_dir' ou 'plan_id' requis")
+
         tf = Terraform(working_dir=working_dir)
-        kwargs = {}
+        kwargs = {'parallelism': parallelism}
         if var_file:
             kwargs['var_file'] = var_file
         if auto_approve:
             kwargs['skip_plan'] = True
 
-        return_code, stdout, stderr = tf.apply(**kwargs)
+        with terraform_workdir_lock(working_dir):
+            return_code, stdout, stderr = tf.apply(**kwargs)
 
         return {
             "success": return_code == 0,
@@ -484,15 +2789,19 @@ def terraform_apply(working_dir, var_file=None, auto_approve=True):
             "error": str(e)
         }
 
-def terraform_destroy(working_dir, auto_approve=True):
+def terraform_destroy(working_dir, auto_approve=True, parallelism=None, var_file=None):
     """Détruit l'infrastructure Terraform"""
     try:
         tf = Terraform(working_dir=working_dir)
-        kwargs = {}
+        # -force a disparu en Terraform 0.15 : -auto-approve, comme les tâches en arrière-plan
+        kwargs = {'parallelism': parallelism, 'force': IsNotFlagged}
+        if var_file:
+            kwargs['var_file'] = var_file
         if auto_approve:
-            kwargs['force'] = True
+            kwargs['auto-approve'] = IsFlagged
 
-        return_code, stdout, stderr = tf.destroy(**kwargs)
+        with terraform_workdir_lock(working_dir):
+            return_code, stdout, stderr = tf.destroy(**kwargs)
 
         return {
             "success": return_code == 0,
@@ -505,634 +2814,2200 @@ def terraform_destroy(working_dir, auto_approve=True):
             "error": str(e)
         }
 
-# ====================================================================
-# TRAITEMENT LANGAGE NATUREL
-# ====================================================================
-
-def natural_language_to_gcp_action(query):
-    """Traduit une requête en langage naturel en action GCP"""
-    query_lower = query.lower()
+class LogRingBuffer:
+    """Journal borné adressé par offset d'octets : les plus anciens octets sont écartés"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._buffer = bytearray()
+        # Offset absolu du premier octet conservé
+        self._start = 0
+
+    @property
+    def end(self):
+        return self._start + len(self._buffer)
+
+    def append(self, data):
+        self._buffer.extend(data)
+        overflow = len(self._buffer) - self.max_bytes
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self._start += overflow
+
+    def read(self, offset, max_bytes):
+        """Renvoie (données, offset effectif) ; l'offset avance si le début a été écarté"""
+        offset = max(offset, self._start)
+        position = offset - self._start
+        data = bytes(self._buffer[position:position + max_bytes])
+        # Ne pas couper un caractère UTF-8 : un dernier caractère incomplet est lu au prochain
+        # appel, ou en entier s'il est le seul (les données renvoyées ne sont jamais vides)
+        if data and position + len(data) < len(self._buffer):
+            lead = len(data) - 1
+            while lead > 0 and len(data) - lead < 4 and (data[lead] & 0xC0) == 0x80:
+                lead -= 1
+            if data[lead] >= 0xC0:
+                length = 2 if data[lead] < 0xE0 else 3 if data[lead] < 0xF0 else 4
+                if len(data) - lead < length:
+                    if lead > 0:
+                        data = data[:lead]
+                    else:
+                        data = bytes(self._buffer[position:position + length])
+        return data, offset
+
+class TerraformJob:
+    """Commande Terraform exécutée en arrière-plan, avec journal consultable en direct"""
+
+    def __init__(self, job_id, action, working_dir, command, log_bytes, on_finish=None):
+        self.job_id = job_id
+        self.action = action
+        self.working_dir = working_dir
+        self.command = command
+        self.on_finish = on_finish
+        self.status = "queued"
+        self.exit_code = None
+        self.result = {}
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_requested = False
+        self._log = LogRingBuffer(log_bytes)
+        self._process = None
+        self._condition = threading.Condition()
+
+    def run(self):
+        try:
+            with terraform_workdir_lock(self.working_dir, timeout=-1):
+                with self._condition:
+                    if self.cancel_requested:
+                        self._finish("cancelled")
+                        return
+                    self.status = "running"
+                    self.started_at = time.time()
+                    self._process = subprocess.Popen(
+                        self.command, cwd=self.working_dir, env=terraform_env(),
+                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT
+                    )
+                while True:
+                    chunk = self._process.stdout.read1(65536)
+                    if not chunk:
+                        break
+                    with self._condition:
+                        self._log.append(chunk)
+                        self._condition.notify_all()
+                self.exit_code = self._process.wait()
+        except Exception as e:
+            with self._condition:
+                self._log.append(f"\n[erreur] {e}\n".encode('utf-8'))
+        self._finish()
+
+    def _finish(self, status=None):
+        if status is None:
+            if self.cancel_requested:
+                status = "cancelled"
+            elif self.exit_code is not None and self.exit_code in self.success_codes():
+                status = "succeeded"
+            else:
+                status = "failed"
+        if self.on_finish is not None:
+            try:
+                self.result = self.on_finish(self, status == "succeeded") or {}
+            except Exception as e:
+                self.result = {"error": str(e)}
+        with self._condition:
+            self.status = status
+            self.finished_at = time.time()
+            self._condition.notify_all()
+
+    def success_codes(self):
+        # plan -detailed-exitcode : 2 = changements à appliquer
+        return (0, 2) if self.action == "plan" else (0,)
+
+    def cancel(self):
+        """Interrompt la commande (SIGINT : Terraform s'arrête proprement et libère l'état)"""
+        with self._condition:
+            self.cancel_requested = True
+            if self._process is not None and self._process.poll() is None:
+                self._process.send_signal(signal.SIGINT)
+
+    @property
+    def done(self):
+        return self.status in ("succeeded", "failed", "cancelled")
+
+    def read_log(self, offset=0, max_bytes=65536, wait=0):
+        """Journal à partir d'un offset ; attend jusqu'à wait secondes si rien de nouveau"""
+        deadline = time.monotonic() + wait
+        # Au moins un caractère UTF-8 complet par lecture
+        max_bytes = max(max_bytes, 4)
+        with self._condition:
+            while self._log.end <= offset and not self.done:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            data, effective_offset = self._log.read(offset, max_bytes)
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "offset": effective_offset,
+                "next_offset": effective_offset + len(data),
+                "truncated": effective_offset > offset,
+                "complete": self.done and effective_offset + len(data) >= self._log.end,
+                "data": data.decode('utf-8', errors='replace')
+            }
 
-    # Patterns de création de VM
-    if any(word in query_lower for word in ["créer", "crée", "créer une vm", "nouvelle vm", "créer machine"]):
+    def to_dict(self):
+        with self._condition:
+            record = {
+                "job_id": self.job_id,
+                "action": self.action,
+                "working_dir": self.working_dir,
+                "status": self.status,
+                "exit_code": self.exit_code,
+                "log_bytes": self._log.end,
+                "submitted_at": datetime.datetime.fromtimestamp(self.submitted_at).isoformat(),
+                "duration_seconds": round(
+                    (self.finished_at or time.time()) - self.started_at, 2
+                ) if self.started_at else None
+            }
+        record.update(self.result)
+        return record
+
+class TerraformJobManager:
+    """Exécute les tâches Terraform en arrière-plan et conserve un historique borné"""
+
+    def __init__(self, workers, log_bytes, history_size):
+        self.log_bytes = log_bytes
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="terraform-job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def submit(self, action, working_dir, command, on_finish=None):
+        job = TerraformJob(
+            uuid.uuid4().hex[:12], action, str(Path(working_dir).resolve()),
+            command, self.log_bytes, on_finish
+        )
+        with self._lock:
+            self._jobs[job.job_id] = job
+            # Oubli des tâches terminées les plus anciennes au-delà de l'historique
+            for job_id in list(self._jobs):
+                if len(self._jobs) <= self.history_size:
+                    break
+                if self._jobs[job_id].done:
+                    del self._jobs[job_id]
+        self._executor.submit(job.run)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise ValueError(f"Tâche Terraform '{job_id}' inconnue")
+        return job
+
+    def list(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict() for job in reversed(jobs)]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
         return {
-            "action": "create_instance",
-            "suggestion": "Utilisez l'outil 'gcp_create_instance' avec les paramètres appropriés"
+            "jobs": len(statuses),
+            **{status: statuses.count(status) for status in ("queued", "running", "succeeded", "failed", "cancelled")},
+            "busy_working_dirs": terraform_workdir_locks.busy()
         }
 
-    # Patterns de liste
-    elif any(word in query_lower for word in ["liste", "affiche", "montre", "voir"]) and "vm" in query_lower:
+terraform_jobs = TerraformJobManager(TF_JOB_WORKERS, TF_JOB_LOG_BYTES, TF_JOB_HISTORY)
+
+def terraform_cli(command, *args, var_file=None):
+    """Ligne de commande terraform non interactive"""
+    cmd = ["terraform", command, "-no-color", "-input=false"]
+    if var_file:
+        cmd.append(f"-var-file={var_file}")
+    return cmd + list(args)
+
+def terraform_submit_job(action, working_dir=None, var_file=None, plan_id=None, auto_approve=True):
+    """Lance terraform plan/apply/destroy en arrière-plan et renvoie l'identifiant de tâche
+
+    Une tâche ne peut pas demander de confirmation : apply/destroy exigent
+    auto_approve, sauf apply d'un plan enregistré (plan_id) déjà relu.
+    """
+    try:
+        on_finish = None
+
+        if action == "plan":
+            fingerprint = terraform_config_fingerprint(working_dir)
+            var_file_digest = terraform_var_file_digest(working_dir, var_file)
+            new_plan_id, plan_file = terraform_plan_store.new_plan_file(working_dir)
+            command = terraform_cli("plan", "-detailed-exitcode", f"-out={plan_file}", var_file=var_file)
+
+            def on_finish(job, succeeded):
+                if not succeeded:
+                    plan_file.unlink(missing_ok=True)
+                    return {}
+                terraform_plan_store.register(
+                    new_plan_id, plan_file, working_dir, var_file, fingerprint, var_file_digest,
+                    has_changes=job.exit_code == 2
+                )
+                return {"plan_id": new_plan_id, "has_changes": job.exit_code == 2}
+
+        elif action == "apply" and plan_id:
+            record = terraform_plan_store.take(plan_id, working_dir)
+            working_dir = record["working_dir"]
+            command = terraform_cli("apply", "-auto-approve", record["plan_file"])
+
+            def on_finish(job, succeeded):
+                terraform_plan_store.consume(record)
+                return {"plan_id": plan_id}
+
+        elif action in ("apply", "destroy"):
+            if not working_dir:
+                raise ValueError("Paramètre 'working_dir' ou 'plan_id' requis")
+            if not auto_approve:
+                raise ValueError(
+                    f"terraform {action} en arrière-plan sans confirmation possible : "
+                    "auto_approve=true requis" + (" (ou plan_id d'un plan relu)" if action == "apply" else "")
+                )
+            command = terraform_cli(action, "-auto-approve", var_file=var_file)
+
+        else:
+            raise ValueError(f"Action Terraform '{action}' non supportée en arrière-plan")
+
+        if not Path(working_dir).is_dir():
+            raise ValueError(f"Répertoire {working_dir} introuvable")
+
+        job = terraform_jobs.submit(action, working_dir, command, on_finish)
         return {
-            "action": "list_instances",
-            "suggestion": "Utilisez l'outil 'gcp_list_instances'"
+            "success": True,
+            "job_id": job.job_id,
+            "status": job.status,
+            "message": f"terraform {action} lancé en arrière-plan"
         }
-
-    # Patterns de démarrage
-    elif any(word in query_lower for word in ["démarre", "démarrer", "start", "lance"]):
+    except Exception as e:
         return {
-            "action": "start_instance",
-            "suggestion": "Utilisez l'outil 'gcp_start_instance' avec le nom de l'instance"
+            "success": False,
+            "error": str(e)
         }
 
-    # Patterns d'arrêt
-    elif any(word in query_lower for word in ["arrête", "arrêter", "stop"]):
-        return {
-            "action": "stop_instance",
-            "suggestion": "Utilisez l'outil 'gcp_stop_instance' avec le nom de l'instance"
+# Étapes exécutées pour chaque pile selon l'action de terraform_run_many
+TERRAFORM_RUN_STEPS = {
+    "init": ("init",),
+    "plan": ("init", "plan"),
+    "apply": ("init", "plan", "apply"),
+    "destroy": ("init", "destroy")
+}
+
+def resolve_terraform_stacks(stacks):
+    """Normalise les piles et renvoie (piles par nom, ordre topologique) ; lève ValueError sur un cycle"""
+    by_name = OrderedDict()
+    for stack in stacks:
+        if isinstance(stack, str):
+            stack = {"working_dir": stack}
+        if not stack.get("working_dir"):
+            raise ValueError("Chaque pile doit indiquer 'working_dir'")
+        name = stack.get("name") or stack["working_dir"]
+        if name in by_name:
+            raise ValueError(f"Pile '{name}' déclarée plusieurs fois")
+        by_name[name] = {
+            "name": name,
+            "working_dir": stack["working_dir"],
+            "var_file": stack.get("var_file"),
+            "depends_on": list(dict.fromkeys(stack.get("depends_on", [])))
         }
 
-    # Patterns de suppression
-    elif any(word in query_lower for word in ["supprime", "supprimer", "delete", "détruit"]):
-        return {
-            "action": "delete_instance",
-            "suggestion": "Utilisez l'outil 'gcp_delete_instance' avec le nom de l'instance"
+    for stack in by_name.values():
+        for dependency in stack["depends_on"]:
+            if dependency not in by_name:
+                raise ValueError(f"Pile '{stack['name']}' : dépendance '{dependency}' inconnue")
+
+    # Tri topologique (Kahn) : détecte les cycles avant toute exécution
+    remaining = {name: len(stack["depends_on"]) for name, stack in by_name.items()}
+    order = [name for name, count in remaining.items() if count == 0]
+    for name in order:
+        for other in by_name.values():
+            if name in other["depends_on"]:
+                remaining[other["name"]] -= 1
+                if remaining[other["name"]] == 0:
+                    order.append(other["name"])
+    if len(order) != len(by_name):
+        cycle = sorted(set(by_name) - set(order))
+        raise ValueError(f"Cycle de dépendances entre les piles : {', '.join(cycle)}")
+
+    return by_name, order
+
+def run_terraform_stack(stack, steps, parallelism, started):
+    """Exécute les étapes Terraform d'une pile et chronomètre chacune d'elles"""
+    report = {
+        "name": stack["name"],
+        "working_dir": stack["working_dir"],
+        "status": "succeeded",
+        "start_offset_seconds": round(time.monotonic() - started, 2),
+        "steps": []
+    }
+    plan_id = None
+    for step in steps:
+        step_started = time.monotonic()
+        if step == "init":
+            result = terraform_init(stack["working_dir"])
+        elif step == "plan":
+            result = terraform_plan(stack["working_dir"], stack["var_file"], parallelism)
+            plan_id = result.get("plan_id")
+        elif step == "apply":
+            result = terraform_apply(plan_id=plan_id, parallelism=parallelism)
+        else:
+            result = terraform_destroy(stack["working_dir"], True, parallelism, stack.get("var_file"))
+
+        step_report = {
+            "step": step,
+            "success": result.get("success", False),
+            "duration_seconds": round(time.monotonic() - step_started, 2)
         }
+        for key in ("skipped", "plan_id", "has_changes"):
+            if key in result:
+                step_report[key] = result[key]
+        if not step_report["success"]:
+            step_report["error"] = result.get("error")
+        report["steps"].append(step_report)
+
+        if not step_report["success"]:
+            report["status"] = "failed"
+            break
+        # Rien à appliquer : inutile de lancer apply
+        if step == "plan" and not result.get("has_changes"):
+            break
+
+    report["duration_seconds"] = round(
+        time.monotonic() - started - report["start_offset_seconds"], 2
+    )
+    return report
+
+def terraform_run_many(stacks, action="plan", concurrency=None, parallelism=None):
+    """Exécute Terraform sur plusieurs piles en respectant leurs dépendances"""
+    if action not in TERRAFORM_RUN_STEPS:
+        raise ValueError(f"Action '{action}' invalide ({', '.join(TERRAFORM_RUN_STEPS)})")
+    by_name, order = resolve_terraform_stacks(stacks)
+    steps = TERRAFORM_RUN_STEPS[action]
+    concurrency = max(1, min(concurrency or TF_RUN_MANY_CONCURRENCY, len(by_name) or 1))
+
+    started = time.monotonic()
+    reports = {}
+    pending = {name: set(stack["depends_on"]) for name, stack in by_name.items()}
+    running = {}
+
+    def skip_dependents(failed_name):
+        # Une pile en échec arrête toutes les piles qui en dépendent, directement ou non
+        for name in order:
+            if name in pending and pending[name] & {failed_name}:
+                del pending[name]
+                reports[name] = {
+                    "name": name,
+                    "working_dir": by_name[name]["working_dir"],
+                    "status": "skipped",
+                    "reason": f"dépendance '{failed_name}' en échec ou ignorée",
+                    "steps": []
+                }
+                skip_dependents(name)
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="terraform-stack") as executor:
+        while pending or running:
+            for name in [n for n in order if n in pending and not pending[n]]:
+                del pending[name]
+                running[executor.submit(
+                    run_terraform_stack, by_name[name], steps, parallelism, started
+                )] = name
+
+            done, _ = wait_futures(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    reports[name] = future.result()
+                except Exception as e:
+                    reports[name] = {
+                        "name": name,
+                        "working_dir": by_name[name]["working_dir"],
+                        "status": "failed",
+                        "error": str(e),
+                        "steps": []
+                    }
+                report_progress(len(reports), len(by_name), f"Pile {name} : {reports[name]['status']}")
 
+                if reports[name]["status"] == "succeeded":
+                    for waiting in pending.values():
+                        waiting.discard(name)
+                else:
+                    skip_dependents(name)
+
+    statuses = [report["status"] for report in reports.values()]
     return {
-        "action": "unknown",
-        "suggestion": "Requête non reconnue. Utilisez les outils GCP disponibles."
+        "success": all(status == "succeeded" for status in statuses),
+        "action": action,
+        "stacks": [reports[name] for name in by_name],
+        "summary": {
+            status: statuses.count(status) for status in ("succeeded", "failed", "skipped")
+        },
+        "duration_seconds": round(time.monotonic() - started, 2)
     }
 
+# En-tête d'un état Terraform : serial et lineage figurent dans les premiers octets
+TERRAFORM_STATE_HEADER_BYTES = 4096
+_STATE_SERIAL_RE = re.compile(rb'"serial"\s*:\s*(\d+)')
+_STATE_LINEAGE_RE = re.compile(rb'"lineage"\s*:\s*"([^"]*)"')
+
+def terraform_state_version(working_dir):
+    """(lineage, serial) de l'état courant, sans lire ni analyser l'état complet"""
+    state_file = Path(working_dir) / "terraform.tfstate"
+    if state_file.is_file():
+        with open(state_file, 'rb') as f:
+            header = f.read(TERRAFORM_STATE_HEADER_BYTES)
+    else:
+        # Backend distant : seul le début de « terraform state pull » est lu
+        process = subprocess.Popen(
+            ["terraform", "state", "pull"], cwd=working_dir, env=terraform_env(),
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        try:
+            header = process.stdout.read(TERRAFORM_STATE_HEADER_BYTES)
+        finally:
+            process.kill()
+            process.wait()
+
+    serial = _STATE_SERIAL_RE.search(header)
+    lineage = _STATE_LINEAGE_RE.search(header)
+    return (
+        lineage.group(1).decode('utf-8') if lineage else None,
+        int(serial.group(1)) if serial else None
+    )
+
+class TerraformStateIndex:
+    """État Terraform analysé, indexé par adresse, type et module"""
+
+    def __init__(self, working_dir, version, show_output):
+        document = decode_json(show_output)
+        values = document.get("values") or {}
+        self.working_dir = working_dir
+        self.lineage, self.serial = version
+        self.json_bytes = len(show_output)
+        self.loaded_at = time.time()
+        self.terraform_version = document.get("terraform_version")
+        self.outputs = {
+            name: "(sensible)" if output.get("sensitive") else output.get("value")
+            for name, output in (values.get("outputs") or {}).items()
+        }
+        self.resources = OrderedDict()
+        self.by_type = {}
+        self.by_module = {}
+
+        modules = [(values.get("root_module") or {}, "")]
+        while modules:
+            module, module_address = modules.pop()
+            for resource in module.get("resources", []):
+                address = resource["address"]
+                self.resources[address] = {
+                    "address": address,
+                    "mode": resource.get("mode"),
+                    "type": resource.get("type"),
+                    "name": resource.get("name"),
+                    "index": resource.get("index"),
+                    "module": module_address,
+                    "provider": resource.get("provider_name"),
+                    "values": resource.get("values") or {}
+                }
+                self.by_type.setdefault(resource.get("type"), []).append(address)
+                self.by_module.setdefault(module_address, []).append(address)
+            for child in module.get("child_modules", []):
+                modules.append((child, child.get("address", "")))
+
+    def select(self, address=None, resource_type=None, module=None):
+        """Adresses correspondant aux critères, via les index"""
+        if address and "*" not in address and "?" not in address:
+            candidates = [address] if address in self.resources else []
+        elif resource_type:
+            candidates = self.by_type.get(resource_type, [])
+        elif module is not None:
+            candidates = self.by_module.get(module, [])
+        else:
+            candidates = list(self.resources)
+
+        address_re = re.compile(glob_to_regex(address)) if address else None
+        return [
+            candidate for candidate in candidates
+            if (address_re is None or address_re.fullmatch(candidate))
+            and (resource_type is None or self.resources[candidate]["type"] == resource_type)
+            and (module is None or self.resources[candidate]["module"] == module)
+        ]
+
+def project_attribute(values, path):
+    """Valeur d'un attribut par chemin pointé (ex: network_interface.0.network_ip)"""
+    for part in path.split("."):
+        if isinstance(values, list) and part.isdigit() and int(part) < len(values):
+            values = values[int(part)]
+        elif isinstance(values, dict) and part in values:
+            values = values[part]
+        else:
+            return None
+    return values
+
+class TerraformStateCache:
+    """Cache LRU des états analysés, invalidé quand le serial de l'état change
+
+    Avec un backend distant, lire le serial impose « terraform state pull »,
+    qui télécharge l'état complet : la version lue est réutilisée pendant
+    probe_ttl secondes, au prix d'un état potentiellement en retard d'autant.
+    """
+
+    def __init__(self, max_json_bytes, probe_ttl=30):
+        self.max_json_bytes = max_json_bytes
+        self.probe_ttl = probe_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._probes = {}
+        self._json_bytes = 0
+        self._remote_probes = 0
+        self._hits = 0
+        self._loads = 0
+        self._evictions = 0
+
+    def _version(self, key, force_refresh):
+        """(lineage, serial) de l'état ; sonde d'un backend distant réutilisée pendant probe_ttl"""
+        remote = not (Path(key) / "terraform.tfstate").is_file()
+        if remote and not force_refresh:
+            with self._lock:
+                probe = self._probes.get(key)
+            if probe is not None and time.monotonic() - probe[0] < self.probe_ttl:
+                return probe[1]
+
+        version = terraform_state_version(key)
+        if remote:
+            with self._lock:
+                self._probes[key] = (time.monotonic(), version)
+                self._remote_probes += 1
+        return version
+
+    def get(self, working_dir, force_refresh=False):
+        """Renvoie (index, depuis le cache)"""
+        key = str(Path(working_dir).resolve())
+        version = self._version(key, force_refresh)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not force_refresh and (entry.lineage, entry.serial) == version \
+                    and version[1] is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry, True
+            load_lock = self._loading.setdefault(key, threading.Lock())
+
+        # Un seul terraform show par répertoire, même sous requêtes concurrentes
+        with load_lock:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None and not force_refresh and (entry.lineage, entry.serial) == version \
+                        and version[1] is not None:
+                    self._hits += 1
+                    return entry, True
+
+            process = subprocess.run(
+                ["terraform", "show", "-json", "-no-color"], cwd=key, env=terraform_env(),
+                stdout=subprocess.PIPE, stderr=subprocess.PIPE
+            )
+            if process.returncode != 0:
+                raise RuntimeError(process.stderr.decode('utf-8', errors='replace').strip() or "terraform show a échoué")
+            entry = TerraformStateIndex(key, version, process.stdout)
+
+            with self._lock:
+                self._loads += 1
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self._json_bytes -= previous.json_bytes
+                # Un état plus gros que le budget est servi sans être conservé
+                if entry.json_bytes <= self.max_json_bytes:
+                    self._entries[key] = entry
+                    self._json_bytes += entry.json_bytes
+                    while self._json_bytes > self.max_json_bytes:
+                        _, evicted = self._entries.popitem(last=False)
+                        self._json_bytes -= evicted.json_bytes
+                        self._evictions += 1
+            return entry, False
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "json_bytes": self._json_bytes,
+                "max_json_bytes": self.max_json_bytes,
+                "remote_probes": self._remote_probes,
+                "hits": self._hits,
+                "loads": self._loads,
+                "evictions": self._evictions
+            }
+
+terraform_state_cache = TerraformStateCache(TF_STATE_CACHE_MAX_JSON_BYTES, TF_STATE_REMOTE_PROBE_TTL)
+
+def terraform_state_query(working_dir, address=None, resource_type=None, module=None,
+                          attributes=None, include_outputs=False, limit=100, force_refresh=False):
+    """Interroge l'état Terraform d'un répertoire (analysé une fois par serial)"""
+    try:
+        index, from_cache = terraform_state_cache.get(working_dir, force_refresh)
+        addresses = index.select(address, resource_type, module)
+
+        resources = []
+        for resource_address in addresses[:limit]:
+            resource = index.resources[resource_address]
+            item = {key: value for key, value in resource.items() if key != "values"}
+            if attributes:
+                item["values"] = {path: project_attribute(resource["values"], path) for path in attributes}
+            else:
+                item["values"] = resource["values"]
+            resources.append(item)
+
+        result = {
+            "success": True,
+            "serial": index.serial,
+            "lineage": index.lineage,
+            "from_cache": from_cache,
+            "total": len(addresses),
+            "count": len(resources),
+            "resources": resources
+        }
+        if include_outputs:
+            result["outputs"] = index.outputs
+        if not address and not resource_type and module is None:
+            result["types"] = {name: len(items) for name, items in index.by_type.items()}
+            result["modules"] = {name or "(racine)": len(items) for name, items in index.by_module.items()}
+        return result
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e)
+        }
+
 # ====================================================================
-# ENDPOINTS MCP - Format JSON-RPC
+# TRAITEMENT LANGAGE NATUREL
 # ====================================================================
 
-@app.route('/', methods=['GET', 'POST'])
-def root():
-    """Endpoint racine - Support JSON-RPC et REST"""
-    if request.method == 'GET':
-        return jsonify({
-            "name": "GCP Infrastructure MCP Server",
-            "version": "2.0.0",
-            "protocol": "mcp",
-            "capabilities": {
-                "tools": True,
-                "resources": True
-            },
-            "features": [
-                "GCP Compute Engine Management",
-                "SSH Key Management",
-                "Remote SSH Execution",
-                "Terraform Infrastructure as Code"
-            ]
+# Nombres écrits en toutes lettres reconnus devant "vm", "instances"...
+NATURAL_QUERY_NUMBERS = {
+    "un": 1, "une": 1, "one": 1, "deux": 2, "two": 2, "trois": 3, "three": 3,
+    "quatre": 4, "four": 4, "cinq": 5, "five": 5, "six": 6, "sept": 7, "seven": 7,
+    "huit": 8, "eight": 8, "neuf": 9, "nine": 9, "dix": 10, "ten": 10
+}
+# Mots qui suivent "vm"/"instance" sans être un nom d'instance
+NATURAL_QUERY_STOPWORDS = [
+    "pour", "for", "dans", "in", "en", "de", "des", "du", "la", "le", "les", "the", "a", "an",
+    "avec", "with", "qui", "that", "sur", "on", "et", "and", "à", "au", "of", "is", "sont", "are",
+    "nomm[ée]e?s?", "appel[ée]e?s?", "named", "called", "zone", "type", "ma", "mon", "my", "this",
+    "cette", "ce", "it", "please", "stp", "svp"
+] + list(NATURAL_QUERY_NUMBERS)
+# Ordre de priorité quand une requête contient plusieurs verbes
+NATURAL_QUERY_INTENTS = ["create", "get", "list", "restart", "start", "stop", "delete"]
+NATURAL_QUERY_SUGGESTIONS = {
+    "create": "Utilisez l'outil 'gcp_create_instance' avec les paramètres appropriés",
+    "get": "Utilisez l'outil 'gcp_get_instance' avec le nom de l'instance",
+    "list": "Utilisez l'outil 'gcp_list_instances'",
+    "restart": "Utilisez 'gcp_stop_instance' (wait: true) puis 'gcp_start_instance' avec le nom de l'instance",
+    "start": "Utilisez l'outil 'gcp_start_instance' avec le nom de l'instance",
+    "stop": "Utilisez l'outil 'gcp_stop_instance' avec le nom de l'instance",
+    "delete": "Utilisez l'outil 'gcp_delete_instance' avec le nom de l'instance"
+}
+
+def natural_query_pattern():
+    """Construit l'expression unique qui reconnaît intentions et entités en une passe
+
+    Chaque alternative est un groupe nommé : intent_<action>, ou le nom de
+    l'entité. À une même position, la première alternative l'emporte :
+    les entités précises (zone, type de machine...) passent donc avant les
+    noms d'instance génériques. Seul un nom entre guillemets peut commencer
+    ailleurs qu'en début de mot.
+    """
+    resource = r"(?:vms?|instances?|machines?|serveurs?|servers?)"
+    number = r"(?:\d+|" + "|".join(NATURAL_QUERY_NUMBERS) + r")"
+    # Nom d'instance Compute : minuscules, chiffres et tirets ; * pour un motif
+    name = r"[a-z*][-a-z0-9*]{0,62}"
+    not_stopword = r"(?!(?:" + "|".join(NATURAL_QUERY_STOPWORDS) + r")\b)"
+
+    alternatives = [
+        ("zone", r"[a-z]+-[a-z]+\d+-[a-z]"),
+        ("machine_type", r"[a-z]\d[a-z]?-(?:standard|highmem|highcpu|highgpu|ultramem|megamem|micro|small|medium)(?:-\d+)?"),
+        ("image_family", r"(?:debian-\d+|ubuntu-\d{4}(?:-lts)?|rocky-linux-\d+|centos-stream-\d+|cos-stable)"),
+        ("disk_size_gb", r"(?P<disk_value>\d+)\s*(?:go|gb|gio|gib)"),
+        ("count", rf"(?P<count_value>{number})\s+(?:(?:nouvelles?|new)\s+)?{resource}"),
+        ("status_running", r"(?:running|en\s+cours|actives?|d[ée]marr[ée]e?s|allum[ée]e?s|started)"),
+        ("status_terminated", r"(?:stopped|terminated|arr[êe]t[ée]e?s|[ée]teintes?|inactives?)"),
+        ("named", rf"(?:nomm[ée]e?s?|appel[ée]e?s?|named|called)\s+[\"'`]?(?P<named_value>{name})"),
+        ("intent_create", r"(?:cr[ée]e[rsz]?|create|nouvelles?|new|provisionne[rz]?|provision|spin\s+up|d[ée]ploie[rz]?|deploy)"),
+        ("intent_get", r"(?:d[ée]tails?|infos?|informations?|describe|d[ée]cri[rst]e?|statut|status|[ée]tat|inspect)"),
+        ("intent_list", r"(?:list(?:e[rsz]?|es)?|affiche[rz]?|montre[rz]?|voir|show|display|combien|how\s+many|quel(?:le)?s?|which|what)"),
+        ("intent_restart", r"(?:red[ée]marre[rz]?|relance[rz]?|r[ée]initialise[rz]?|restart|reboot|reset)"),
+        ("intent_start", r"(?:d[ée]marre[rz]?|start|lance[rz]?|launch|allume[rz]?|boot|power\s+on|r[ée]veille[rz]?)"),
+        ("intent_stop", r"(?:arr[êe]te[rz]?|stop(?:pe[rz]?)?|[ée]teins|[ée]teindre|shut\s*down|halt|power\s+off|coupe[rz]?)"),
+        ("intent_delete", r"(?:supprime[rz]?|delete|remove|d[ée]trui[rst]e?|efface[rz]?|destroy|terminate|drop)"),
+        # Un nom nu après "vm"/"instance" doit contenir un chiffre, un tiret ou * (web-1, db01)
+        ("after_resource", rf"{resource}\s+{not_stopword}(?P<after_resource_value>(?=[a-z]*[-0-9*]){name})"),
+        ("resource", resource),
+        # Impératifs et inversions (montre-moi, est-il) : ni verbe reconnu ni nom d'instance
+        ("filler", r"[a-zéèêàç]+(?:-(?:moi|nous|les|la|le|lui|leur|toi|y|t|il|elle|on|ce))+"),
+        ("hyphenated", r"[a-z][a-z0-9]*(?:-[a-z0-9*]+)+"),
+    ]
+    # Les verbes acceptent un pronom accolé (montre-moi, arrête-les)
+    pronoun = r"(?:-(?:moi|nous|les|la|le|lui|leur))?"
+    words = "|".join(
+        rf"(?P<{group}>{pattern}{pronoun if group.startswith('intent_') else ''})"
+        for group, pattern in alternatives
+    )
+    return re.compile(
+        rf"(?P<quoted>[\"'`](?P<quoted_value>{name})[\"'`])|\b(?:{words})(?![-\w])",
+        re.IGNORECASE
+    )
+
+NATURAL_QUERY_PATTERN = natural_query_pattern()
+
+def parse_natural_query(query):
+    """Analyse une requête en une passe : verbes reconnus et entités extraites"""
+    intents = set()
+    entities = {}
+    names = []
+    has_resource = False
+    for match in NATURAL_QUERY_PATTERN.finditer(query):
+        group = match.lastgroup
+        value = match.group(group).lower()
+        if group.startswith("intent_"):
+            intents.add(group[len("intent_"):])
+        elif group in ("named", "quoted", "after_resource"):
+            names.append(match.group(f"{group}_value").lower())
+            has_resource = has_resource or group == "after_resource"
+        elif group == "hyphenated":
+            names.append(value)
+        elif group == "resource":
+            has_resource = True
+        elif group == "filler":
+            continue
+        elif group == "count":
+            count = match.group("count_value").lower()
+            entities["count"] = NATURAL_QUERY_NUMBERS.get(count) or int(count)
+            has_resource = True
+        elif group == "disk_size_gb":
+            entities["disk_size_gb"] = int(match.group("disk_value"))
+        elif group.startswith("status_"):
+            entities["status"] = group[len("status_"):].upper()
+        else:
+            entities[group] = value
+    if names:
+        entities["instance_names"] = list(dict.fromkeys(names))
+    return intents, entities, has_resource
+
+def natural_query_tool_call(action, entities):
+    """Construit l'appel tools/call correspondant, ou la liste des paramètres manquants"""
+    names = entities.get("instance_names", [])
+    zone = {"zone": entities["zone"]} if "zone" in entities else {}
+
+    if action == "list":
+        arguments = dict(zone)
+        if "status" in entities:
+            arguments["status"] = entities["status"]
+        for name in names:
+            if name.endswith("*") and "*" not in name[:-1]:
+                arguments["name_prefix"] = name[:-1]
+        return {"name": "gcp_list_instances", "arguments": arguments}, []
+
+    if not names:
+        return None, ["instance_name"]
+
+    if action == "create":
+        options = dict(zone, **{
+            key: entities[key]
+            for key in ("machine_type", "disk_size_gb", "image_family") if key in entities
         })
-    else:
-        return handle_jsonrpc()
+        count = entities.get("count", 1)
+        if len(names) > 1:
+            return {"name": "gcp_bulk_create", "arguments": dict(options, instance_names=names)}, []
+        if count > 1:
+            return {"name": "gcp_bulk_create", "arguments": dict(
+                options, name_pattern=f"{names[0]}-{{index}}", count=count
+            )}, []
+        return {"name": "gcp_create_instance", "arguments": dict(options, instance_name=names[0])}, []
+
+    if action == "get":
+        return {"name": "gcp_get_instance", "arguments": dict(zone, instance_name=names[0])}, []
+
+    if len(names) > 1 or "*" in names[0]:
+        selector = {"instance_names": names} if not any("*" in name for name in names) \
+            else {"name_pattern": names[0]}
+        return {"name": f"gcp_bulk_{action}", "arguments": dict(zone, **selector)}, []
+    return {"name": f"gcp_{action}_instance", "arguments": dict(zone, instance_name=names[0])}, []
+
+def natural_language_to_gcp_action(query, include_tool_call=True):
+    """Traduit une requête en langage naturel (français ou anglais) en action GCP"""
+    intents, entities, has_resource = parse_natural_query(query)
+    names = entities.get("instance_names")
+
+    action = None
+    for intent in NATURAL_QUERY_INTENTS:
+        if intent not in intents:
+            continue
+        # Sans nom d'instance, "détails"/"status" et "affiche" ne suffisent pas à eux seuls
+        if intent == "get" and not names:
+            continue
+        if intent == "list" and not has_resource:
+            continue
+        action = intent
+        break
+
+    if action is None:
+        return {
+            "action": "unknown",
+            "suggestion": "Requête non reconnue. Utilisez les outils GCP disponibles.",
+            "entities": entities
+        }
 
-@app.route('/mcp', methods=['GET', 'POST'])
-def mcp_endpoint():
-    """Endpoint principal MCP en format JSON-RPC"""
-    if request.method == 'GET':
-        # Endpoint de découverte pour les clients MCP
-        return jsonify({
-            "jsonrpc": "2.0",
-            "name": "GCP Infrastructure MCP Server",
-            "version": "2.0.0",
-            "protocol": "mcp",
-            "protocolVersion": "2024-11-05",
-            "capabilities": {
-                "tools": True,
-                "resources": True
-            },
-            "serverInfo": {
-                "name": "GCP Infrastructure MCP Server",
-                "version": "2.0.0"
-            },
-            "features": [
-                "GCP Compute Engine Management",
-                "SSH Key Management",
-                "Remote SSH Execution",
-                "Terraform Infrastructure as Code"
-            ],
-            "endpoint": {
-                "method": "POST",
-                "contentType": "application/json",
-                "format": "JSON-RPC 2.0"
+    result = {
+        "action": f"{action}_instances" if action == "list" else f"{action}_instance",
+        "suggestion": NATURAL_QUERY_SUGGESTIONS[action],
+        "entities": entities
+    }
+    if include_tool_call:
+        next_tool_call = None
+        if action == "restart":
+            # Pas d'outil de redémarrage : arrêt attendu, puis démarrage (next_tool_call)
+            tool_call, missing = natural_query_tool_call("stop", entities)
+            if tool_call is not None:
+                next_tool_call = {
+                    "name": tool_call["name"].replace("stop", "start"),
+                    "arguments": dict(tool_call["arguments"])
+                }
+                tool_call["arguments"]["wait"] = True
+        else:
+            tool_call, missing = natural_query_tool_call(action, entities)
+        result["tool_call"] = tool_call
+        if next_tool_call is not None:
+            result["next_tool_call"] = next_tool_call
+        if missing:
+            result["missing"] = missing
+    return result
+
+# ====================================================================
+# OUTILS MCP
+# ====================================================================
+
+# Registre des outils : nom -> ToolSpec (ordre d'enregistrement = ordre de tools/list)
+TOOL_REGISTRY = {}
+
+# Délai par défaut et concurrence maximale par classe d'outils
+TOOL_CATEGORY_TIMEOUTS = {
+    "gcp": TOOL_TIMEOUT_GCP,
+    "ssh": TOOL_TIMEOUT_SSH,
+    "terraform": TOOL_TIMEOUT_TERRAFORM,
+    "terraform_state": TOOL_TIMEOUT_TERRAFORM_STATE
+}
+TOOL_CATEGORY_LIMITS = {
+    "gcp": threading.BoundedSemaphore(TOOL_CONCURRENCY_GCP),
+    "ssh": threading.BoundedSemaphore(TOOL_CONCURRENCY_SSH),
+    "terraform": threading.BoundedSemaphore(TOOL_CONCURRENCY_TERRAFORM),
+    "terraform_state": threading.BoundedSemaphore(TOOL_CONCURRENCY_TERRAFORM_STATE)
+}
+
+class ToolSpec:
+    """Déclaration d'un outil MCP : schéma, gestionnaire, limites et statistiques"""
+
+    def __init__(self, name, description, handler, properties=None, required=None,
+                 category="local", timeout=None, cacheable=False):
+        self.name = name
+        self.description = description
+        self.handler = handler
+        self.properties = properties or {}
+        self.required = required or []
+        self.category = category
+        self.timeout = timeout if timeout is not None else TOOL_CATEGORY_TIMEOUTS.get(category)
+        # Lecture seule : résultat réutilisable tant qu'aucun autre outil n'a été appelé
+        self.cacheable = cacheable
+        self._lock = threading.Lock()
+        self._calls = 0
+        self._cache_hits = 0
+        self._errors = 0
+        self._timeouts = 0
+        self._total_ms = 0.0
+        self._max_ms = 0.0
+
+    def schema(self):
+        """Entrée du catalogue tools/list"""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "inputSchema": {
+                "type": "object",
+                "properties": self.properties,
+                "required": self.required
             }
-        })
-    else:
-        return handle_jsonrpc()
+        }
 
-def handle_jsonrpc():
-    """Gère les requêtes JSON-RPC selon le protocole MCP"""
-    data = request.get_json()
-    if not data:
-        return jsonify({
-            "jsonrpc": "2.0",
-            "error": {"code": -32700, "message": "Parse error"},
-            "id": None
-        }), 400
+    def record(self, elapsed_ms, error=False, timed_out=False, cache_hit=False):
+        with self._lock:
+            self._calls += 1
+            self._cache_hits += int(cache_hit)
+            self._errors += int(error)
+            self._timeouts += int(timed_out)
+            self._total_ms += elapsed_ms
+            self._max_ms = max(self._max_ms, elapsed_ms)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "category": self.category,
+                "cacheable": self.cacheable,
+                "calls": self._calls,
+                "cache_hits": self._cache_hits,
+                "errors": self._errors,
+                "timeouts": self._timeouts,
+                "avg_ms": round(self._total_ms / self._calls, 2) if self._calls else 0,
+                "max_ms": round(self._max_ms, 2)
+            }
 
-    if isinstance(data, list):
-        results = [process_jsonrpc_request(req) for req in data]
-        return jsonify(results)
-    else:
-        result = process_jsonrpc_request(data)
-        return jsonify(result)
+def mcp_tool(name, description, properties=None, required=None, category="local",
+             timeout=None, cacheable=False):
+    """Décorateur : enregistre un gestionnaire d'outil dans TOOL_REGISTRY"""
+    def register(handler):
+        TOOL_REGISTRY[name] = ToolSpec(
+            name, description, handler, properties, required, category, timeout, cacheable
+        )
+        return handler
+    return register
 
-def process_jsonrpc_request(request_data):
-    """Traite une requête JSON-RPC individuelle"""
-    jsonrpc = request_data.get("jsonrpc", "2.0")
-    method = request_data.get("method")
-    params = request_data.get("params", {})
-    request_id = request_data.get("id")
+def encode_tool_result(data, pretty=False):
+    """Enveloppe le résultat d'un outil au format MCP (contenu texte JSON)"""
+    return {
+        "content": [{
+            "type": "text",
+            "text": encode_json_text(data, pretty)
+        }]
+    }
 
+class ToolResultCache:
+    """Résultats récents des outils cacheable, par (outil, arguments), avec durée de validité
+
+    Tout appel d'un outil non cacheable (susceptible de modifier quelque chose)
+    vide le cache ; un résultat calculé pendant un tel appel n'est pas conservé.
+    """
+
+    def __init__(self, ttl=5, max_entries=256):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    @staticmethod
+    def key(tool_name, arguments):
+        # force_refresh ne change pas le résultat attendu : même entrée que l'appel sans l'option
+        arguments = {name: value for name, value in arguments.items() if name != "force_refresh"}
+        return tool_name, json.dumps(arguments, sort_keys=True, default=str)
+
+    def get(self, key):
+        """Retourne (résultat ou None, génération à passer à put)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] < self.ttl:
+                self._entries.move_to_end(key)
+                self._stats["hits"] += 1
+                return entry[1], self._generation
+            self._entries.pop(key, None)
+            self._stats["misses"] += 1
+            return None, self._generation
+
+    def put(self, key, data, generation):
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._entries[key] = (time.monotonic(), data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self):
+        with self._lock:
+            self._generation += 1
+            if self._entries:
+                self._entries.clear()
+                self._stats["invalidations"] += 1
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["ttl"] = self.ttl
+            stats["entries"] = len(self._entries)
+            return stats
+
+tool_result_cache = ToolResultCache(TOOL_RESULT_CACHE_TTL, TOOL_RESULT_CACHE_SIZE)
+
+# Exécuteur des outils soumis à un délai (GCP, SSH, Terraform, états Terraform)
+tool_executor = ThreadPoolExecutor(
+    max_workers=(
+        TOOL_CONCURRENCY_GCP + TOOL_CONCURRENCY_SSH + TOOL_CONCURRENCY_TERRAFORM
+        + TOOL_CONCURRENCY_TERRAFORM_STATE
+    ),
+    thread_name_prefix="mcp-tool"
+)
+
+def _run_tool_handler(spec, arguments, reporter):
+    """Exécute un gestionnaire dans un thread de l'exécuteur, avec le canal de progression de l'appelant"""
+    _progress_context.reporter = reporter
     try:
-        if method == "initialize":
-            result = {
-                "protocolVersion": "2024-11-05",
-                "capabilities": {
-                    "tools": {},
-                    "resources": {}
-                },
-                "serverInfo": {
-                    "name": "GCP Infrastructure MCP Server",
-                    "version": "2.0.0"
-                }
-            }
+        return spec.handler(arguments)
+    finally:
+        _progress_context.reporter = None
+
+def call_tool(tool_name, arguments, pretty=None):
+    """Appelle un outil enregistré et renvoie son résultat MCP"""
+    spec = TOOL_REGISTRY.get(tool_name)
+    if spec is None:
+        raise ValueError(f"Outil '{tool_name}' non trouvé")
+
+    pretty = JSON_PRETTY if pretty is None else pretty
+    started = time.monotonic()
+    cache_key = generation = None
+    if not spec.cacheable:
+        tool_result_cache.invalidate()
+    elif tool_result_cache.ttl > 0:
+        cache_key = tool_result_cache.key(tool_name, arguments)
+        # force_refresh : le gestionnaire relit la source, le résultat remplace l'entrée
+        data, generation = tool_result_cache.get(cache_key)
+        if data is not None and not arguments.get("force_refresh"):
+            spec.record((time.monotonic() - started) * 1000, cache_hit=True)
+            return encode_tool_result(data, pretty)
+
+    limit = TOOL_CATEGORY_LIMITS.get(spec.category)
+    error = timed_out = False
+    try:
+        if limit is not None and not limit.acquire(timeout=spec.timeout):
+            raise TimeoutError(f"Trop d'appels '{spec.category}' simultanés pour '{tool_name}'")
+        if spec.timeout is None:
+            try:
+                data = spec.handler(arguments)
+            finally:
+                if limit is not None:
+                    limit.release()
+        else:
+            try:
+                future = tool_executor.submit(
+                    _run_tool_handler, spec, arguments,
+                    getattr(_progress_context, "reporter", None)
+                )
+            except Exception:
+                if limit is not None:
+                    limit.release()
+                raise
+            if limit is not None:
+                # Un gestionnaire qui dépasse son délai continue de s'exécuter :
+                # sa place n'est rendue qu'à sa fin réelle
+                future.add_done_callback(lambda _: limit.release())
+            try:
+                data = future.result(timeout=spec.timeout)
+            except FutureTimeoutError:
+                timed_out = True
+                raise TimeoutError(f"Outil '{tool_name}' : délai de {spec.timeout} s dépassé")
+        if isinstance(data, dict) and data.get("success") is False:
+            error = True
+        elif cache_key is not None:
+            tool_result_cache.put(cache_key, data, generation)
+        return encode_tool_result(data, pretty)
+    except Exception:
+        error = True
+        raise
+    finally:
+        if not spec.cacheable:
+            # Fin d'une modification éventuelle : les résultats obtenus entre-temps sont écartés
+            tool_result_cache.invalidate()
+        spec.record((time.monotonic() - started) * 1000, error, timed_out)
+
+def tool_stats():
+    """Statistiques d'appel par outil (outils déjà appelés uniquement)"""
+    return {
+        name: spec.stats()
+        for name, spec in TOOL_REGISTRY.items()
+        if spec._calls
+    }
 
-        elif method == "tools/list":
-            result = {
-                "tools": [
-                    # SSH Key Management
-                    {
-                        "name": "ssh_generate_key",
-                        "description": "Génère une nouvelle paire de clés SSH",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "key_name": {"type": "string", "description": "Nom de la clé SSH"},
-                                "description": {"type": "string", "description": "Description optionnelle"}
-                            },
-                            "required": ["key_name"]
-                        }
-                    },
-                    {
-                        "name": "ssh_add_key",
-                        "description": "Ajoute une clé SSH existante",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "key_name": {"type": "string", "description": "Nom de la clé SSH"},
-                                "private_key": {"type": "string", "description": "Clé privée SSH au format PEM"},
-                                "public_key": {"type": "string", "description": "Clé publique SSH"},
-                                "description": {"type": "string", "description": "Description optionnelle"}
-                            },
-                            "required": ["key_name", "private_key", "public_key"]
-                        }
-                    },
-                    {
-                        "name": "ssh_list_keys",
-                        "description": "Liste toutes les clés SSH disponibles",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {},
-                            "required": []
-                        }
-                    },
-
-                    # GCP Compute Engine
-                    {
-                        "name": "gcp_list_instances",
-                        "description": "Liste toutes les instances VM dans GCP",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "zone": {"type": "string", "description": "Zone GCP (défaut: us-central1-a)"}
-                            },
-                            "required": []
-                        }
-                    },
-                    {
-                        "name": "gcp_create_instance",
-                        "description": "Crée une nouvelle instance VM dans GCP",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "instance_name": {"type": "string", "description": "Nom de l'instance"},
-                                "machine_type": {"type": "string", "description": "Type de machine (défaut: e2-medium)"},
-                                "disk_size_gb": {"type": "integer", "description": "Taille du disque en GB (défaut: 10)"},
-                                "image_family": {"type": "string", "description": "Famille d'image (défaut: debian-11)"},
-                                "ssh_key_name": {"type": "string", "description": "Nom de la clé SSH à utiliser"}
-                            },
-                            "required": ["instance_name"]
-                        }
-                    },
-                    {
-                        "name": "gcp_start_instance",
-                        "description": "Démarre une instance VM",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "instance_name": {"type": "string", "description": "Nom de l'instance"},
-                                "zone": {"type": "string", "description": "Zone GCP"}
-                            },
-                            "required": ["instance_name"]
-                        }
-                    },
-                    {
-                        "name": "gcp_stop_instance",
-                        "description": "Arrête une instance VM",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "instance_name": {"type": "string", "description": "Nom de l'instance"},
-                                "zone": {"type": "string", "description": "Zone GCP"}
-                            },
-                            "required": ["instance_name"]
-                        }
-                    },
-                    {
-                        "name": "gcp_delete_instance",
-                        "description": "Supprime une instance VM",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "instance_name": {"type": "string", "description": "Nom de l'instance"},
-                                "zone": {"type": "string", "description": "Zone GCP"}
-                            },
-                            "required": ["instance_name"]
-                        }
-                    },
-                    {
-                        "name": "gcp_get_instance",
-                        "description": "Obtient les détails d'une instance",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "instance_name": {"type": "string", "description": "Nom de l'instance"},
-                                "zone": {"type": "string", "description": "Zone GCP"}
-                            },
-                            "required": ["instance_name"]
-                        }
-                    },
-
-                    # SSH Remote Execution
-                    {
-                        "name": "ssh_execute",
-                        "description": "Exécute une commande SSH sur une machine distante",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "host": {"type": "string", "description": "Adresse IP ou hostname"},
-                                "username": {"type": "string", "description": "Nom d'utilisateur SSH"},
-                                "command": {"type": "string", "description": "Commande à exécuter"},
-                                "ssh_key_name": {"type": "string", "description": "Nom de la clé SSH à utiliser"}
-                            },
-                            "required": ["host", "username", "command", "ssh_key_name"]
-                        }
-                    },
-                    {
-                        "name": "ssh_upload_file",
-                        "description": "Upload un fichier via SSH",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "host": {"type": "string", "description": "Adresse IP ou hostname"},
-                                "username": {"type": "string", "description": "Nom d'utilisateur SSH"},
-                                "local_path": {"type": "string", "description": "Chemin local du fichier"},
-                                "remote_path": {"type": "string", "description": "Chemin distant du fichier"},
-                                "ssh_key_name": {"type": "string", "description": "Nom de la clé SSH à utiliser"}
-                            },
-                            "required": ["host", "username", "local_path", "remote_path", "ssh_key_name"]
-                        }
-                    },
-
-                    # Terraform
-                    {
-                        "name": "terraform_init",
-                        "description": "Initialise Terraform dans un répertoire",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "working_dir": {"type": "string", "description": "Répertoire de travail Terraform"}
-                            },
-                            "required": ["working_dir"]
-                        }
-                    },
-                    {
-                        "name": "terraform_plan",
-                        "description": "Planifie un déploiement Terraform",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "working_dir": {"type": "string", "description": "Répertoire de travail Terraform"},
-                                "var_file": {"type": "string", "description": "Fichier de variables"}
-                            },
-                            "required": ["working_dir"]
-                        }
-                    },
-                    {
-                        "name": "terraform_apply",
-                        "description": "Applique un déploiement Terraform",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "working_dir": {"type": "string", "description": "Répertoire de travail Terraform"},
-                                "var_file": {"type": "string", "description": "Fichier de variables"},
-                                "auto_approve": {"type": "boolean", "description": "Auto-approuver (défaut: true)"}
-                            },
-                            "required": ["working_dir"]
-                        }
-                    },
-                    {
-                        "name": "terraform_destroy",
-                        "description": "Détruit l'infrastructure Terraform",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "working_dir": {"type": "string", "description": "Répertoire de travail Terraform"},
-                                "auto_approve": {"type": "boolean", "description": "Auto-approuver (défaut: true)"}
-                            },
-                            "required": ["working_dir"]
-                        }
-                    },
-
-                    # Natural Language Helper
-                    {
-                        "name": "gcp_natural_query",
-                        "description": "Interprète une requête en langage naturel pour GCP",
-                        "inputSchema": {
-                            "type": "object",
-                            "properties": {
-                                "query": {"type": "string", "description": "Requête en français"}
-                            },
-                            "required": ["query"]
-                        }
-                    }
-                ]
-            }
+# Gestion des clés SSH
+
+@mcp_tool(
+    "ssh_generate_key",
+    "Génère une nouvelle paire de clés SSH",
+    properties={
+        "key_name": {"type": "string", "description": "Nom de la clé SSH"},
+        "description": {"type": "string", "description": "Description optionnelle"},
+        "key_type": {"type": "string", "description": "Type de clé : rsa (défaut), ed25519 ou ecdsa"},
+        "bits": {"type": "integer", "description": "Taille : 2048+ pour rsa (défaut: 2048), 256/384/521 pour ecdsa"}
+    },
+    required=["key_name"]
+)
+def tool_ssh_generate_key(arguments):
+    key_name = arguments.get("key_name")
+    description = arguments.get("description", "")
+    key_type = arguments.get("key_type", "rsa")
+
+    private_key, public_key = generate_ssh_key_pair(key_name, key_type, arguments.get("bits"))
+    store_ssh_key(key_name, private_key, public_key, description)
 
-        elif method == "tools/call":
-            tool_name = params.get("name")
-            arguments = params.get("arguments", {})
+    return {
+        "success": True,
+        "key_name": key_name,
+        "key_type": key_type,
+        "public_key": public_key,
+        "fingerprint": load_ssh_key(key_name)["fingerprint"],
+        "message": f"Clé SSH '{key_name}' générée et stockée avec succès"
+    }
 
-            # SSH Key Management
-            if tool_name == "ssh_generate_key":
-                key_name = arguments.get("key_name")
-                description = arguments.get("description", "")
+@mcp_tool(
+    "ssh_add_key",
+    "Ajoute une clé SSH existante",
+    properties={
+        "key_name": {"type": "string", "description": "Nom de la clé SSH"},
+        "private_key": {"type": "string", "description": "Clé privée SSH au format PEM"},
+        "public_key": {"type": "string", "description": "Clé publique SSH"},
+        "description": {"type": "string", "description": "Description optionnelle"}
+    },
+    required=["key_name", "private_key", "public_key"]
+)
+def tool_ssh_add_key(arguments):
+    key_name = arguments.get("key_name")
+    private_key = arguments.get("private_key")
+    public_key = arguments.get("public_key")
+    description = arguments.get("description", "")
+
+    store_ssh_key(key_name, private_key, public_key, description)
 
-                private_key, public_key = generate_ssh_key_pair(key_name)
-                store_ssh_key(key_name, private_key, public_key, description)
+    return {
+        "success": True,
+        "key_name": key_name,
+        "message": f"Clé SSH '{key_name}' ajoutée avec succès"
+    }
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "success": True,
-                            "key_name": key_name,
-                            "public_key": public_key,
-                            "message": f"Clé SSH '{key_name}' générée et stockée avec succès"
-                        }, indent=2)
-                    }]
-                }
+@mcp_tool(
+    "ssh_list_keys",
+    "Liste toutes les clés SSH disponibles",
+    cacheable=True
+)
+def tool_ssh_list_keys(arguments):
+    keys = list_ssh_keys()
 
-            elif tool_name == "ssh_add_key":
-                key_name = arguments.get("key_name")
-                private_key = arguments.get("private_key")
-                public_key = arguments.get("public_key")
-                description = arguments.get("description", "")
+    return {
+        "success": True,
+        "keys": keys,
+        "count": len(keys)
+    }
 
-                store_ssh_key(key_name, private_key, public_key, description)
+# GCP Compute Engine
+
+@mcp_tool(
+    "gcp_list_instances",
+    "Liste toutes les instances VM dans GCP",
+    properties={
+        "zone": {"type": "string", "description": "Zone GCP (défaut: us-central1-a)"},
+        "force_refresh": {"type": "boolean", "description": "Ignorer le cache d'inventaire (défaut: false)"},
+        "all_zones": {"type": "boolean", "description": "Liste agrégée sur toutes les zones et tous les projets configurés"},
+        "projects": {"type": "array", "items": {"type": "string"}, "description": "Projets à interroger (défaut: GCP_PROJECT_IDS)"},
+        "status": {"type": "string", "description": "Filtre sur le statut (ex: RUNNING)"},
+        "labels": {"type": "object", "description": "Filtre sur les labels (clé: valeur)"},
+        "name_prefix": {"type": "string", "description": "Filtre sur le préfixe du nom"},
+        "filter": {"type": "string", "description": "Expression de filtre Compute brute (avec all_zones)"},
+        "page_size": {"type": "integer", "description": "Instances par page et par projet, max 500 (avec all_zones)"},
+        "cursor": {"type": "string", "description": "Curseur de la page suivante (nextCursor)"}
+    },
+    category="gcp",
+    cacheable=True
+)
+def tool_gcp_list_instances(arguments):
+    if arguments.get("all_zones") or arguments.get("cursor") or arguments.get("projects"):
+        # Liste agrégée toutes zones / multi-projets, paginée
+        listing = list_instances_aggregated(
+            projects=arguments.get("projects"),
+            status=arguments.get("status"),
+            labels=arguments.get("labels"),
+            name_prefix=arguments.get("name_prefix"),
+            filter_expression=arguments.get("filter"),
+            page_size=arguments.get("page_size"),
+            cursor=arguments.get("cursor"),
+            zone=arguments.get("zone")
+        )
+        return dict(listing, success=not listing["errors"])
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "success": True,
-                            "key_name": key_name,
-                            "message": f"Clé SSH '{key_name}' ajoutée avec succès"
-                        }, indent=2)
-                    }]
-                }
+    # Liste d'une zone : filtre brut et pagination n'existent que pour la liste agrégée
+    unsupported = [name for name in ("filter", "page_size") if arguments.get(name) is not None]
+    if unsupported:
+        return {
+            "success": False,
+            "error": f"Paramètres réservés à la liste agrégée (all_zones=true) : {', '.join(unsupported)}"
+        }
 
-            elif tool_name == "ssh_list_keys":
-                keys = list_ssh_keys()
+    listing = list_instances_cached(
+        arguments.get("zone"), force_refresh=arguments.get("force_refresh", False)
+    )
+    # Les filtres s'appliquent à la liste de la zone, servie depuis le cache
+    instances = filter_instances(
+        listing["instances"],
+        arguments.get("status"),
+        arguments.get("labels"),
+        arguments.get("name_prefix")
+    )
+    return {
+        "success": True,
+        "instances": instances,
+        "count": len(instances),
+        "from_cache": listing["from_cache"],
+        "cache_age_seconds": listing["cache_age_seconds"]
+    }
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "success": True,
-                            "keys": keys,
-                            "count": len(keys)
-                        }, indent=2)
-                    }]
-                }
+@mcp_tool(
+    "gcp_create_instance",
+    "Crée une nouvelle instance VM dans GCP",
+    properties={
+        "instance_name": {"type": "string", "description": "Nom de l'instance"},
+        "machine_type": {"type": "string", "description": "Type de machine (défaut: e2-medium)"},
+        "disk_size_gb": {"type": "integer", "description": "Taille du disque en GB (défaut: 10)"},
+        "image_family": {"type": "string", "description": "Famille d'image (défaut: debian-11)"},
+        "ssh_key_name": {"type": "string", "description": "Nom de la clé SSH à utiliser"},
+        "zone": {"type": "string", "description": "Zone GCP (défaut: us-central1-a)"},
+        "wait": {"type": "boolean", "description": "Attendre la fin de l'opération (défaut: false)"}
+    },
+    required=["instance_name"],
+    category="gcp"
+)
+def tool_gcp_create_instance(arguments):
+    return create_instance(
+        arguments.get("instance_name"),
+        arguments.get("machine_type", "e2-medium"),
+        arguments.get("disk_size_gb", 10),
+        arguments.get("image_family", "debian-11"),
+        arguments.get("ssh_key_name"),
+        arguments.get("wait", False),
+        arguments.get("zone")
+    )
 
-            # GCP Compute Engine
-            elif tool_name == "gcp_list_instances":
-                zone = arguments.get("zone")
-                instances = list_instances(zone)
+@mcp_tool(
+    "gcp_start_instance",
+    "Démarre une instance VM",
+    properties={
+        "instance_name": {"type": "string", "description": "Nom de l'instance"},
+        "zone": {"type": "string", "description": "Zone GCP"},
+        "wait": {"type": "boolean", "description": "Attendre la fin de l'opération (défaut: false)"}
+    },
+    required=["instance_name"],
+    category="gcp"
+)
+def tool_gcp_start_instance(arguments):
+    return start_instance(
+        arguments.get("instance_name"), arguments.get("zone"), arguments.get("wait", False)
+    )
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps({
-                            "success": True,
-                            "instances": instances,
-                            "count": len(instances)
-                        }, indent=2)
-                    }]
-                }
+@mcp_tool(
+    "gcp_stop_instance",
+    "Arrête une instance VM",
+    properties={
+        "instance_name": {"type": "string", "description": "Nom de l'instance"},
+        "zone": {"type": "string", "description": "Zone GCP"},
+        "wait": {"type": "boolean", "description": "Attendre la fin de l'opération (défaut: false)"}
+    },
+    required=["instance_name"],
+    category="gcp"
+)
+def tool_gcp_stop_instance(arguments):
+    return stop_instance(
+        arguments.get("instance_name"), arguments.get("zone"), arguments.get("wait", False)
+    )
 
-            elif tool_name == "gcp_create_instance":
-                instance_name = arguments.get("instance_name")
-                machine_type = arguments.get("machine_type", "e2-medium")
-                disk_size_gb = arguments.get("disk_size_gb", 10)
-                image_family = arguments.get("image_family", "debian-11")
-                ssh_key_name = arguments.get("ssh_key_name")
+@mcp_tool(
+    "gcp_delete_instance",
+    "Supprime une instance VM",
+    properties={
+        "instance_name": {"type": "string", "description": "Nom de l'instance"},
+        "zone": {"type": "string", "description": "Zone GCP"},
+        "wait": {"type": "boolean", "description": "Attendre la fin de l'opération (défaut: false)"}
+    },
+    required=["instance_name"],
+    category="gcp"
+)
+def tool_gcp_delete_instance(arguments):
+    return delete_instance(
+        arguments.get("instance_name"), arguments.get("zone"), arguments.get("wait", False)
+    )
 
-                instance_result = create_instance(
-                    instance_name, machine_type, disk_size_gb, image_family, ssh_key_name
-                )
+@mcp_tool(
+    "gcp_get_instance",
+    "Obtient les détails d'une instance",
+    properties={
+        "instance_name": {"type": "string", "description": "Nom de l'instance"},
+        "zone": {"type": "string", "description": "Zone GCP"},
+        "force_refresh": {"type": "boolean", "description": "Ignorer le cache d'inventaire (défaut: false)"}
+    },
+    required=["instance_name"],
+    category="gcp",
+    cacheable=True
+)
+def tool_gcp_get_instance(arguments):
+    return get_instance_details(
+        arguments.get("instance_name"), arguments.get("zone"), arguments.get("force_refresh", False)
+    )
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(instance_result, indent=2)
-                    }]
-                }
+# Sélection des instances commune aux outils gcp_bulk_start/stop/delete
+BULK_SELECTOR_PROPERTIES = {
+    "instance_names": {"type": "array", "items": {"type": "string"}, "description": "Noms des instances"},
+    "name_pattern": {"type": "string", "description": "Motif de nom (ex: test-*)"},
+    "labels": {"type": "object", "description": "Sélecteur de labels (clé: valeur)"},
+    "zone": {"type": "string", "description": "Zone GCP (défaut: us-central1-a avec instance_names)"},
+    "concurrency": {"type": "integer", "description": "Opérations simultanées (défaut: 10)"},
+    "wait": {"type": "boolean", "description": "Attendre la fin des opérations (défaut: false)"}
+}
+
+@mcp_tool(
+    "gcp_bulk_create",
+    "Crée plusieurs instances VM en parallèle",
+    properties={
+        "instance_names": {"type": "array", "items": {"type": "string"}, "description": "Noms des instances"},
+        "name_pattern": {"type": "string", "description": "Modèle de nom avec {index} (ex: test-{index})"},
+        "count": {"type": "integer", "description": "Nombre d'instances à créer avec name_pattern"},
+        "start_index": {"type": "integer", "description": "Premier index pour name_pattern (défaut: 1)"},
+        "machine_type": {"type": "string", "description": "Type de machine (défaut: e2-medium)"},
+        "disk_size_gb": {"type": "integer", "description": "Taille du disque en GB (défaut: 10)"},
+        "image_family": {"type": "string", "description": "Famille d'image (défaut: debian-11)"},
+        "ssh_key_name": {"type": "string", "description": "Nom de la clé SSH à utiliser"},
+        "zone": {"type": "string", "description": "Zone GCP (défaut: us-central1-a)"},
+        "concurrency": {"type": "integer", "description": "Opérations simultanées (défaut: 10)"},
+        "wait": {"type": "boolean", "description": "Attendre la fin des opérations (défaut: false)"}
+    },
+    category="gcp"
+)
+def tool_gcp_bulk_create(arguments):
+    instance_names = arguments.get("instance_names")
+    name_pattern = arguments.get("name_pattern")
+    machine_type = arguments.get("machine_type", "e2-medium")
+    disk_size_gb = arguments.get("disk_size_gb", 10)
+    image_family = arguments.get("image_family", "debian-11")
+    ssh_key_name = arguments.get("ssh_key_name")
+    zone = arguments.get("zone") or GCP_ZONE
+
+    if not instance_names:
+        if not name_pattern or "{index}" not in name_pattern or not arguments.get("count"):
+            raise ValueError("Indiquez 'instance_names' ou 'name_pattern' (avec {index}) et 'count'")
+        start_index = arguments.get("start_index", 1)
+        instance_names = [
+            name_pattern.format(index=index)
+            for index in range(start_index, start_index + arguments["count"])
+        ]
 
-            elif tool_name == "gcp_start_instance":
-                instance_name = arguments.get("instance_name")
-                zone = arguments.get("zone")
+    return run_bulk_operation(
+        "create",
+        [(name, zone) for name in dict.fromkeys(instance_names)],
+        lambda name, zone: create_instance(
+            name, machine_type, disk_size_gb, image_family, ssh_key_name, zone=zone
+        ),
+        arguments.get("concurrency"),
+        arguments.get("wait", False)
+    )
 
-                instance_result = start_instance(instance_name, zone)
+def run_bulk_selection(action, operation, arguments):
+    """Applique une opération aux instances désignées par les sélecteurs gcp_bulk_*"""
+    targets = resolve_bulk_targets(
+        arguments.get("instance_names"),
+        arguments.get("name_pattern"),
+        arguments.get("labels"),
+        arguments.get("zone")
+    )
+    return run_bulk_operation(
+        action, targets, operation,
+        arguments.get("concurrency"),
+        arguments.get("wait", False)
+    )
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(instance_result, indent=2)
-                    }]
-                }
+@mcp_tool(
+    "gcp_bulk_start",
+    "Démarre plusieurs instances VM en parallèle",
+    properties=BULK_SELECTOR_PROPERTIES,
+    category="gcp"
+)
+def tool_gcp_bulk_start(arguments):
+    return run_bulk_selection("start", start_instance, arguments)
+
+@mcp_tool(
+    "gcp_bulk_stop",
+    "Arrête plusieurs instances VM en parallèle",
+    properties=BULK_SELECTOR_PROPERTIES,
+    category="gcp"
+)
+def tool_gcp_bulk_stop(arguments):
+    return run_bulk_selection("stop", stop_instance, arguments)
+
+@mcp_tool(
+    "gcp_bulk_delete",
+    "Supprime plusieurs instances VM en parallèle",
+    properties=BULK_SELECTOR_PROPERTIES,
+    category="gcp"
+)
+def tool_gcp_bulk_delete(arguments):
+    return run_bulk_selection("delete", delete_instance, arguments)
+
+@mcp_tool(
+    "gcp_wait_operation",
+    "Attend la fin d'une ou plusieurs opérations GCP",
+    properties={
+        "operation": {"type": "string", "description": "Nom de l'opération"},
+        "operations": {"type": "array", "items": {"type": "string"}, "description": "Noms de plusieurs opérations"},
+        "zone": {"type": "string", "description": "Zone d'une opération non suivie par le serveur"},
+        "timeout": {"type": "number", "description": "Délai d'attente maximal en secondes (défaut: 300)"}
+    },
+    category="gcp"
+)
+def tool_gcp_wait_operation(arguments):
+    operation_names = arguments.get("operations") or [arguments.get("operation")]
+    if not operation_names[0]:
+        raise ValueError("Paramètre 'operation' ou 'operations' requis")
+    zone = arguments.get("zone")
+    timeout = arguments.get("timeout")
+
+    if zone:
+        for operation_name in operation_names:
+            operation_tracker.register(GCP_PROJECT_ID, zone, operation_name)
+
+    if len(operation_names) == 1:
+        records = [operation_tracker.wait(operation_names[0], timeout)]
+    else:
+        records = operation_tracker.wait_many(operation_names, timeout)
 
-            elif tool_name == "gcp_stop_instance":
-                instance_name = arguments.get("instance_name")
-                zone = arguments.get("zone")
+    return {
+        "success": all(r["status"] == "DONE" and not r["error"] for r in records),
+        "operations": records
+    }
 
-                instance_result = stop_instance(instance_name, zone)
+@mcp_tool(
+    "gcp_list_operations",
+    "Liste les opérations GCP suivies par le serveur",
+    properties={
+        "status": {"type": "string", "description": "Filtre sur le statut (PENDING, RUNNING, DONE)"},
+        "refresh": {"type": "boolean", "description": "Interroger les opérations en cours avant de lister (défaut: true)"}
+    },
+    category="gcp"
+)
+def tool_gcp_list_operations(arguments):
+    if arguments.get("refresh", True):
+        operation_tracker.poll()
+    operations = operation_tracker.list(arguments.get("status"))
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(instance_result, indent=2)
-                    }]
-                }
+    return {
+        "success": True,
+        "operations": operations,
+        "count": len(operations)
+    }
 
-            elif tool_name == "gcp_delete_instance":
-                instance_name = arguments.get("instance_name")
-                zone = arguments.get("zone")
+# Exécution SSH distante
+
+@mcp_tool(
+    "ssh_execute",
+    "Exécute une commande SSH sur une machine distante",
+    properties={
+        "host": {"type": "string", "description": "Adresse IP ou hostname"},
+        "username": {"type": "string", "description": "Nom d'utilisateur SSH"},
+        "command": {"type": "string", "description": "Commande à exécuter"},
+        "ssh_key_name": {"type": "string", "description": "Nom de la clé SSH à utiliser"},
+        "timeout": {"type": "number", "description": "Délai d'exécution en secondes"},
+        "head_bytes": {"type": "integer", "description": "Octets conservés au début de la sortie (défaut: 262144)"},
+        "tail_bytes": {"type": "integer", "description": "Octets conservés à la fin de la sortie (défaut: 262144)"}
+    },
+    required=["host", "username", "command", "ssh_key_name"],
+    category="ssh"
+)
+def tool_ssh_execute(arguments):
+    return execute_ssh_command(
+        arguments.get("host"),
+        arguments.get("username"),
+        arguments.get("command"),
+        arguments.get("ssh_key_name"),
+        arguments.get("timeout"),
+        arguments.get("head_bytes"),
+        arguments.get("tail_bytes")
+    )
 
-                instance_result = delete_instance(instance_name, zone)
+@mcp_tool(
+    "ssh_execute_many",
+    "Exécute une commande SSH sur plusieurs machines en parallèle",
+    properties={
+        "hosts": {"type": "array", "items": {"type": "string"}, "description": "Adresses IP ou hostnames"},
+        "instance_filter": {
+            "type": "object",
+            "description": "Sélection des instances GCP si 'hosts' est absent",
+            "properties": {
+                "zone": {"type": "string", "description": "Zone GCP"},
+                "status": {"type": "string", "description": "Statut des instances (défaut: RUNNING)"},
+                "name_prefix": {"type": "string", "description": "Préfixe du nom des instances"},
+                "use_internal_ip": {"type": "boolean", "description": "Utiliser l'IP interne (défaut: false)"}
+            }
+        },
+        "username": {"type": "string", "description": "Nom d'utilisateur SSH"},
+        "command": {"type": "string", "description": "Commande à exécuter"},
+        "ssh_key_name": {"type": "string", "description": "Nom de la clé SSH à utiliser"},
+        "concurrency": {"type": "integer", "description": "Nombre d'hôtes traités simultanément (défaut: 20)"},
+        "timeout": {"type": "number", "description": "Délai par hôte en secondes (défaut: 60)"}
+    },
+    required=["username", "command", "ssh_key_name"],
+    category="ssh"
+)
+def tool_ssh_execute_many(arguments):
+    hosts = arguments.get("hosts")
+    if not hosts:
+        instance_filter = arguments.get("instance_filter", {})
+        hosts = resolve_instance_hosts(
+            zone=instance_filter.get("zone"),
+            status=instance_filter.get("status", "RUNNING"),
+            name_prefix=instance_filter.get("name_prefix"),
+            use_internal_ip=instance_filter.get("use_internal_ip", False)
+        )
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(instance_result, indent=2)
-                    }]
-                }
+    return execute_ssh_command_many(
+        hosts,
+        arguments.get("username"),
+        arguments.get("command"),
+        arguments.get("ssh_key_name"),
+        arguments.get("concurrency"),
+        arguments.get("timeout")
+    )
 
-            elif tool_name == "gcp_get_instance":
-                instance_name = arguments.get("instance_name")
-                zone = arguments.get("zone")
+SFTP_TRANSFER_PROPERTIES = {
+    "concurrency": {"type": "integer", "description": "Sessions SFTP simultanées (défaut: 4)"},
+    "window_size": {"type": "integer", "description": "Fenêtre SSH de chaque session en octets (défaut: 16777216)"},
+    "part_size": {"type": "integer", "description": "Taille des parts réparties entre les sessions (défaut: 8388608)"},
+    "resume": {"type": "boolean", "description": "Reprendre un transfert interrompu (défaut: true)"},
+    "preserve": {"type": "boolean", "description": "Conserver permissions et date de modification (défaut: true)"}
+}
 
-                instance_result = get_instance_details(instance_name, zone)
+def sftp_transfer_options(arguments):
+    """Options de transfert SFTP communes à l'upload et au download"""
+    return {
+        "concurrency": arguments.get("concurrency"),
+        "window_size": arguments.get("window_size"),
+        "part_size": arguments.get("part_size"),
+        "resume": arguments.get("resume", True),
+        "preserve": arguments.get("preserve", True)
+    }
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(instance_result, indent=2)
-                    }]
-                }
+@mcp_tool(
+    "ssh_upload_file",
+    "Upload un fichier ou un répertoire via SFTP (parts parallèles, reprise)",
+    properties={
+        "host": {"type": "string", "description": "Adresse IP ou hostname"},
+        "username": {"type": "string", "description": "Nom d'utilisateur SSH"},
+        "local_path": {"type": "string", "description": "Chemin local du fichier ou du répertoire"},
+        "remote_path": {"type": "string", "description": "Chemin distant du fichier ou du répertoire"},
+        "ssh_key_name": {"type": "string", "description": "Nom de la clé SSH à utiliser"},
+        **SFTP_TRANSFER_PROPERTIES
+    },
+    required=["host", "username", "local_path", "remote_path", "ssh_key_name"],
+    category="ssh"
+)
+def tool_ssh_upload_file(arguments):
+    return upload_file_ssh(
+        arguments.get("host"),
+        arguments.get("username"),
+        arguments.get("local_path"),
+        arguments.get("remote_path"),
+        arguments.get("ssh_key_name"),
+        **sftp_transfer_options(arguments)
+    )
 
-            # SSH Remote Execution
-            elif tool_name == "ssh_execute":
-                host = arguments.get("host")
-                username = arguments.get("username")
-                command = arguments.get("command")
-                ssh_key_name = arguments.get("ssh_key_name")
+@mcp_tool(
+    "ssh_download_file",
+    "Télécharge un fichier ou un répertoire via SFTP (parts parallèles, reprise)",
+    properties={
+        "host": {"type": "string", "description": "Adresse IP ou hostname"},
+        "username": {"type": "string", "description": "Nom d'utilisateur SSH"},
+        "remote_path": {"type": "string", "description": "Chemin distant du fichier ou du répertoire"},
+        "local_path": {"type": "string", "description": "Chemin local du fichier ou du répertoire"},
+        "ssh_key_name": {"type": "string", "description": "Nom de la clé SSH à utiliser"},
+        **SFTP_TRANSFER_PROPERTIES
+    },
+    required=["host", "username", "remote_path", "local_path", "ssh_key_name"],
+    category="ssh"
+)
+def tool_ssh_download_file(arguments):
+    return download_file_ssh(
+        arguments.get("host"),
+        arguments.get("username"),
+        arguments.get("remote_path"),
+        arguments.get("local_path"),
+        arguments.get("ssh_key_name"),
+        **sftp_transfer_options(arguments)
+    )
 
-                ssh_result = execute_ssh_command(host, username, command, ssh_key_name)
+@mcp_tool(
+    "ssh_sync_dir",
+    "Synchronise un répertoire local vers une machine distante en n'envoyant que les fichiers modifiés",
+    properties={
+        "host": {"type": "string", "description": "Adresse IP ou hostname"},
+        "username": {"type": "string", "description": "Nom d'utilisateur SSH"},
+        "local_dir": {"type": "string", "description": "Répertoire local source"},
+        "remote_dir": {"type": "string", "description": "Répertoire distant cible"},
+        "ssh_key_name": {"type": "string", "description": "Nom de la clé SSH à utiliser"},
+        "checksum": {"type": "boolean", "description": "Comparer les contenus (SHA-256) plutôt que taille et date (défaut: false)"},
+        "compress": {"type": "boolean", "description": "Envoyer les fichiers modifiés dans une archive tar.gz (défaut: false)"},
+        "delete": {"type": "boolean", "description": "Supprimer les fichiers distants absents en local (défaut: false)"},
+        "dry_run": {"type": "boolean", "description": "Lister les différences sans rien transférer (défaut: false)"},
+        "concurrency": {"type": "integer", "description": "Sessions SFTP simultanées (défaut: 4)"}
+    },
+    required=["host", "username", "local_dir", "remote_dir", "ssh_key_name"],
+    category="ssh"
+)
+def tool_ssh_sync_dir(arguments):
+    return sync_directory_ssh(
+        arguments.get("host"),
+        arguments.get("username"),
+        arguments.get("local_dir"),
+        arguments.get("remote_dir"),
+        arguments.get("ssh_key_name"),
+        checksum=arguments.get("checksum", False),
+        compress=arguments.get("compress", False),
+        delete=arguments.get("delete", False),
+        dry_run=arguments.get("dry_run", False),
+        concurrency=arguments.get("concurrency")
+    )
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(ssh_result, indent=2)
-                    }]
+# Terraform
+
+@mcp_tool(
+    "terraform_init",
+    "Initialise Terraform dans un répertoire",
+    properties={
+        "working_dir": {"type": "string", "description": "Répertoire de travail Terraform"},
+        "force": {"type": "boolean", "description": "Relancer init même si la configuration n'a pas changé (défaut: false)"}
+    },
+    required=["working_dir"],
+    category="terraform"
+)
+def tool_terraform_init(arguments):
+    return terraform_init(arguments.get("working_dir"), arguments.get("force", False))
+
+@mcp_tool(
+    "terraform_plan",
+    "Planifie un déploiement Terraform et enregistre le plan (plan_id)",
+    properties={
+        "working_dir": {"type": "string", "description": "Répertoire de travail Terraform"},
+        "var_file": {"type": "string", "description": "Fichier de variables"},
+        "background": {"type": "boolean", "description": "Exécuter en arrière-plan et renvoyer un job_id (défaut: false)"}
+    },
+    required=["working_dir"],
+    category="terraform"
+)
+def tool_terraform_plan(arguments):
+    if arguments.get("background"):
+        return terraform_submit_job("plan", arguments.get("working_dir"), arguments.get("var_file"))
+    return terraform_plan(arguments.get("working_dir"), arguments.get("var_file"))
+
+@mcp_tool(
+    "terraform_apply",
+    "Applique un déploiement Terraform",
+    properties={
+        "working_dir": {"type": "string", "description": "Répertoire de travail Terraform"},
+        "var_file": {"type": "string", "description": "Fichier de variables"},
+        "auto_approve": {"type": "boolean", "description": "Auto-approuver (défaut: true)"},
+        "plan_id": {"type": "string", "description": "Identifiant renvoyé par terraform_plan : applique exactement ce plan"},
+        "background": {"type": "boolean", "description": "Exécuter en arrière-plan et renvoyer un job_id (défaut: false)"}
+    },
+    category="terraform"
+)
+def tool_terraform_apply(arguments):
+    if arguments.get("background"):
+        return terraform_submit_job(
+            "apply", arguments.get("working_dir"), arguments.get("var_file"), arguments.get("plan_id"),
+            arguments.get("auto_approve", True)
+        )
+    return terraform_apply(
+        arguments.get("working_dir"),
+        arguments.get("var_file"),
+        arguments.get("auto_approve", True),
+        arguments.get("plan_id")
+    )
+
+@mcp_tool(
+    "terraform_destroy",
+    "Détruit l'infrastructure Terraform",
+    properties={
+        "working_dir": {"type": "string", "description": "Répertoire de travail Terraform"},
+        "var_file": {"type": "string", "description": "Fichier de variables"},
+        "auto_approve": {"type": "boolean", "description": "Auto-approuver (défaut: true)"},
+        "background": {"type": "boolean", "description": "Exécuter en arrière-plan et renvoyer un job_id (défaut: false)"}
+    },
+    required=["working_dir"],
+    category="terraform"
+)
+def tool_terraform_destroy(arguments):
+    if arguments.get("background"):
+        return terraform_submit_job(
+            "destroy", arguments.get("working_dir"), arguments.get("var_file"),
+            auto_approve=arguments.get("auto_approve", True)
+        )
+    return terraform_destroy(
+        arguments.get("working_dir"), arguments.get("auto_approve", True), var_file=arguments.get("var_file")
+    )
+
+@mcp_tool(
+    "terraform_run_many",
+    "Exécute Terraform sur plusieurs répertoires en parallèle selon leurs dépendances",
+    properties={
+        "stacks": {
+            "type": "array",
+            "description": "Piles : chemins ou objets {working_dir, name, depends_on, var_file}",
+            "items": {
+                "type": ["string", "object"],
+                "properties": {
+                    "working_dir": {"type": "string", "description": "Répertoire de travail Terraform"},
+                    "name": {"type": "string", "description": "Nom de la pile (défaut: working_dir)"},
+                    "depends_on": {"type": "array", "items": {"type": "string"}, "description": "Piles à traiter avant celle-ci"},
+                    "var_file": {"type": "string", "description": "Fichier de variables"}
                 }
+            }
+        },
+        "action": {"type": "string", "description": "init, plan (défaut), apply (init + plan + apply du plan) ou destroy"},
+        "concurrency": {"type": "integer", "description": "Piles traitées simultanément (défaut: 4)"},
+        "parallelism": {"type": "integer", "description": "Option -parallelism de Terraform pour plan/apply/destroy"}
+    },
+    required=["stacks"],
+    category="terraform"
+)
+def tool_terraform_run_many(arguments):
+    return terraform_run_many(
+        arguments.get("stacks", []),
+        arguments.get("action", "plan"),
+        arguments.get("concurrency"),
+        arguments.get("parallelism")
+    )
 
-            elif tool_name == "ssh_upload_file":
-                host = arguments.get("host")
-                username = arguments.get("username")
-                local_path = arguments.get("local_path")
-                remote_path = arguments.get("remote_path")
-                ssh_key_name = arguments.get("ssh_key_name")
+@mcp_tool(
+    "terraform_state_query",
+    "Interroge les ressources de l'état Terraform (index en mémoire, sans relancer Terraform)",
+    properties={
+        "working_dir": {"type": "string", "description": "Répertoire de travail Terraform"},
+        "address": {"type": "string", "description": "Adresse exacte ou motif (ex: google_compute_instance.*)"},
+        "type": {"type": "string", "description": "Type de ressource (ex: google_compute_instance)"},
+        "module": {"type": "string", "description": "Adresse du module (ex: module.network, \"\" pour la racine)"},
+        "attributes": {"type": "array", "items": {"type": "string"}, "description": "Attributs à renvoyer (chemins pointés, ex: network_interface.0.network_ip)"},
+        "include_outputs": {"type": "boolean", "description": "Inclure les outputs (défaut: false)"},
+        "limit": {"type": "integer", "description": "Nombre maximal de ressources renvoyées (défaut: 100)"},
+        "force_refresh": {"type": "boolean", "description": "Relire l'état même si son serial n'a pas changé (défaut: false)"}
+    },
+    required=["working_dir"],
+    # Peut lancer terraform show / state pull, mais ne doit pas attendre derrière les apply/destroy
+    category="terraform_state",
+    cacheable=True
+)
+def tool_terraform_state_query(arguments):
+    return terraform_state_query(
+        arguments.get("working_dir"),
+        arguments.get("address"),
+        arguments.get("type"),
+        arguments.get("module"),
+        arguments.get("attributes"),
+        arguments.get("include_outputs", False),
+        arguments.get("limit", 100),
+        arguments.get("force_refresh", False)
+    )
 
-                upload_result = upload_file_ssh(host, username, local_path, remote_path, ssh_key_name)
+@mcp_tool(
+    "terraform_job_status",
+    "Statut d'une tâche Terraform en arrière-plan (ou de toutes les tâches)",
+    properties={
+        "job_id": {"type": "string", "description": "Identifiant de la tâche (omis : liste toutes les tâches)"}
+    }
+)
+def tool_terraform_job_status(arguments):
+    job_id = arguments.get("job_id")
+    if not job_id:
+        jobs = terraform_jobs.list()
+        return {"success": True, "jobs": jobs, "count": len(jobs)}
+    return dict(terraform_jobs.get(job_id).to_dict(), success=True)
+
+@mcp_tool(
+    "terraform_job_logs",
+    "Lit la sortie d'une tâche Terraform à partir d'un offset",
+    properties={
+        "job_id": {"type": "string", "description": "Identifiant de la tâche"},
+        "offset": {"type": "integer", "description": "Offset en octets (next_offset de l'appel précédent, défaut: 0)"},
+        "max_bytes": {"type": "integer", "description": "Octets maximum renvoyés (défaut: 65536)"},
+        "wait": {"type": "number", "description": "Attendre jusqu'à N secondes une nouvelle sortie (max: 30, défaut: 0)"}
+    },
+    required=["job_id"]
+)
+def tool_terraform_job_logs(arguments):
+    job = terraform_jobs.get(arguments.get("job_id"))
+    return dict(
+        job.read_log(
+            arguments.get("offset", 0),
+            arguments.get("max_bytes", 65536),
+            min(arguments.get("wait", 0), 30)
+        ),
+        success=True
+    )
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(upload_result, indent=2)
-                    }]
-                }
+@mcp_tool(
+    "terraform_job_cancel",
+    "Interrompt une tâche Terraform en arrière-plan",
+    properties={
+        "job_id": {"type": "string", "description": "Identifiant de la tâche"}
+    },
+    required=["job_id"]
+)
+def tool_terraform_job_cancel(arguments):
+    job = terraform_jobs.get(arguments.get("job_id"))
+    job.cancel()
+    return dict(job.to_dict(), success=True)
+
+# Langage naturel
+
+@mcp_tool(
+    "gcp_natural_query",
+    "Interprète une requête en langage naturel pour GCP",
+    properties={
+        "query": {"type": "string", "description": "Requête en français ou en anglais"},
+        "tool_call": {"type": "boolean", "description": "Proposer l'appel tools/call correspondant (défaut: true)"}
+    },
+    required=["query"],
+    cacheable=True
+)
+def tool_gcp_natural_query(arguments):
+    return natural_language_to_gcp_action(arguments.get("query"), arguments.get("tool_call", True))
+
+TOOLS_CATALOG = [spec.schema() for spec in TOOL_REGISTRY.values()]
 
-            # Terraform
-            elif tool_name == "terraform_init":
-                working_dir = arguments.get("working_dir")
-                tf_result = terraform_init(working_dir)
+# ====================================================================
+# ENDPOINTS MCP - Format JSON-RPC
+# ====================================================================
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(tf_result, indent=2)
-                    }]
-                }
+RESOURCES_CATALOG = [
+    {
+        "uri": "gcp://instances",
+        "name": "Liste des instances GCP",
+        "description": "Toutes les instances VM GCP",
+        "mimeType": "application/json"
+    },
+    {
+        "uri": "ssh://keys",
+        "name": "Liste des clés SSH",
+        "description": "Toutes les clés SSH disponibles",
+        "mimeType": "application/json"
+    }
+]
+
+class PrecomputedPayload:
+    """Document JSON construit et encodé une seule fois, identifié par un ETag"""
+
+    def __init__(self, payload):
+        self.payload = payload
+        self.body = encode_json(payload)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:16]
+
+def precomputed_response(precomputed):
+    """Sert un document pré-encodé (GET), avec réponse 304 si l'ETag correspond"""
+    response = Response(precomputed.body, mimetype="application/json")
+    response.set_etag(precomputed.etag)
+    return response.make_conditional(request)
+
+def precomputed_jsonrpc_response(precomputed, request_id, jsonrpc="2.0"):
+    """Enveloppe un résultat pré-encodé dans une réponse JSON-RPC sans le ré-encoder
+
+    Pas de réponse 304 ici : une réponse JSON-RPC porte toujours son enveloppe.
+    """
+    return Response(
+        b'{"jsonrpc":' + encode_json(jsonrpc)
+        + b',"result":' + precomputed.body
+        + b',"id":' + encode_json(request_id) + b'}',
+        mimetype="application/json"
+    )
 
-            elif tool_name == "terraform_plan":
-                working_dir = arguments.get("working_dir")
-                var_file = arguments.get("var_file")
+SERVER_FEATURES = [
+    "GCP Compute Engine Management",
+    "SSH Key Management",
+    "Remote SSH Execution",
+    "Terraform Infrastructure as Code"
+]
+
+TOOLS_LIST_RESULT = PrecomputedPayload({"tools": TOOLS_CATALOG})
+RESOURCES_LIST_RESULT = PrecomputedPayload({"resources": RESOURCES_CATALOG})
+INITIALIZE_RESULT = PrecomputedPayload({
+    "protocolVersion": "2024-11-05",
+    "capabilities": {
+        "tools": {},
+        "resources": {}
+    },
+    "serverInfo": {
+        "name": "GCP Infrastructure MCP Server",
+        "version": "2.0.0"
+    }
+})
+PRECOMPUTED_RESULTS = {
+    "initialize": INITIALIZE_RESULT,
+    "tools/list": TOOLS_LIST_RESULT,
+    "resources/list": RESOURCES_LIST_RESULT
+}
+
+ROOT_DISCOVERY = PrecomputedPayload({
+    "name": "GCP Infrastructure MCP Server",
+    "version": "2.0.0",
+    "protocol": "mcp",
+    "capabilities": {
+        "tools": True,
+        "resources": True
+    },
+    "features": SERVER_FEATURES
+})
+MCP_DISCOVERY = PrecomputedPayload({
+    "jsonrpc": "2.0",
+    "name": "GCP Infrastructure MCP Server",
+    "version": "2.0.0",
+    "protocol": "mcp",
+    "protocolVersion": "2024-11-05",
+    "capabilities": {
+        "tools": True,
+        "resources": True
+    },
+    "serverInfo": {
+        "name": "GCP Infrastructure MCP Server",
+        "version": "2.0.0"
+    },
+    "features": SERVER_FEATURES,
+    "endpoint": {
+        "method": "POST",
+        "contentType": "application/json",
+        "format": "JSON-RPC 2.0"
+    }
+})
 
-                tf_result = terraform_plan(working_dir, var_file)
+@app.route('/', methods=['GET', 'POST'])
+def root():
+    """Endpoint racine - Support JSON-RPC et REST"""
+    if request.method == 'GET':
+        return precomputed_response(ROOT_DISCOVERY)
+    else:
+        return handle_jsonrpc()
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(tf_result, indent=2)
-                    }]
-                }
+@app.route('/mcp', methods=['GET', 'POST'])
+def mcp_endpoint():
+    """Endpoint principal MCP en format JSON-RPC"""
+    if request.method == 'GET':
+        # Endpoint de découverte pour les clients MCP
+        return precomputed_response(MCP_DISCOVERY)
+    else:
+        return handle_jsonrpc()
 
-            elif tool_name == "terraform_apply":
-                working_dir = arguments.get("working_dir")
-                var_file = arguments.get("var_file")
-                auto_approve = arguments.get("auto_approve", True)
+def handle_jsonrpc():
+    """Gère les requêtes JSON-RPC selon le protocole MCP"""
+    data = request.get_json()
+    if not data:
+        return json_response({
+            "jsonrpc": "2.0",
+            "error": {"code": -32700, "message": "Parse error"},
+            "id": None
+        }, 400)
+
+    if isinstance(data, list):
+        results = execute_jsonrpc_batch(data)
+        if not results:
+            # Lot composé uniquement de notifications : aucune réponse
+            return '', 204
+        return json_response(results)
+    else:
+        params = data.get("params") if isinstance(data, dict) else None
+        meta = params.get("_meta") if isinstance(params, dict) else None
+        progress_token = meta.get("progressToken") if isinstance(meta, dict) else None
+        if progress_token is not None and "text/event-stream" in request.headers.get("Accept", ""):
+            return Response(
+                stream_jsonrpc_request(data, progress_token),
+                mimetype="text/event-stream"
+            )
+
+        if not isinstance(data, dict):
+            return json_response(jsonrpc_error(-32600, "Invalid Request"), 400)
+
+        # Catalogues pré-encodés : pas de reconstruction ni de ré-encodage
+        precomputed = PRECOMPUTED_RESULTS.get(data.get("method"))
+        if "id" not in data:
+            # Notification : traitée sans réponse, comme dans un lot
+            if precomputed is None:
+                process_jsonrpc_request(data)
+            return '', 204
+        if precomputed is not None:
+            return precomputed_jsonrpc_response(
+                precomputed, data.get("id"), data.get("jsonrpc", "2.0")
+            )
 
-                tf_result = terraform_apply(working_dir, var_file, auto_approve)
+        result = process_jsonrpc_request(data)
+        return json_response(result)
+
+# Émetteur de notifications de progression de la requête en cours (par thread)
+_progress_context = threading.local()
+
+def report_progress(progress, total=None, message=None):
+    """Émet une notification de progression si la requête en cours en a demandé"""
+    reporter = getattr(_progress_context, "reporter", None)
+    if reporter is not None:
+        reporter(progress, total, message)
+
+def stream_jsonrpc_request(request_data, progress_token):
+    """Exécute une requête en flux SSE : notifications/progress puis réponse finale"""
+    events = queue.Queue()
+
+    def reporter(progress, total=None, message=None):
+        notification_params = {"progressToken": progress_token, "progress": progress}
+        if total is not None:
+            notification_params["total"] = total
+        if message is not None:
+            notification_params["message"] = message
+        events.put({
+            "jsonrpc": "2.0",
+            "method": "notifications/progress",
+            "params": notification_params
+        })
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(tf_result, indent=2)
-                    }]
-                }
+    def run():
+        _progress_context.reporter = reporter
+        try:
+            events.put(process_jsonrpc_request(request_data))
+        finally:
+            _progress_context.reporter = None
+            events.put(None)
+
+    threading.Thread(target=run, name="jsonrpc-stream", daemon=True).start()
+
+    while True:
+        message = events.get()
+        if message is None:
+            break
+        yield f"event: message\ndata: {encode_json_text(message)}\n\n"
+
+# Pool partagé par tous les lots : borne le nombre d'appels simultanés
+batch_executor = ThreadPoolExecutor(
+    max_workers=JSONRPC_BATCH_WORKERS,
+    thread_name_prefix="jsonrpc-batch"
+)
+
+def jsonrpc_error(code, message, request_id=None, jsonrpc="2.0"):
+    """Construit une réponse d'erreur JSON-RPC"""
+    return {
+        "jsonrpc": jsonrpc,
+        "error": {"code": code, "message": message},
+        "id": request_id
+    }
 
-            elif tool_name == "terraform_destroy":
-                working_dir = arguments.get("working_dir")
-                auto_approve = arguments.get("auto_approve", True)
+def _run_batch_item(request_data, started):
+    """Exécute un élément de lot en publiant son heure de démarrage"""
+    started.set_result(time.monotonic())
+    return process_jsonrpc_request(request_data)
+
+def execute_jsonrpc_batch(batch, batch_timeout=None, item_timeout=None):
+    """Exécute un lot JSON-RPC en parallèle en conservant l'ordre des réponses
+
+    Les notifications (sans "id") sont soumises au pool sans être attendues
+    et n'apparaissent pas dans la réponse. Chaque élément dispose de
+    item_timeout secondes à partir de son démarrage, dans la limite du
+    délai global du lot. À l'expiration, un élément encore en file est
+    annulé ; un élément déjà démarré n'est pas interrompu et occupe son
+    worker jusqu'à sa fin, seule sa réponse est remplacée par une erreur.
+    """
+    batch_timeout = JSONRPC_BATCH_TIMEOUT if batch_timeout is None else batch_timeout
+    item_timeout = JSONRPC_ITEM_TIMEOUT if item_timeout is None else item_timeout
+    batch_deadline = time.monotonic() + batch_timeout
+
+    results = []
+    waiting = {}
+    for request_data in batch:
+        if not isinstance(request_data, dict):
+            results.append(jsonrpc_error(-32600, "Invalid Request"))
+            continue
+
+        if "id" not in request_data:
+            batch_executor.submit(_run_batch_item, request_data, Future())
+            continue
+
+        # Un lot d'un seul élément n'a pas besoin de passer par le pool
+        if len(batch) == 1:
+            results.append(process_jsonrpc_request(request_data))
+            continue
+
+        started = Future()
+        future = batch_executor.submit(_run_batch_item, request_data, started)
+        waiting[len(results)] = (future, started, request_data)
+        results.append(None)
+
+    while waiting:
+        now = time.monotonic()
+        deadline = batch_deadline
+        for index, (future, started, payload) in list(waiting.items()):
+            if future.done():
+                results[index] = future.result()
+                del waiting[index]
+                continue
+
+            # Tant que l'élément attend un worker, seul le délai du lot s'applique
+            item_deadline = batch_deadline
+            if started.done():
+                item_deadline = min(item_deadline, started.result() + item_timeout)
+            if item_deadline <= now:
+                future.cancel()
+                results[index] = jsonrpc_error(
+                    -32000,
+                    f"Délai dépassé pour la méthode '{payload.get('method')}'",
+                    payload.get("id"),
+                    payload.get("jsonrpc", "2.0")
+                )
+                del waiting[index]
+                continue
+            deadline = min(deadline, item_deadline)
 
-                tf_result = terraform_destroy(working_dir, auto_approve)
+        if waiting:
+            # Réveil à la première fin d'élément, au premier démarrage (nouveau délai) ou à l'échéance
+            watched = [future for future, _, _ in waiting.values()]
+            watched += [started for _, started, _ in waiting.values() if not started.done()]
+            wait_futures(watched, timeout=max(0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(tf_result, indent=2)
-                    }]
-                }
+    return results
 
-            # Natural Language
-            elif tool_name == "gcp_natural_query":
-                query = arguments.get("query")
-                nl_result = natural_language_to_gcp_action(query)
+def process_jsonrpc_request(request_data):
+    """Traite une requête JSON-RPC individuelle"""
+    jsonrpc = request_data.get("jsonrpc", "2.0")
+    method = request_data.get("method")
+    params = request_data.get("params", {})
+    request_id = request_data.get("id")
 
-                result = {
-                    "content": [{
-                        "type": "text",
-                        "text": json.dumps(nl_result, indent=2)
-                    }]
-                }
+    try:
+        if method == "initialize":
+            result = INITIALIZE_RESULT.payload
 
-            else:
-                raise ValueError(f"Outil '{tool_name}' non trouvé")
+        elif method == "tools/list":
+            result = TOOLS_LIST_RESULT.payload
+
+        elif method == "tools/call":
+            meta = params.get("_meta") or {}
+            result = call_tool(params.get("name"), params.get("arguments", {}), meta.get("pretty"))
 
         elif method == "resources/list":
-            result = {
-                "resources": [
-                    {
-                        "uri": "gcp://instances",
-                        "name": "Liste des instances GCP",
-                        "description": "Toutes les instances VM GCP",
-                        "mimeType": "application/json"
-                    },
-                    {
-                        "uri": "ssh://keys",
-                        "name": "Liste des clés SSH",
-                        "description": "Toutes les clés SSH disponibles",
-                        "mimeType": "application/json"
-                    }
-                ]
-            }
+            result = RESOURCES_LIST_RESULT.payload
 
         elif method == "resources/read":
             uri = params.get("uri")
 
             if uri == "gcp://instances":
-                instances = list_instances()
+                # Servi depuis le cache d'inventaire : l'âge de la liste accompagne les instances
+                listing = list_instances_cached()
+                inventory = {
+                    "instances": listing["instances"],
+                    "count": len(listing["instances"]),
+                    "from_cache": listing["from_cache"],
+                    "cache_age_seconds": listing["cache_age_seconds"]
+                }
                 result = {
                     "contents": [{
                         "uri": uri,
                         "mimeType": "application/json",
-                        "text": json.dumps(instances, indent=2)
+                        "text": encode_json_text(inventory, JSON_PRETTY)
                     }]
                 }
 
@@ -1142,7 +5017,7 @@ def process_jsonrpc_request(request_data):
                     "contents": [{
                         "uri": uri,
                         "mimeType": "application/json",
-                        "text": json.dumps(keys, indent=2)
+                        "text": encode_json_text(keys, JSON_PRETTY)
                     }]
                 }
 
@@ -1168,6 +5043,18 @@ def process_jsonrpc_request(request_data):
             "id": request_id
         }
 
+# ====================================================================
+# ARRÊT DU SERVEUR
+# ====================================================================
+
+def shutdown_server():
+    """Libère les ressources partagées (connexions SSH, pools de threads)"""
+    batch_executor.shutdown(wait=False, cancel_futures=True)
+    tool_executor.shutdown(wait=False, cancel_futures=True)
+    terraform_jobs.shutdown()
+    rsa_key_pool.stop()
+    ssh_pool.close_all()
+
 # ====================================================================
 # HEALTH CHECK
 # ====================================================================
@@ -1181,7 +5068,20 @@ def health():
         "version": "2.0.0",
         "gcp_project": GCP_PROJECT_ID,
         "gcp_zone": GCP_ZONE,
-        "ssh_keys_count": len(ssh_keys_store)
+        "ssh_keys_count": ssh_key_index.count(),
+        "ssh_key_index": ssh_key_index.stats(),
+        "ssh_key_pool": rsa_key_pool.stats(),
+        "gcp_clients": gcp_client_manager.stats(),
+        "ssh_pool": ssh_pool.stats(),
+        "ssh_key_cache": private_key_cache.stats(),
+        "instance_cache": instance_cache.stats(),
+        "tool_result_cache": tool_result_cache.stats(),
+        "terraform_init": terraform_init_cache.stats(),
+        "terraform_plans": terraform_plan_store.stats(),
+        "terraform_jobs": terraform_jobs.stats(),
+        "terraform_state_cache": terraform_state_cache.stats(),
+        "operations": operation_tracker.stats(),
+        "tools": tool_stats()
     })
 
 if __name__ == '__main__':
@@ -1195,4 +5095,12 @@ if __name__ == '__main__':
     print(f"   ✓ Exécution SSH distante sur les VMs")
     print(f"   ✓ Déploiement Terraform")
     print(f"   ✓ Interprétation en langage naturel")
-    app.run(debug=False, host='0.0.0.0', port=5001)
+    print(f"ℹ️  Serveur de développement Flask : en production, utilisez")
+    print(f"   gunicorn -c gunicorn.conf.py mcp_server:app")
+    # HTTP/1.1 pour conserver les connexions (keep-alive) même en développement
+    from werkzeug.serving import WSGIRequestHandler
+    WSGIRequestHandler.protocol_version = "HTTP/1.1"
+    try:
+        app.run(debug=False, host='0.0.0.0', port=5001, threaded=True)
+    finally:
+        shutdown_server()
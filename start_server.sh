@@ -38,7 +38,7 @@ echo -e "${GREEN}✓${NC} Credentials GCP trouvés"
 
 # Vérifier les dépendances
 echo -e "${YELLOW}Vérification des dépendances...${NC}"
-if ! python3 -c "import flask, google.cloud.compute_v1, paramiko, python_terraform" &> /dev/null; then
+if ! python3 -c "import flask, google.cloud.compute_v1, paramiko, python_terraform, gunicorn" &> /dev/null; then
     echo -e "${YELLOW}⚠ Certaines dépendances sont manquantes${NC}"
     echo -e "${YELLOW}  Installation des dépendances...${NC}"
     pip3 install -r requirements.txt
@@ -57,15 +57,15 @@ else
 fi
 
 # Vérifier si le serveur est déjà en cours d'exécution
-if pgrep -f "mcp_server.py" > /dev/null; then
+if pgrep -f "mcp_server(\.py|:app)" > /dev/null; then
     echo -e "${YELLOW}⚠ Le serveur est déjà en cours d'exécution${NC}"
-    echo -e "${YELLOW}  PID: $(pgrep -f mcp_server.py)${NC}"
+    echo -e "${YELLOW}  PID: $(pgrep -o -f 'mcp_server(\.py|:app)')${NC}"
     echo ""
     read -p "Voulez-vous redémarrer le serveur ? (y/N) " -n 1 -r
     echo
     if [[ $REPLY =~ ^[Yy]$ ]]; then
         echo -e "${YELLOW}Arrêt du serveur...${NC}"
-        pkill -f "mcp_server.py"
+        pkill -f "mcp_server(\.py|:app)"
         sleep 2
     else
         echo -e "${GREEN}Le serveur continue de tourner${NC}"
@@ -98,11 +98,11 @@ case $choice in
         echo -e "${GREEN}║  Appuyez sur Ctrl+C pour arrêter                    ║${NC}"
         echo -e "${GREEN}╚══════════════════════════════════════════════════════╝${NC}"
         echo ""
-        python3 mcp_server.py
+        gunicorn -c gunicorn.conf.py mcp_server:app
         ;;
     2)
         echo -e "${GREEN}Démarrage du serveur en arrière-plan...${NC}"
-        nohup python3 mcp_server.py > mcp_server.log 2>&1 &
+        nohup gunicorn -c gunicorn.conf.py mcp_server:app > mcp_server.log 2>&1 &
         SERVER_PID=$!
         sleep 2
 